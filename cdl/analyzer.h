@@ -92,6 +92,14 @@ typedef struct {
     bit no_bkts;
 } t_analyzer_trace_cfg_ofs;
 
+/*t t_atr_fifo_encoding
+ */
+typedef enum[2] {
+    atr_fifo_encoding_none "Each push is one entry of data_width",
+    atr_fifo_encoding_rle  "Pushes are run-length encoded as 32-bit (count, 8/16-bit value) entries",
+    atr_fifo_encoding_time_delta "Pushes are 32-bit (16-bit time delta, 16-bit data) entries, with escape entries for large deltas",
+} t_atr_fifo_encoding;
+
 /*t t_analyzer_trace_cfg_fifo
  */
 typedef struct {
@@ -100,12 +108,15 @@ typedef struct {
     bit fifo_per_ram;
     bit ram_of_fifo;
     bit enable_push;
+    t_atr_fifo_encoding encoding;
 } t_analyzer_trace_cfg_fifo;
 
 /*t t_analyzer_trace_cfg
  */
 typedef struct {
     bit enable;
+    bit ping_pong "Split each SRAM into two halves for histograms";
+    bit ping_pong_half "Half of each SRAM updated by histogram trace ops if ping_pong";
     t_analyzer_trace_cfg_value value_0;
     t_analyzer_trace_cfg_value value_1;
     t_analyzer_trace_cfg_ofs offset;
@@ -156,7 +167,7 @@ typedef struct
     bit[2]         id;
     t_analyzer_trace_address_op   address_op;
     bit[32]        op_data;
-    bit[16]        word_address;
+    bit[16]        word_address "Word address of an access; data for a time-delta encoded push";
     t_atr_alu_op   alu_op;
     bit[2]         byte_of_sram;
 } t_analyzer_trace_access_req;
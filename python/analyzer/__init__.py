@@ -1,22 +1,48 @@
-from .target_analyzer import AnalyzerCtlAddressMap,  AnalyzerCfgAddressMap, TbApbAddressMap
+from .target_analyzer import AnalyzerCtlAddressMap,  AnalyzerCfgAddressMap, TbApbAddressMap, AnalyzerSequencerAddressMap
 from .target_analyzer_filter import Filter, FilterAcceptAll, FilterChanging
 from .target_analyzer_trigger import TriggerSimple
+from .target_analyzer_sequencer import TriggerSequencer, SequencerStage, SequencerAction
 from .target_analyzer_trace import AtrAccessOp, TraceCfg
 from .analyzer_src import AnalyzerSrc
+from .analyzer_trace_ram_model import TraceRamDataPathModel
+from .trace_ram_stimulus import TraceRamRandomStimulus
+from .harness_stats import HarnessStats
+from .harness_wait import TraceOpWait, wait_for_count
+from .trace_reader import TraceReader
+from .register_shadow import RegisterShadow
+from .script_compiler import ScriptCompiler, WriteGroup
+from .trace_capture import TraceCapture
+from .histogram import HistogramTable, HistogramSampler, decode_histogram
+from .trace_encoding import rle_decode, rle_expand, rle_encode, time_delta_decode, time_delta_encode
+from .trace_vcd import VcdWriter, export_trace_vcd, trace_entries, ring_entries
+from .analyzer_pipeline import AnalyzerPipeline, FilterStage, TriggerStage, source_samples, chunked
 
 from .analyzer import t_analyzer_data4, t_analyzer_trace_op4
 from .analyzer import t_analyzer_filter_cfg
 from .analyzer import t_analyzer_trace_access_req, t_atr_address_op, t_atr_alu_op, t_analyzer_trace_access_resp
-from .analyzer import t_analyzer_trace_cfg_fifo
+from .analyzer import t_analyzer_trace_cfg_fifo, t_atr_fifo_encoding
 
 __all__ = []
-__all__ += [AnalyzerCtlAddressMap, AnalyzerCfgAddressMap, TbApbAddressMap]
+__all__ += [AnalyzerCtlAddressMap, AnalyzerCfgAddressMap, TbApbAddressMap, AnalyzerSequencerAddressMap]
 __all__ += [t_analyzer_data4, t_analyzer_trace_op4]
 __all__ += [t_analyzer_filter_cfg]
 __all__ += [t_analyzer_trace_access_req, t_atr_address_op, t_atr_alu_op, t_analyzer_trace_access_resp]
-__all__ += [t_analyzer_trace_cfg_fifo]
+__all__ += [t_analyzer_trace_cfg_fifo, t_atr_fifo_encoding]
 __all__ += [Filter, FilterAcceptAll, FilterChanging]
 __all__ += [TriggerSimple]
+__all__ += [TriggerSequencer, SequencerStage, SequencerAction]
 __all__ += [AtrAccessOp, TraceCfg]
 __all__ += [AnalyzerSrc]
+__all__ += [TraceRamDataPathModel]
+__all__ += [TraceRamRandomStimulus]
+__all__ += [HarnessStats]
+__all__ += [TraceOpWait, wait_for_count]
+__all__ += [TraceReader]
+__all__ += [RegisterShadow]
+__all__ += [ScriptCompiler, WriteGroup]
+__all__ += [TraceCapture]
+__all__ += [HistogramTable, HistogramSampler, decode_histogram]
+__all__ += [rle_decode, rle_expand, rle_encode, time_delta_decode, time_delta_encode]
+__all__ += [VcdWriter, export_trace_vcd, trace_entries, ring_entries]
+__all__ += [AnalyzerPipeline, FilterStage, TriggerStage, source_samples, chunked]
 
@@ -26,8 +26,17 @@ t_analyzer_trace_cfg_fifo = {
     "fifo_per_ram":1,
     "ram_of_fifo":1,
     "enable_push":1,
+    "encoding":2,
 }
 
+# t_atr_fifo_encoding
+class t_atr_fifo_encoding(IntEnum):
+    width = 2
+    none = 0
+    rle = 1
+    time_delta = 2
+    pass
+
 # t_atr_address_op
 class t_atr_address_op(IntEnum):
     width = 3
@@ -0,0 +1,128 @@
+#a Documentation
+"""
+Streaming golden model of the analyzer filter and trigger
+
+The stages are generators that consume and produce chunks of samples,
+so an arbitrarily long capture can be run through the model in
+constant memory:
+
+  samples -> chunks -> FilterStage -> TriggerStage -> trace ops
+
+A chunk of samples is an (N,4) uint32 numpy array of analyzer data; the
+filter stage yields (chunk, valid) pairs, and the trigger stage yields
+a list of trace op tuples (as returned by TriggerSimple.apply) per chunk.
+"""
+
+#a Imports
+import itertools
+import numpy as np
+
+#a Source stages
+#f source_samples
+def source_samples(src, n=None):
+    """
+    Generate data4 tuples from an AnalyzerSrc - forever if n is None
+    """
+    i = 0
+    while (n is None) or (i<n):
+        yield src.next_valid()
+        i += 1
+        pass
+    pass
+
+#f chunked
+def chunked(samples, chunk_size=1024):
+    """
+    Convert an iterable of data4 samples into (N,4) uint32 numpy arrays
+    of at most chunk_size samples
+    """
+    samples = iter(samples)
+    while True:
+        block = list(itertools.islice(samples, chunk_size))
+        if len(block)==0: break
+        yield np.array(block, dtype=np.uint32).reshape(-1,4)
+        pass
+    pass
+
+#a Model stages
+#c FilterStage
+class FilterStage:
+    """
+    Apply a Filter to chunks of data, yielding (chunk, valid) pairs
+    """
+    def __init__(self, filter):
+        self.filter = filter
+        pass
+    def __call__(self, chunks):
+        for chunk in chunks:
+            (valid, _) = self.filter.apply_batch(chunk)
+            yield (chunk, valid)
+            pass
+        pass
+    pass
+
+#c TriggerStage
+class TriggerStage:
+    """
+    Apply a TriggerSimple to (chunk, valid) pairs, yielding a list of
+    the trace ops generated by each chunk
+    """
+    def __init__(self, trigger):
+        self.trigger = trigger
+        pass
+    def __call__(self, chunks):
+        (op_0, op_1) = self.trigger.plan.trace_ops
+        for (chunk, valid) in chunks:
+            (op_valid, data_0, data_1) = self.trigger.apply_array(chunk, valid)
+            ops = np.flatnonzero(op_valid)
+            yield [(ov, op_0, op_1, d0, d1, 0, 0)
+                   for (ov, d0, d1) in zip(op_valid[ops].tolist(), data_0[ops].tolist(), data_1[ops].tolist())]
+            pass
+        pass
+    pass
+
+#a Pipeline
+#c AnalyzerPipeline
+class AnalyzerPipeline:
+    """
+    Filter followed by trigger, run over a stream of samples
+
+    The filter and trigger are reset when the pipeline is reset;
+    consecutive calls of trace_ops (without a reset) continue from the
+    state left by the previous call.
+    """
+    chunk_size = 1024
+    #f __init__
+    def __init__(self, filter, trigger, chunk_size=None):
+        self.filter = filter
+        self.trigger = trigger
+        if chunk_size is not None:
+            self.chunk_size = chunk_size
+            pass
+        self.filter_stage = FilterStage(filter)
+        self.trigger_stage = TriggerStage(trigger)
+        pass
+
+    #f reset
+    def reset(self):
+        self.filter.reset()
+        self.trigger.reset()
+        pass
+
+    #f trace_op_chunks
+    def trace_op_chunks(self, chunks):
+        """
+        Generate a list of trace ops for each (N,4) chunk of samples
+        """
+        return self.trigger_stage(self.filter_stage(chunks))
+
+    #f trace_ops
+    def trace_ops(self, samples):
+        """
+        Generate trace ops lazily from an iterable of data4 samples
+        """
+        for ops in self.trace_op_chunks(chunked(samples, self.chunk_size)):
+            yield from ops
+            pass
+        pass
+    pass
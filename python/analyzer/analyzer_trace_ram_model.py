@@ -0,0 +1,315 @@
+#a Documentation
+"""
+Software model of analyzer_trace_ram_data_path
+
+The model is sequential: each access is completed before the next is
+started, which is what the forwarding paths in the hardware pipeline
+achieve. Responses are generated for every access that has read_enable
+or write_enable set (after a blocked push has had its write_enable
+removed), with the memory data *before* the access, formatted by the
+byte_of_sram as the hardware does. The hardware does not read the SRAM
+for an access without read_enable, so the data for such responses is
+only meaningful in the model.
+"""
+
+#a Imports
+from array import array
+import numpy as np
+
+#a Constants
+sram_words = 2048
+ptr_mask = (1<<14)-1
+
+#a Model
+#c TraceRamDataPathModel
+class TraceRamDataPathModel:
+    """
+    Model of one analyzer trace RAM data path - a 2048x32 SRAM with ALU
+    operations and FIFO pointers
+
+    The FIFO configuration is as t_analyzer_trace_cfg_fifo, with a
+    data_width of 1 for 8-bit, 2 for 16-bit and 0 or 3 for 32-bit data,
+    and an encoding of 0 (none), 1 (run-length) or 2 (time-delta)
+
+    A time-delta escape leaves an entry pending, which is written by the
+    next push or by an idle access (with neither read_enable nor
+    write_enable); until then each push writes the previous push's entry
+    and leaves its own pending, and a push that would need an escape has
+    its delta recorded as 0xfffe instead
+    """
+    #f __init__
+    def __init__(self, data_width=0, journal=0, fifo_per_ram=1, enable_push=1, encoding=0):
+        self.store = array('I', bytes(4*sram_words))
+        self.mem = np.frombuffer(self.store, dtype=np.uint32)
+        self.configure(data_width, journal, fifo_per_ram, enable_push, encoding)
+        self.reset()
+        pass
+
+    #f configure
+    def configure(self, data_width=0, journal=0, fifo_per_ram=1, enable_push=1, encoding=0):
+        self.data_width = data_width
+        self.journal = journal
+        self.fifo_per_ram = fifo_per_ram
+        self.enable_push = enable_push
+        self.encoding = encoding
+        pass
+
+    #f configure_from
+    def configure_from(self, trace_cfg_fifo):
+        """
+        Configure from a TraceCfgFifo
+        """
+        self.configure(data_width = {32:3, 16:2, 8:1}[trace_cfg_fifo.data_width],
+                       journal = int(trace_cfg_fifo.journal),
+                       fifo_per_ram = int(trace_cfg_fifo.fifo_per_ram),
+                       enable_push = int(trace_cfg_fifo.enable_push),
+                       encoding = int(trace_cfg_fifo.encoding))
+        pass
+
+    #f reset
+    def reset(self):
+        """
+        Reset the FIFO state (but not the SRAM contents)
+        """
+        self.read_ptr = 0
+        self.write_ptr = 0
+        self.num_entries = 0
+        self.full = 0
+        self.not_empty = 0
+        self.overflowed = 0
+        self.underflowed = 0
+        self.rle_run = None
+        self.td_last_time = 0
+        self.td_pending = None
+        pass
+
+    #f fifo_status
+    def fifo_status(self):
+        """
+        Return the fifo status fields as a dictionary
+        """
+        return {"empty": int(not self.not_empty),
+                "full": self.full,
+                "overflowed": self.overflowed,
+                "underflowed": self.underflowed,
+                "entries_full": self.num_entries,
+                }
+
+    #f op_tuple
+    @staticmethod
+    def op_tuple(op):
+        """
+        Convert an AtrAccessOp to the tuple used by execute_tuples
+        """
+        return (int(op.address_op), op.read_enable, op.write_enable, op.id,
+                op.address & 0xffff, int(op.alu_op), op.data & 0xffffffff, op.byte_of_sram)
+
+    #f execute
+    def execute(self, ops):
+        """
+        Execute an iterable of AtrAccessOp, returning a list of (id, data) responses
+        """
+        op_tuple = self.op_tuple
+        return self.execute_tuples([op_tuple(op) for op in ops])
+
+    #f execute_tuples
+    def execute_tuples(self, ops):
+        """
+        Execute an iterable of (address_op, read_enable, write_enable,
+        id, word_address, alu_op, op_data, byte_of_sram) tuples,
+        returning a list of (id, data) responses
+        """
+        mem = self.store
+        responses = []
+        respond = responses.append
+        ptr_inc = 4
+        if self.data_width == 1: ptr_inc = 1
+        if self.data_width == 2: ptr_inc = 2
+        rle = (self.encoding == 1)
+        if rle: ptr_inc = 4
+        (rle_value_mask, rle_count_max) = (0xff, 0xffffff) if self.data_width == 1 else (0xffff, 0xffff)
+        rle_shift = 8 if self.data_width == 1 else 16
+        rle_run = self.rle_run if rle else None
+        td = (self.encoding == 2)
+        if td: ptr_inc = 4
+        td_last_time = self.td_last_time if td else 0
+        td_pending = self.td_pending if td else None
+        enable_push = self.enable_push
+        journal = self.journal
+        can_push_if_full = enable_push and journal
+        nearly_full_shift = 2 if self.fifo_per_ram else 3
+        nearly_full_mask = 0x7ff
+        read_ptr = self.read_ptr
+        write_ptr = self.write_ptr
+        num_entries = self.num_entries
+        full = self.full
+        not_empty = self.not_empty
+        underflowed = self.underflowed
+        for (address_op, read_enable, write_enable, id, word_address, alu_op, op_data, byte_of_sram) in ops:
+            address = word_address & 0x7ff
+            drain = td and (td_pending is not None) and (address_op == 0) and not (read_enable or write_enable)
+            if (address_op == 2) or drain: # push, or write of a pending time-delta entry
+                push = enable_push and (can_push_if_full or not full)
+                address = (write_ptr >> 2) & 0x7ff
+                byte_of_sram = write_ptr & 3
+                if rle:
+                    value = op_data & rle_value_mask
+                    count = 1
+                    if (enable_push and not_empty and (rle_run is not None) and
+                        (rle_run[0] == value) and (rle_run[1] != rle_count_max)):
+                        push = False
+                        count = rle_run[1] + 1
+                        address = ((write_ptr >> 2) - 1) & 0x7ff
+                        pass
+                    if push or count > 1:
+                        rle_run = (value, count)
+                        pass
+                    else:
+                        write_enable = 0
+                        pass
+                    op_data = (count << rle_shift) | value
+                    alu_op = 3
+                    byte_of_sram = 0
+                    pass
+                elif td:
+                    if not push:
+                        write_enable = 0
+                        pass
+                    elif drain:
+                        op_data = td_pending
+                        td_pending = None
+                        write_enable = 1
+                        pass
+                    else:
+                        delta = (op_data - td_last_time) & 0xffffffff
+                        large = delta >= 0xffff
+                        if large and (td_pending is not None): delta = 0xfffe
+                        entry = ((delta & 0xffff) << 16) | (word_address & 0xffff)
+                        td_last_time = (td_last_time + delta) & 0xffffffff
+                        if td_pending is not None:
+                            (op_data, td_pending) = (td_pending, entry)
+                            pass
+                        elif large:
+                            (op_data, td_pending) = (0xffff0000 | (delta >> 16), entry)
+                            pass
+                        else:
+                            op_data = entry
+                            pass
+                        pass
+                    alu_op = 3
+                    byte_of_sram = 0
+                    pass
+                elif not push:
+                    write_enable = 0
+                    pass
+                if push:
+                    write_ptr = (write_ptr + ptr_inc) & ptr_mask
+                    if full and journal:
+                        read_ptr = (read_ptr + ptr_inc) & ptr_mask
+                        pass
+                    else:
+                        full = int(((num_entries >> nearly_full_shift) & nearly_full_mask) == nearly_full_mask)
+                        num_entries = (num_entries + ptr_inc) & ptr_mask
+                        not_empty = 1
+                        pass
+                    pass
+                pass
+            elif address_op == 3: # pop
+                address = (read_ptr >> 2) & 0x7ff
+                byte_of_sram = read_ptr & 3
+                if not_empty:
+                    read_ptr = (read_ptr + ptr_inc) & ptr_mask
+                    not_empty = int(num_entries != ptr_inc)
+                    num_entries = (num_entries - ptr_inc) & ptr_mask
+                    full = 0
+                    pass
+                else:
+                    underflowed = 1
+                    pass
+                pass
+            elif address_op == 1: # reset_ptrs
+                rle_run = None
+                td_last_time = 0
+                td_pending = None
+                read_ptr = 0
+                write_ptr = 0
+                num_entries = 0
+                full = 0
+                not_empty = 0
+                underflowed = 0
+                self.overflowed = 0
+                pass
+            if not (read_enable or write_enable):
+                continue
+            mem_data = mem[address]
+            if write_enable:
+                if alu_op == 3:
+                    mem[address] = op_data
+                    pass
+                else:
+                    mem[address] = alu(alu_op, mem_data, op_data, byte_of_sram)
+                    pass
+                pass
+            if byte_of_sram != 0:
+                mem_data = format_resp_data(mem_data, byte_of_sram)
+                pass
+            respond((id, mem_data))
+            pass
+        self.read_ptr = read_ptr
+        self.write_ptr = write_ptr
+        self.num_entries = num_entries
+        self.full = full
+        self.not_empty = not_empty
+        self.underflowed = underflowed
+        self.rle_run = rle_run
+        self.td_last_time = td_last_time
+        self.td_pending = td_pending
+        return responses
+    pass
+
+#a ALU and response functions
+#f alu
+def alu(alu_op, mem_data, op_data, byte_of_sram):
+    """
+    Result of an ALU operation on memory data (all unsigned 32-bit)
+    """
+    if alu_op == 3: # write32
+        return op_data
+    if alu_op == 1: # write8
+        shift = byte_of_sram * 8
+        return (mem_data & ~(0xff << shift) & 0xffffffff) | ((op_data & 0xff) << shift)
+    if alu_op == 2: # write16
+        if byte_of_sram & 2:
+            return (mem_data & 0xffff) | ((op_data & 0xffff) << 16)
+        return (mem_data & 0xffff0000) | (op_data & 0xffff)
+    if alu_op == 4: # inc32
+        if mem_data == 0xffffffff: return 0
+        return mem_data + 1
+    if alu_op == 5: # sum32
+        return min(mem_data + op_data, 0xffffffff)
+    if alu_op == 6: # min32
+        return min(mem_data, op_data)
+    if alu_op == 7: # max32
+        return max(mem_data, op_data)
+    if alu_op == 8: # min_max16
+        op_l = op_data & 0xffff
+        low = min(mem_data & 0xffff, op_l)
+        high = max(mem_data >> 16, op_l)
+        return (high << 16) | low
+    if alu_op == 9: # inc16_add16
+        count = mem_data >> 16
+        if count != 0xffff: count += 1
+        else: count = 0
+        total = min((mem_data & 0xffff) + (op_data & 0xffff), 0xffff)
+        return (count << 16) | total
+    return 0
+
+#f format_resp_data
+def format_resp_data(mem_data, byte_of_sram):
+    """
+    Format memory data for an access response as the hardware does
+    """
+    if byte_of_sram == 0: return mem_data
+    if byte_of_sram == 1: return ((mem_data >> 8) & 0xff) * 0x01010101
+    if byte_of_sram == 2: return (mem_data >> 16) * 0x00010001
+    return (mem_data >> 24) * 0x01010101
@@ -0,0 +1,184 @@
+#a Documentation
+"""
+Opt-in instrumentation of test harnesses
+
+HarnessStats is a mixin for ThExecFile test harnesses (it must come
+before ThExecFile in the bases) that records, for each phase of a test
+(such as configuration, trigger wait and readout):
+
+* the simulated cycles (those waited for with bfm_wait, which includes
+  the waits of BFMs given the harness)
+
+* the wall time spent in bfm_wait, and so the simulated cycles per
+  second, and the wall time spent in Python between waits
+
+* the number of bus transactions (such as APB reads and writes) made
+  through a bus master wrapped with stats_wrap, and the simulated
+  cycles per transaction
+
+It is enabled by setting the 'harness_stats' class attribute or the
+environment variable ANALYZER_HARNESS_STATS to 1; when disabled it adds
+only a test of a flag to each bfm_wait. stats_report logs the summary,
+and is called by the harness in run__finalize.
+"""
+
+#a Imports
+import os
+import time
+
+#a Classes
+#c PhaseStats
+class PhaseStats:
+    """
+    Statistics of one phase of a test
+    """
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = 0.0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.waits = 0
+        self.cycles = 0
+        self.transactions = 0
+        self.transaction_cycles = 0
+        pass
+
+    #f summary
+    def summary(self):
+        cycles_per_second = self.cycles / self.wait_time if self.wait_time > 0 else 0
+        text = f"{self.name:16s} {self.cycles:10d} cycles {self.wall_time:8.3f}s"
+        text += f" ({self.wait_time:8.3f}s in {self.waits} waits, max {self.max_wait_time*1000:.1f}ms, {cycles_per_second:10.0f} cycles/s;"
+        text += f" {self.wall_time - self.wait_time:8.3f}s in Python)"
+        if self.transactions > 0:
+            text += f" {self.transactions} transactions, {self.transaction_cycles / self.transactions:.1f} cycles each"
+            pass
+        return text
+    pass
+
+#c TransactionProxy
+class TransactionProxy:
+    """
+    Proxy of a bus master (or of an object returned by it) that counts
+    calls of 'methods' as transactions of the harness, and wraps the
+    results of calls of 'factories' (such as ApbMaster.reg) likewise
+    """
+    def __init__(self, harness, obj, methods, factories=()):
+        self._harness = harness
+        self._obj = obj
+        self._methods = methods
+        self._factories = factories
+        pass
+
+    #f __getattr__
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        harness = self._harness
+        if name in self._factories:
+            return lambda *args, **kwargs: TransactionProxy(harness, attr(*args, **kwargs), self._methods)
+        if name in self._methods:
+            def transaction(*args, **kwargs):
+                cycles = harness.stats_cycles
+                result = attr(*args, **kwargs)
+                harness.stats_transaction(harness.stats_cycles - cycles)
+                return result
+            return transaction
+        return attr
+    pass
+
+#c HarnessStats
+class HarnessStats:
+    """
+    Instrumentation mixin for ThExecFile test harnesses
+    """
+    harness_stats = None
+    #f stats_enabled
+    def stats_enabled(self):
+        if not hasattr(self, "stats_phases"):
+            enabled = self.harness_stats
+            if enabled is None:
+                enabled = os.environ.get("ANALYZER_HARNESS_STATS", "0") not in ("", "0")
+                pass
+            self.stats_on = bool(enabled)
+            self.stats_cycles = 0
+            self.stats_phases = []
+            self.stats_current = None
+            self.stats_phase_start = time.perf_counter()
+            pass
+        return self.stats_on
+
+    #f stats_phase
+    def stats_phase(self, name):
+        """
+        Start a new phase of the test (ending the current one)
+        """
+        if not self.stats_enabled(): return
+        now = time.perf_counter()
+        if self.stats_current is not None:
+            self.stats_current.wall_time += now - self.stats_phase_start
+            pass
+        self.stats_phase_start = now
+        for phase in self.stats_phases:
+            if phase.name == name:
+                self.stats_current = phase
+                return
+            pass
+        self.stats_current = PhaseStats(name)
+        self.stats_phases.append(self.stats_current)
+        pass
+
+    #f bfm_wait
+    def bfm_wait(self, cycles):
+        if not self.stats_enabled():
+            return super().bfm_wait(cycles)
+        if self.stats_current is None: self.stats_phase("init")
+        start = time.perf_counter()
+        result = super().bfm_wait(cycles)
+        elapsed = time.perf_counter() - start
+        phase = self.stats_current
+        phase.wait_time += elapsed
+        phase.waits += 1
+        if elapsed > phase.max_wait_time: phase.max_wait_time = elapsed
+        phase.cycles += cycles
+        self.stats_cycles += cycles
+        return result
+
+    #f stats_transaction
+    def stats_transaction(self, cycles):
+        if not self.stats_enabled(): return
+        if self.stats_current is None: self.stats_phase("init")
+        self.stats_current.transactions += 1
+        self.stats_current.transaction_cycles += cycles
+        pass
+
+    #f stats_wrap
+    def stats_wrap(self, master, methods=("read", "write"), factories=("reg",)):
+        """
+        Wrap a bus master so that its transactions are counted (if
+        enabled) - by default an ApbMaster, whose transactions are the
+        reads and writes of the objects returned by 'reg'
+        """
+        if not self.stats_enabled(): return master
+        return TransactionProxy(self, master, methods, factories)
+
+    #f stats_report
+    def stats_report(self):
+        """
+        Log the summary of the phases (if enabled)
+        """
+        if not self.stats_enabled(): return
+        self.stats_phase("end")
+        total = PhaseStats("total")
+        for phase in self.stats_phases:
+            if phase.name == "end": continue
+            self.verbose.message(f"Harness stats {phase.summary()}")
+            total.wall_time += phase.wall_time
+            total.wait_time += phase.wait_time
+            total.max_wait_time = max(total.max_wait_time, phase.max_wait_time)
+            total.waits += phase.waits
+            total.cycles += phase.cycles
+            total.transactions += phase.transactions
+            total.transaction_cycles += phase.transaction_cycles
+            pass
+        self.verbose.message(f"Harness stats {total.summary()}")
+        pass
+    pass
@@ -0,0 +1,94 @@
+#a Documentation
+"""
+Waiting for events in test harnesses without sampling every cycle
+
+A harness that loops on bfm_wait(1) and reads a signal crosses from the
+simulation to Python every cycle. If the hardware provides a counter of
+the events (such as the trace_op_count output of tb_analyzer, which
+counts the valid trace ops), the harness can instead wait in strides,
+reading the counter only at the end of each stride. Until the first
+event the stride doubles (up to idle_stride); after it, each stride is
+half of the time to the target estimated from the rate of events seen
+so far (but at most double the previous stride), so Python wakes a
+number of times logarithmic in the wait rather than once per cycle.
+
+The wait may overrun the target by a few cycles if the events are
+bursty, and the counter of a clocked register lags the events by a
+cycle.
+
+tb_analyzer also captures the first 64 valid trace ops since reset
+(with the triggered data of each), so a harness can wait for the trace
+ops it expects and then read them all out, rather than sampling the
+trace op bus every cycle.
+"""
+
+#a Functions
+#f wait_for_count
+def wait_for_count(bfm_wait, read_count, n, timeout, max_stride=1024, idle_stride=16, count_mask=0xffffffff):
+    """
+    Wait until the counter read by read_count() has increased by at
+    least n, or timeout cycles have passed, using bfm_wait to wait;
+    returns (increase of the counter, cycles waited)
+    """
+    start = read_count()
+    count = 0
+    cycles = 0
+    stride = 1
+    while (count < n) and (cycles < timeout):
+        if count > 0:
+            stride = min(2 * stride, ((n - count) * cycles) // (2 * count))
+            pass
+        stride = max(1, min(stride, max_stride, timeout - cycles))
+        bfm_wait(stride)
+        cycles += stride
+        count = (read_count() - start) & count_mask
+        if count == 0:
+            stride = min(stride * 2, idle_stride)
+            pass
+        pass
+    return (count, cycles)
+
+#c TraceOpWait
+class TraceOpWait:
+    """
+    Mixin for ThExecFile harnesses of tb_analyzer (it must come before
+    ThExecFile in the bases), whose DUT outputs include trace_op_count
+    (and, to read captured trace ops, whose DUT inputs include
+    trace_op_capture_index and outputs include trace_op_capture_op and
+    trace_op_capture_data)
+    """
+    trace_op_capture_depth = 64
+    #f wait_for_trace_ops
+    def wait_for_trace_ops(self, n, timeout, max_stride=1024):
+        """
+        Wait for at least n valid trace ops (or timeout cycles),
+        returning the number seen
+        """
+        (count, cycles) = wait_for_count(self.bfm_wait, self.trace_op_count.value, n, timeout, max_stride)
+        return count
+
+    #f read_trace_ops
+    def read_trace_ops(self, n):
+        """
+        Read the first n (at most trace_op_capture_depth) valid trace
+        ops captured since reset, as a list of tuples of (op_valid,
+        op_0, op_1, data_0, data_1, data_2, data_3); this takes a
+        cycle per op
+        """
+        if n > self.trace_op_capture_depth:
+            raise Exception(f"Only {self.trace_op_capture_depth} trace ops are captured, not {n}")
+        ops = []
+        for i in range(n):
+            self.trace_op_capture_index.drive(i)
+            self.bfm_wait(1)
+            ops.append((self.trace_op_capture_op__op_valid.value(),
+                        self.trace_op_capture_op__op_0.value(),
+                        self.trace_op_capture_op__op_1.value(),
+                        self.trace_op_capture_data__data_0.value(),
+                        self.trace_op_capture_data__data_1.value(),
+                        self.trace_op_capture_data__data_2.value(),
+                        self.trace_op_capture_data__data_3.value(),
+                        ))
+            pass
+        return ops
+    pass
@@ -0,0 +1,371 @@
+#a Documentation
+"""
+Decoding of trace RAM histogram tables
+
+When the trigger trace ops are inc, sum, min, max, min_max or inc_add
+each trace RAM is a table of 2048 words indexed by the trace offset
+(the bucketed data selected by TraceCfgOffset), and the values combined
+into the table are those of the TraceCfgValue for that RAM. The two RAM
+dumps are decoded together into per-bucket count, sum, min and max (as
+available from the ops), from which the mean and percentile estimates
+are derived; the data range of each bucket is given by the offset
+bucketing tiers.
+
+The hardware does not count beyond the maximum of a field: sum32 and
+add16 saturate, and inc32 and inc16 wrap to zero. A field at its maximum
+value is flagged as saturated, and the count or sum derived from it is
+then a lower bound.
+
+Min tables must be preset to all ones (and min_max16 to 0x0000ffff)
+before capture, as an SRAM cleared to zero would record a minimum of
+zero; min and max are only reported for buckets with a count, if there
+is one, or otherwise for those that have been updated.
+
+Dumps may be stacked as (..., 2048) arrays (e.g. one row per device),
+in which case all results have the same leading dimensions. In
+ping-pong mode (TraceCfg.ping_pong) the dumps are of one 1024-word half,
+whose last bucket holds all larger offsets.
+"""
+
+#a Imports
+import time
+import numpy as np
+from .target_analyzer_trigger import TraceDataOp
+from .target_analyzer_trace import AtrAccessOp
+
+#a HistogramTable
+#c HistogramTable
+class HistogramTable:
+    """
+    Decoded histogram - arrays of (..., 2048) per-bucket statistics
+
+    low, high: inclusive range of the data (before offset bucketing) of each bucket
+    count, sum: uint64 (or None if not recorded)
+    min, max: float64 with NaN for buckets with no data (or None if not recorded)
+    mean: float64 sum/count with NaN for empty buckets (or None)
+    count_saturated, sum_saturated: boolean flags
+    """
+    #f __init__
+    def __init__(self, low, high, count=None, sum=None, min=None, max=None, count_saturated=None, sum_saturated=None):
+        self.low = low
+        self.high = high
+        self.count = count
+        self.sum = sum
+        self.min = min
+        self.max = max
+        self.count_saturated = count_saturated
+        self.sum_saturated = sum_saturated
+        self.mean = None
+        if (count is not None) and (sum is not None):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.mean = np.where(count > 0, sum / np.maximum(count, 1), np.nan)
+                pass
+            pass
+        pass
+
+    #f saturated
+    def saturated(self):
+        """
+        Return a flag per table (i.e. over the last axis) of whether any
+        bucket has saturated
+        """
+        flags = np.zeros(self.low.shape[:-1], dtype=bool)
+        for s in (self.count_saturated, self.sum_saturated):
+            if s is not None: flags = flags | s.any(axis=-1)
+            pass
+        return flags
+
+    #f total
+    def total(self):
+        """
+        Total count over all buckets
+        """
+        if self.count is None: raise Exception("Histogram has no counts")
+        return self.count.sum(axis=-1)
+
+    #f percentile
+    def percentile(self, q):
+        """
+        Estimate the q'th percentile (0 to 100) of the data from the
+        bucket counts, interpolating linearly within the bucket (from the
+        first occupied bucket); returns NaN for an empty table
+        """
+        if self.count is None: raise Exception("Histogram has no counts")
+        count = self.count.astype(np.float64)
+        cum = np.cumsum(count, axis=-1)
+        total = cum[...,-1:]
+        target = total * (q / 100.0)
+        before = (cum < target) | (cum == 0)
+        index = np.minimum(before.sum(axis=-1, keepdims=True), count.shape[-1]-1)
+        below = np.take_along_axis(cum - count, index, axis=-1)
+        in_bucket = np.take_along_axis(count, index, axis=-1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(in_bucket > 0, (target - below) / in_bucket, 0.0)
+            pass
+        low = np.take_along_axis(np.broadcast_to(self.low, count.shape), index, axis=-1).astype(np.float64)
+        high = np.take_along_axis(np.broadcast_to(self.high, count.shape), index, axis=-1).astype(np.float64)
+        result = low + fraction * (high + 1 - low)
+        result = np.where(total > 0, np.minimum(result, high), np.nan)
+        return result[...,0]
+    pass
+
+#a Decoding
+#f bucket_ranges
+def bucket_ranges(trace_cfg, n=2048, address=0):
+    """
+    Return the (low, high) data ranges of the n histogram buckets
+    starting at 'address'
+    """
+    (low, high) = trace_cfg.offset.offset_range(np.arange(address, address+n))
+    if trace_cfg.ping_pong:
+        high[-1] = 0xffffffff
+        pass
+    return (low, high)
+
+#f decode_histogram
+def decode_histogram(ram_0, ram_1, trace_cfg, trace_ops, address=0):
+    """
+    Decode the dumps of the two trace RAMs (arrays of (..., n) 32-bit
+    words read from 'address', by default the whole 2048-word tables)
+    given the TraceCfg and the trace ops (op_0, op_1) - TraceDataOp, or
+    names such as "inc_add" - that produced them; a RAM whose op is push
+    or write (or which is None) is ignored
+    """
+    stats = {}
+    updated = []
+    def combine(name, value, reduce):
+        if name in stats: value = reduce(stats[name], value)
+        stats[name] = value
+        pass
+    for (ram, op) in ((ram_0, trace_ops[0]), (ram_1, trace_ops[1])):
+        if ram is None: continue
+        if isinstance(op, str): op = TraceDataOp[op.upper()]
+        d = np.asarray(ram, dtype=np.uint32).astype(np.uint64)
+        if op == TraceDataOp.INC:
+            combine("count", d, np.maximum)
+            combine("count_saturated", d == 0xffffffff, np.logical_or)
+            pass
+        elif op == TraceDataOp.SUM:
+            combine("sum", d, np.maximum)
+            combine("sum_saturated", d == 0xffffffff, np.logical_or)
+            pass
+        elif op == TraceDataOp.MIN:
+            combine("min", d, np.minimum)
+            updated.append(d != 0xffffffff)
+            pass
+        elif op == TraceDataOp.MAX:
+            combine("max", d, np.maximum)
+            updated.append(d != 0)
+            pass
+        elif op == TraceDataOp.MIN_MAX:
+            combine("min", d & 0xffff, np.minimum)
+            combine("max", d >> 16, np.maximum)
+            updated.append(d != 0xffff)
+            pass
+        elif op == TraceDataOp.INC_ADD:
+            combine("count", d >> 16, np.maximum)
+            combine("sum", d & 0xffff, np.maximum)
+            combine("count_saturated", (d >> 16) == 0xffff, np.logical_or)
+            combine("sum_saturated", (d & 0xffff) == 0xffff, np.logical_or)
+            pass
+        pass
+
+    count = stats.get("count")
+    if count is not None:
+        updated = [count > 0]
+        pass
+    occupied = np.logical_or.reduce(updated) if len(updated) > 0 else None
+    hmin = stats.get("min")
+    hmax = stats.get("max")
+    if hmin is not None: hmin = np.where(occupied, hmin.astype(np.float64), np.nan)
+    if hmax is not None: hmax = np.where(occupied, hmax.astype(np.float64), np.nan)
+
+    n = np.shape(ram_0 if ram_0 is not None else ram_1)[-1]
+    (low, high) = bucket_ranges(trace_cfg, n, address)
+    return HistogramTable(low=low, high=high,
+                          count=count, sum=stats.get("sum"),
+                          min=hmin, max=hmax,
+                          count_saturated=stats.get("count_saturated"),
+                          sum_saturated=stats.get("sum_saturated"))
+
+#a Sampling
+#c HistogramSampler
+class HistogramSampler:
+    """
+    Continuous host-side accumulation of trace RAM histograms
+
+    Each sample reads and clears the histogram tables (so the hardware
+    counts only the events since the previous sample, and is unlikely to
+    saturate), decodes them, and adds the counts and sums to 64-bit host
+    counters (and takes the maximum of max tables). Min tables cannot be
+    sampled in this way, as a cleared entry records a minimum of zero.
+
+    read_clear is a callable taking (ram, address, n) that reads and
+    clears n words of a trace RAM and returns them - see the read_clear_*
+    methods.
+
+    In ping-pong mode swap is a callable that swaps the halves (e.g.
+    performing TraceCfg.apb_writes_swap); each sample swaps the halves
+    and then reads and clears the half no longer being updated, so no
+    events are lost to the clear.
+    """
+    #f __init__
+    def __init__(self, read_clear, trace_cfg, trace_ops, address=0, n=2048, swap=None, clock=None):
+        for op in trace_ops:
+            if isinstance(op, str): op = TraceDataOp[op.upper()]
+            if op in (TraceDataOp.MIN, TraceDataOp.MIN_MAX):
+                raise Exception(f"Histogram sampling cannot read and clear {op} tables")
+            pass
+        self.read_clear = read_clear
+        self.trace_cfg = trace_cfg
+        self.trace_ops = trace_ops
+        self.address = address
+        self.n = n
+        self.swap = swap
+        if swap is not None:
+            (_, self.n) = trace_cfg.ping_pong_table()
+            pass
+        self.clock = clock
+        if self.clock is None: self.clock = time.perf_counter
+        self.reset()
+        pass
+
+    #f reset
+    def reset(self):
+        """
+        Reset the host counters (but not the hardware tables)
+        """
+        self.count = None
+        self.sum = None
+        self.max = None
+        self.count_saturated = np.zeros(self.n, dtype=bool)
+        self.sum_saturated = np.zeros(self.n, dtype=bool)
+        self.saturation_events = []
+        self.samples = 0
+        self.read_time = 0.0
+        self.start_time = self.clock()
+        pass
+
+    #f read_clear_apb
+    @staticmethod
+    def read_clear_apb(reader, read_reg, write_reg):
+        """
+        read_clear using APB accesses through a TraceReader
+        """
+        return lambda ram, address, n: reader.read_table_apb(read_reg, write_reg, address, n, clear=True, ram=ram)
+
+    #f read_clear_scripted
+    @staticmethod
+    def read_clear_scripted(reader, script, invoke):
+        """
+        read_clear using dbg master scripts through a TraceReader
+        """
+        return lambda ram, address, n: reader.read_table_scripted(script, invoke, address, n, clear=True, ram=ram)
+
+    #f read_clear_model
+    @staticmethod
+    def read_clear_model(models):
+        """
+        read_clear of a pair of TraceRamDataPathModel, using the same
+        AtrAccessOp.clear accesses as read_clear_inc
+        """
+        def read_clear(ram, address, n):
+            resps = models[ram].execute(AtrAccessOp.read_clear_range(address, n))
+            return np.array([d for (id, d) in resps], dtype=np.uint32)
+        return read_clear
+
+    #f sample
+    def sample(self):
+        """
+        Read and clear the tables, and accumulate them; returns the
+        decoded HistogramTable of the sample
+        """
+        t = self.clock()
+        (address, n) = (self.address, self.n)
+        if self.swap is not None:
+            self.swap()
+            (address, n) = self.trace_cfg.ping_pong_table()
+            pass
+        rams = [None, None]
+        for i in range(2):
+            op = self.trace_ops[i]
+            if isinstance(op, str): op = TraceDataOp[op.upper()]
+            if op in (None, TraceDataOp.PUSH, TraceDataOp.WRITE): continue
+            rams[i] = self.read_clear(i, address, n)
+            pass
+        self.read_time += self.clock() - t
+        h = decode_histogram(rams[0], rams[1], self.trace_cfg, self.trace_ops, self.bucket_address())
+        if h.count is not None:
+            if self.count is None: self.count = np.zeros(self.n, dtype=np.uint64)
+            self.count += h.count
+            pass
+        if h.sum is not None:
+            if self.sum is None: self.sum = np.zeros(self.n, dtype=np.uint64)
+            self.sum += h.sum
+            pass
+        if h.max is not None:
+            if self.max is None: self.max = np.full(self.n, np.nan)
+            self.max = np.fmax(self.max, h.max)
+            pass
+        for (name, flags, acc) in (("count", h.count_saturated, self.count_saturated),
+                                   ("sum",   h.sum_saturated,   self.sum_saturated)):
+            if flags is None: continue
+            buckets = np.flatnonzero(flags)
+            if len(buckets) > 0:
+                self.saturation_events.append((self.samples, name, buckets))
+                acc |= flags
+                pass
+            pass
+        self.samples += 1
+        return h
+
+    #f run
+    def run(self, period, num_samples, sleep=None):
+        """
+        Sample every 'period' seconds for num_samples samples; sleep
+        defaults to time.sleep (a simulation would supply its own wait)
+        """
+        if sleep is None: sleep = time.sleep
+        for i in range(num_samples):
+            next_time = self.clock() + period
+            self.sample()
+            delay = next_time - self.clock()
+            if delay > 0: sleep(delay)
+            pass
+        pass
+
+    #f bucket_address
+    def bucket_address(self):
+        """
+        Return the bucket (offset) of the first word of the tables read;
+        a ping-pong half holds buckets from 0 whichever half it is
+        """
+        if self.swap is not None: return 0
+        return self.address
+
+    #f histogram
+    def histogram(self):
+        """
+        Return the accumulated HistogramTable; buckets flagged as
+        saturated saturated in at least one sample, so their count or
+        sum is a lower bound
+        """
+        (low, high) = bucket_ranges(self.trace_cfg, self.n, self.bucket_address())
+        return HistogramTable(low=low, high=high, count=self.count, sum=self.sum, max=self.max,
+                              count_saturated=self.count_saturated, sum_saturated=self.sum_saturated)
+
+    #f overhead
+    def overhead(self):
+        """
+        Return the sampling overhead - time spent reading and clearing
+        tables, in total, per sample, and as a fraction of the elapsed time
+        """
+        elapsed = self.clock() - self.start_time
+        return {"samples": self.samples,
+                "read_time": self.read_time,
+                "read_time_per_sample": self.read_time / max(self.samples, 1),
+                "elapsed": elapsed,
+                "fraction": self.read_time / elapsed if elapsed > 0 else 0.0,
+                "saturation_events": len(self.saturation_events),
+                }
+    pass
@@ -0,0 +1,114 @@
+#a Documentation
+"""
+Shadow of the analyzer CSRs, used to remove redundant register writes
+
+The apb_writes methods of the configuration classes return every
+register; passing the result through a RegisterShadow returns only the
+writes that change the state of the hardware, given the values last
+written.
+
+Most registers are configuration registers, where only the final value
+of a register matters; so of a run of consecutive writes to the same
+register only the last is kept, and that only if it differs from the
+shadow value.
+
+Control registers (such as trigger_base) are levels whose sequence
+matters; a write is dropped if it does not change the register, or if
+it lies between the previous and next values in the same run (every
+bit of the write matches one of them, and the bits in the 'stable
+mask', such as an enable, are unchanged across all three), so that no
+pulse is lost.
+"""
+
+#a RegisterShadow
+#c RegisterShadow
+class RegisterShadow:
+    """
+    Last values written to CSRs, keyed by register address
+    """
+    #f __init__
+    def __init__(self):
+        self.values = {}
+        self.stable_masks = {}
+        pass
+
+    #f for_cfg_map
+    @classmethod
+    def for_cfg_map(cls, map):
+        """
+        Create a shadow for an AnalyzerCfgAddressMap, with trigger_base
+        a control register whose enable must be stable
+        """
+        shadow = cls()
+        shadow.set_control(map.trigger_base, stable_mask=1)
+        return shadow
+
+    #f set_control
+    def set_control(self, reg, stable_mask=0):
+        """
+        Mark a register as a control register
+        """
+        self.stable_masks[reg.Address()] = stable_mask
+        pass
+
+    #f invalidate
+    def invalidate(self, regs=None):
+        """
+        Invalidate the shadow values of some registers (or all of
+        them), e.g. after a reset
+        """
+        if regs is None:
+            self.values = {}
+            return
+        for reg in regs:
+            self.values.pop(reg.Address(), None)
+            pass
+        pass
+
+    #f droppable
+    @staticmethod
+    def droppable(prev, value, next, stable_mask):
+        if (prev ^ value) & stable_mask: return False
+        if (value ^ next) & stable_mask: return False
+        if (prev & next) & ~value: return False
+        if value & ~(prev | next): return False
+        return True
+
+    #f writes
+    def writes(self, writes):
+        """
+        Return the writes of a list of (reg, value) that must be
+        performed, and update the shadow as though they had been
+        """
+        result = []
+        i = 0
+        while i < len(writes):
+            address = writes[i][0].Address()
+            j = i
+            while (j+1 < len(writes)) and (writes[j+1][0].Address() == address):
+                j += 1
+                pass
+            run = writes[i:j+1]
+            i = j+1
+            prev = self.values.get(address)
+            if address not in self.stable_masks:
+                (reg, value) = run[-1]
+                if value != prev:
+                    result.append((reg, value))
+                    self.values[address] = value
+                    pass
+                continue
+            stable_mask = self.stable_masks[address]
+            for k in range(len(run)):
+                (reg, value) = run[k]
+                if value == prev: continue
+                if (prev is not None) and (k+1 < len(run)):
+                    if self.droppable(prev, value, run[k+1][1], stable_mask): continue
+                    pass
+                result.append((reg, value))
+                prev = value
+                pass
+            self.values[address] = prev
+            pass
+        return result
+    pass
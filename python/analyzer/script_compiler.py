@@ -0,0 +1,143 @@
+#a Documentation
+"""
+Compile CSR accesses into dbg master APB scripts
+
+The accesses are given as a list of WriteGroups, which are performed
+in order. The writes within an ordered group are performed in the
+order given; those within an unordered group may be reordered, and
+only the final value written to each register in the group is
+written. For example, AnalyzerSrc.apb_writes must write the config
+register last (an ordered group), whereas all the trigger register
+writes are independent (an unordered group).
+
+Unordered groups are sorted by address, starting with the current
+address page; 'addr1' is set only when the page changes. Writes to
+consecutive addresses may be merged into a single multi-word op_write
+if the compiler is given the stride (see ScriptCompiler).
+
+A read of a register may be included in an ordered group as (reg, None).
+
+The 'Script' class (regress.apb.Script or equivalent, providing
+op_set, op_write, op_read and compile_script) is supplied by the
+caller.
+"""
+
+#a WriteGroup
+#c WriteGroup
+class WriteGroup:
+    """
+    A list of (reg, data) writes, which are either ordered or unordered
+    """
+    def __init__(self, writes, ordered=False):
+        self.writes = list(writes)
+        self.ordered = ordered
+        pass
+    pass
+
+#a ScriptCompiler
+#c ScriptCompiler
+class ScriptCompiler:
+    """
+    Compiler of WriteGroups to dbg master APB scripts
+
+    stride is the register address increment per word of a multi-word
+    op_write, or None (the default) to write one word per op_write;
+    max_words limits the number of words written or read per script
+    (None for no limit)
+
+    The APB script master and its Script class are in the utils
+    library (regress.apb), not in this repository, and the analyzer
+    tests only use single-word op_writes (as does TraceReader); so the
+    address behaviour of a multi-word op_write is not relied on unless
+    the caller states it with a stride - for example 1 if each word is
+    written to the next register (the APB targets here decode paddr as
+    a register index).
+    """
+    stride = None
+    max_words = None
+    #f __init__
+    def __init__(self, script, stride=None, max_words=None):
+        self.script = script
+        if stride is not None: self.stride = stride
+        if max_words is not None: self.max_words = max_words
+        pass
+
+    #f accesses
+    def accesses(self, groups):
+        """
+        Flatten the groups into a list of (address, data) (with data of
+        None for a read), reordering the unordered groups
+        """
+        accesses = []
+        page = None
+        for group in groups:
+            group_accesses = [(reg.Address(), data) for (reg, data) in group.writes]
+            if not group.ordered:
+                last_writes = {}
+                for (address, data) in group_accesses:
+                    last_writes[address] = data
+                    pass
+                group_accesses = sorted(last_writes.items(),
+                                        key=lambda ad:((ad[0]>>8) != page, ad[0]))
+                pass
+            if len(group_accesses) > 0:
+                page = group_accesses[-1][0] >> 8
+                pass
+            accesses += group_accesses
+            pass
+        return accesses
+
+    #f script_ops
+    def script_ops(self, groups):
+        """
+        Generate lists of script ops (one list per script) for the groups
+        """
+        script = self.script
+        scripts = []
+        ops = []
+        page = None
+        words = 0
+        run = None # (address, [data]) of a write being built
+        for (address, data) in self.accesses(groups) + [(None, None)]:
+            if run is not None:
+                mergeable = (self.stride is not None) and (data is not None) and ((address>>8) == page)
+                if mergeable and (address == run[0] + self.stride * len(run[1])):
+                    if (self.max_words is None) or (words < self.max_words):
+                        run[1].append(data)
+                        words += 1
+                        continue
+                    pass
+                ops.append(script.op_write(run[0] & 0xff, 32, run[1]))
+                run = None
+                pass
+            if address is None: break
+            if (self.max_words is not None) and (words >= self.max_words):
+                scripts.append(ops)
+                ops = []
+                page = None
+                words = 0
+                pass
+            if (address>>8) != page:
+                page = address>>8
+                ops.append(script.op_set("addr1", page & 0xff))
+                pass
+            words += 1
+            if data is None:
+                ops.append(script.op_read(address & 0xff, 32))
+                pass
+            else:
+                run = (address, [data])
+                pass
+            pass
+        if len(ops) > 0:
+            scripts.append(ops)
+            pass
+        return scripts
+
+    #f compile
+    def compile(self, groups):
+        """
+        Compile the groups to a list of compiled scripts
+        """
+        return [self.script.compile_script(ops) for ops in self.script_ops(groups)]
+    pass
@@ -91,6 +91,8 @@ class TriggerTraceOpCsr(Csr):
 #c Trace config map
 class TraceCfgCsr(Csr):
     _fields = {0:  CsrField(width=1, name="enable", brief="en", doc="Enable trace"),
+               1:  CsrField(width=1, name="ping_pong", brief="pp", doc="Split each SRAM into two halves for histograms"),
+               2:  CsrField(width=1, name="ping_pong_half", brief="pph", doc="Half of each SRAM updated by histogram trace ops"),
               }
 
 class TraceCfgFifosCsr(Csr):
@@ -99,11 +101,13 @@ class TraceCfgFifosCsr(Csr):
                3:  CsrField(width=1, name="fifo_0_fifo_per_ram", brief="fpr0", doc="Trace op for capture 2"),
                4:  CsrField(width=1, name="fifo0_ram_of_fifo", brief="ram0", doc="Trace op for capture 3"),
                5:  CsrField(width=1, name="fifo0_enable_push", brief="push0", doc="Trace op for capture 3"),
+               6:  CsrField(width=2, name="fifo0_encoding", brief="enc0", doc="Push encoding (none, run-length, time-delta)"),
                16:  CsrField(width=2, name="fifo_1_width", brief="width1", doc="Trace op for capture 1"),
                18:  CsrField(width=1, name="fifo_1_journal", brief="journal1", doc="Trace op for capture 1"),
-               21:  CsrField(width=1, name="fifo_1_fifo_per_ram", brief="fpr1", doc="Trace op for capture 2"),
-               22:  CsrField(width=1, name="fifo1_ram_of_fifo", brief="ram1", doc="Trace op for capture 3"),
-               23:  CsrField(width=1, name="fifo1_enable_push", brief="push1", doc="Trace op for capture 3"),
+               19:  CsrField(width=1, name="fifo_1_fifo_per_ram", brief="fpr1", doc="Trace op for capture 2"),
+               20:  CsrField(width=1, name="fifo1_ram_of_fifo", brief="ram1", doc="Trace op for capture 3"),
+               21:  CsrField(width=1, name="fifo1_enable_push", brief="push1", doc="Trace op for capture 3"),
+               22:  CsrField(width=2, name="fifo1_encoding", brief="enc1", doc="Push encoding (none, run-length, time-delta)"),
               }
 
 class TraceCfgBaseCsr(Csr):
@@ -153,6 +157,55 @@ class AnalyzerCfgAddressMap(Map):
              MapCsr(reg=37, name="trace_value_1_shift_size", brief="tvs1", csr=TraceCfgValueShiftSizeCsr, doc="trace value shift size"),
              ]
              
+#a CSRs for the trigger sequencer (apb_target_analyzer)
+class SequencerConfigCsr(Csr):
+    _fields = {0:  CsrField(width=1, name="reset", brief="rst", doc="Hold the trigger in reset (clears the trace pointers and done)"),
+               1:  CsrField(width=1, name="enable", brief="en", doc="Enable the trigger"),
+               2:  CsrField(width=1, name="readback", brief="rdb", doc="Read trace data from the FIFO to APB"),
+               7:  CsrField(width=1, name="circular", brief="circ", doc="Run the trace as a circular buffer"),
+               8:  CsrField(width=2, name="stage", brief="stg", doc="Trigger stage for writes of trigger, mask and compare"),
+              }
+class SequencerStatusCsr(Csr):
+    _fields = {0:  CsrField(width=1, name="apb_reset", brief="rst", doc="Reset as written"),
+               1:  CsrField(width=1, name="apb_enable", brief="en", doc="Enable as written"),
+               2:  CsrField(width=1, name="readback", brief="rdb", doc="Readback as written"),
+               3:  CsrField(width=1, name="trace_valid", brief="tv", doc="Trace data valid"),
+               4:  CsrField(width=1, name="trigger_reset", brief="trst", doc="Trigger in reset"),
+               5:  CsrField(width=1, name="trigger_enable", brief="ten", doc="Trigger enabled"),
+               6:  CsrField(width=1, name="trigger_done", brief="done", doc="Trigger has completed"),
+               7:  CsrField(width=1, name="circular", brief="circ", doc="Circular as written"),
+               8:  CsrField(width=1, name="enable_return", brief="er", doc="Analyzer enable return"),
+               9:  CsrField(width=1, name="selected", brief="sel", doc="Analyzer selected"),
+               10: CsrField(width=2, name="stage", brief="stg", doc="Current trigger stage"),
+               16: CsrField(width=16, name="residence", brief="res", doc="Current residence counter"),
+              }
+class SequencerTriggerCsr(Csr):
+    _fields = {0:  CsrField(width=16, name="counter", brief="cnt", doc="Residence count for the stage; 0 for forever"),
+               16: CsrField(width=2, name="if_true", brief="ift", doc="Stage to enter on a match"),
+               20: CsrField(width=3, name="action_if_true", brief="actt", doc="Action on a match"),
+               24: CsrField(width=2, name="if_false", brief="iff", doc="Stage to enter on no match"),
+               28: CsrField(width=3, name="action_if_false", brief="actf", doc="Action on no match"),
+              }
+class SequencerSignalCsr(Csr):
+    _fields = {0:  CsrField(width=32, name="value", brief="val", doc="32-bit value"),
+              }
+class SequencerMuxControlCsr(Csr):
+    _fields = {0:  CsrField(width=1, name="enable", brief="en", doc="Enable the analyzer mux"),
+               1:  CsrField(width=1, name="write_data", brief="wr", doc="Write data to the analyzer mux"),
+               4:  CsrField(width=3, name="nybbles", brief="nyb", doc="Number of nybbles to write, less one"),
+               8:  CsrField(width=24, name="data", brief="data", doc="Enable chain length or data to write"),
+              }
+
+#c AnalyzerSequencerAddressMap
+class AnalyzerSequencerAddressMap(Map):
+    _map = [ MapCsr(reg=0, name="config", brief="cfg", csr=SequencerConfigCsr, doc="Config (write) or status (read, SequencerStatusCsr)"),
+             MapCsr(reg=1, name="trigger", brief="trig", csr=SequencerTriggerCsr, doc="Trigger stage transitions and counter"),
+             MapCsr(reg=2, name="mask", brief="mask", csr=SequencerSignalCsr, doc="Trigger stage mask"),
+             MapCsr(reg=3, name="compare", brief="cmp", csr=SequencerSignalCsr, doc="Trigger stage compare"),
+             MapCsr(reg=4, name="mux_control", brief="mux", csr=SequencerMuxControlCsr, doc="Analyzer mux control"),
+             MapCsr(reg=8, name="trace_data", brief="data", csr=SequencerSignalCsr, doc="Trace data readback"),
+             ]
+
 #a CSRs for TbSrc
 class TbSrcConfigCsr(Csr):
     _fields = {0:  CsrField(width=4, name="tgt_mode", brief="tgt", doc="Invalid, Valid, ..."),
@@ -183,6 +236,8 @@ class AnalyzerTraceAccessAddressMap(Map):
              MapCsr(reg=2, name="alu_op", brief="add", csr=TraceAccCsr, doc="address"),
              MapCsr(reg=3, name="resp_data", brief="add", csr=TraceAccCsr, doc="address"),
              MapCsr(reg=4, name="pop_fifo_0", brief="pop0", csr=TraceAccCsr, doc="Pop fifo 0"),
+             MapCsr(reg=5, name="read_inc", brief="rdinc", csr=TraceAccCsr, doc="Read at address and post-increment address"),
+             MapCsr(reg=6, name="read_clear_inc", brief="rdclr", csr=TraceAccCsr, doc="Read and clear at address and post-increment address"),
              MapCsr(reg=8, name="fifo_status_0", brief="fifo0", csr=TraceAccCsr, doc="Fifo status"),
              MapCsr(reg=9, name="fifo_status_1", brief="fifo1", csr=TraceAccCsr, doc="Fifo status"),
              MapCsr(reg=10, name="fifo_status_2", brief="fifo2", csr=TraceAccCsr, doc="Fifo status"),
@@ -4,6 +4,7 @@ CSRs for apb_target_analyzer_cfg and Filter classes
 """
 
 #a Imports
+import numpy as np
 from cdl.utils.csr   import Csr, CsrField, CsrFieldZero, Map, MapCsr
 
 #a Filter classes
@@ -129,6 +130,45 @@ class Filter:
             self.data = data
             pass
         return changed
+
+    #f apply_batch
+    def apply_batch(self, array):
+        """
+        Apply the filter to an (N,4) array of analyzer data, returning
+        a boolean accept mask and the final 'last valid data' tuple
+
+        This matches N successive calls of 'apply' bit-for-bit.
+
+        A must-change comparison is always against the last *accepted*
+        data; but a data value that matches and is rejected has (by
+        definition) the same must-change bits as the last accepted
+        data, so the comparison can be made against the previous
+        *matching* data instead - which needs no sequential scan.
+        """
+        data = np.asarray(array, dtype=np.uint32).reshape(-1,4)
+        mask  = np.array(self.match_mask,  dtype=np.uint32)
+        value = np.array(self.match_value, dtype=np.uint32)
+        accept = ((data & mask) == value).all(axis=1)
+        if self.accept_unchanging:
+            if self.must_be_nonzero is not None:
+                nz = np.array(self.must_be_nonzero, dtype=np.uint32)
+                accept &= (data & nz).any(axis=1)
+                pass
+            pass
+        else:
+            mc = np.array(self.must_change, dtype=np.uint32)
+            matching = np.flatnonzero(accept)
+            keys = data[matching] & mc
+            last_keys = np.empty_like(keys)
+            last_keys[:1] = np.array(self.data, dtype=np.uint32) & mc
+            last_keys[1:] = keys[:-1]
+            accept[matching] = (keys != last_keys).any(axis=1)
+            pass
+        accepted = np.flatnonzero(accept)
+        if len(accepted) > 0:
+            self.data = tuple(int(d) for d in data[accepted[-1]])
+            pass
+        return (accept, self.data)
     pass
 
 class FilterAcceptAll(Filter):
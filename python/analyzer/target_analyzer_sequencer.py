@@ -0,0 +1,369 @@
+#a Documentation
+"""
+Configuration and model of the multi-stage trigger sequencer of
+apb_target_analyzer
+
+The sequencer has four stages; each has a mask and compare for the
+32-bit trigger signal (analyzer data 0), a residence counter, and an
+action and next stage for each of match and no match. A signal matches
+if all the bits set in the mask match compare, and (if compare has any
+bits set outside the mask) at least one of those bits is set in the
+signal.
+
+The actions determine what is stored in the trace FIFO and when the
+stage changes; 'reside' actions move to the next stage only once the
+stage has been resident for 'counter' stores (or immediately if the
+counter is 0).
+
+TriggerSequencer.step models the hardware one sample at a time;
+TriggerSequencer.run is a compiled simulation of an array of samples,
+using a transition table indexed by stage and match result and numpy to
+skip through the samples between stage transitions.
+"""
+
+#a Imports
+from enum import Enum
+import numpy as np
+
+#a Enum classes
+#c SequencerAction
+class SequencerAction(Enum):
+    """
+    Action of a trigger stage, as t_analyzer_action
+    """
+    IDLE = 0
+    RESET_COUNTER = 1
+    STORE_SIGNAL_AND_TRANSITION = 2
+    STORE_SIGNAL_AND_RESIDE = 3
+    STORE_TIME_AND_RESIDE = 4
+    STORE_TIME_AND_TRANSITION = 5
+    STORE_RESIDENCE_AND_TRANSITION = 6
+    END = 7
+    pass
+
+#c Action properties, indexed by action value
+# store type - 0 for none, 1 for signal, 2 for time, 3 for residence
+action_store = (0, 0, 1, 1, 2, 2, 3, 0)
+# transition kind - 0 for hold counter, 1 for reset counter, 2 for transition, 3 for reside, 4 for end
+action_kind = (0, 1, 2, 3, 3, 2, 2, 4)
+
+#a SequencerStage
+#c SequencerStage
+class SequencerStage:
+    """
+    A stage of the trigger sequencer
+    """
+    mask = 0
+    compare = 0
+    counter = 0
+    if_true = 0
+    if_false = 0
+    action_if_true = SequencerAction.IDLE
+    action_if_false = SequencerAction.IDLE
+    #f __init__
+    def __init__(self, mask=0, compare=0, counter=0, if_true=0, if_false=0, action_if_true=None, action_if_false=None):
+        self.mask = mask
+        self.compare = compare
+        self.counter = counter
+        self.if_true = if_true
+        self.if_false = if_false
+        if action_if_true is not None: self.action_if_true = action_if_true
+        if action_if_false is not None: self.action_if_false = action_if_false
+        pass
+
+    #f matches
+    def matches(self, signal):
+        """
+        Return an array of whether each signal (an array of 32-bit values) matches
+        """
+        signal = np.asarray(signal, dtype=np.uint32)
+        mask = np.uint32(self.mask & 0xffffffff)
+        any_bits = np.uint32(self.compare & ~self.mask & 0xffffffff)
+        result = (signal & mask) == (np.uint32(self.compare & 0xffffffff) & mask)
+        if any_bits != 0:
+            result &= (signal & any_bits) != 0
+            pass
+        return result
+
+    #f reg_value
+    def reg_value(self):
+        data = self.counter & 0xffff
+        data += (self.if_true & 3) << 16
+        data += self.action_if_true.value << 20
+        data += (self.if_false & 3) << 24
+        data += self.action_if_false.value << 28
+        return data
+    pass
+
+#a TriggerSequencer
+#c TriggerSequencer
+class TriggerSequencer:
+    """
+    Trigger sequencer configuration and model
+
+    The model stores at most fifo_size entries: if circular is False the
+    sequencer ends when a store would overflow the FIFO, else the FIFO
+    keeps the last fifo_size entries stored.
+    """
+    depth = 4
+    fifo_size = 2047
+    circular = False
+    #f __init__
+    def __init__(self, stages=None, circular=None):
+        self.stages = [SequencerStage() for i in range(self.depth)]
+        if stages is not None:
+            for (i, stage) in enumerate(stages):
+                if i >= self.depth:
+                    raise Exception(f"Too many stages for trigger sequencer of depth {self.depth}")
+                self.stages[i] = stage
+                pass
+            pass
+        if circular is not None: self.circular = circular
+        self.reset()
+        pass
+
+    #f capture_after
+    @classmethod
+    def capture_after(cls, mask, compare, n):
+        """
+        Sequencer that waits for the signal to match, stores it, stores n
+        further signals, and ends
+        """
+        return cls([SequencerStage(mask=mask, compare=compare, counter=1, if_true=1, if_false=0,
+                                   action_if_true=SequencerAction.STORE_SIGNAL_AND_RESIDE),
+                    SequencerStage(counter=n, if_true=2, if_false=1,
+                                   action_if_true=SequencerAction.STORE_SIGNAL_AND_RESIDE),
+                    SequencerStage(counter=0, if_true=2, if_false=2,
+                                   action_if_true=SequencerAction.END,
+                                   action_if_false=SequencerAction.END),
+        ])
+
+    #f apb_writes_control
+    def apb_writes_control(self, map, reset=False, enable=False, readback=False, stage=0):
+        """
+        Writes of the config register
+        """
+        data = int(reset) + (int(enable) << 1) + (int(readback) << 2) + (int(self.circular) << 7) + ((stage & 3) << 8)
+        return [(map.config, data)]
+
+    #f apb_writes
+    def apb_writes(self, map):
+        """
+        Writes to configure all the stages, with the trigger held in reset
+        """
+        writes = []
+        for (i, stage) in enumerate(self.stages):
+            writes += self.apb_writes_control(map, reset=True, stage=i)
+            writes.append( (map.trigger, stage.reg_value()) )
+            writes.append( (map.mask, stage.mask & 0xffffffff) )
+            writes.append( (map.compare, stage.compare & 0xffffffff) )
+            pass
+        return writes
+
+    #f compile
+    def compile(self):
+        """
+        Build the transition table - for each stage*2+match, a tuple of
+        (action, store type, kind, next stage, counter)
+        """
+        table = []
+        for stage in self.stages:
+            for (action, next_stage) in ((stage.action_if_false, stage.if_false),
+                                         (stage.action_if_true, stage.if_true)):
+                a = action.value
+                table.append((a, action_store[a], action_kind[a], next_stage & 3, stage.counter & 0xffff))
+                pass
+            pass
+        return tuple(table)
+
+    #f reset
+    def reset(self):
+        """
+        Reset the model to stage 0, enabled, with an empty FIFO
+        """
+        self.table = self.compile()
+        self.stage = 0
+        self.residence = 1
+        self.time = 0
+        self.done = False
+        self.num_stored = 0
+        pass
+
+    #f store_value
+    @staticmethod
+    def store_value(store, signal, time, residence):
+        if store == 2: return (signal & 0xff000000) | (time & 0xffffff)
+        if store == 3: return (signal & 0xffff0000) | (residence & 0xffff)
+        return signal
+
+    #f step
+    def step(self, signal):
+        """
+        Apply one sample of the trigger signal, returning the value stored
+        in the trace FIFO (or None)
+        """
+        if self.done: return None
+        signal = signal & 0xffffffff
+        return self.apply_match(int(bool(self.stages[self.stage].matches(signal))), signal)
+
+    #f apply_match
+    def apply_match(self, match, signal):
+        """
+        Apply one sample given whether it matches the current stage
+        """
+        (action, store, kind, next_stage, counter) = self.table[self.stage*2 + match]
+        residence = self.residence
+        time = self.time
+        self.time += 1
+        if kind == 4:
+            self.end()
+            return None
+        transition = (kind == 2) or ((kind == 3) and ((counter == 0) or (counter == residence)))
+        if transition or (kind == 1):
+            self.residence = 1
+            pass
+        elif kind != 0:
+            self.residence = (residence + 1) & 0xffff
+            pass
+        if transition:
+            self.stage = next_stage
+            pass
+        if store == 0: return None
+        if (self.num_stored >= self.fifo_size) and not self.circular:
+            self.end()
+            return None
+        self.num_stored += 1
+        return self.store_value(store, signal, time, residence)
+
+    #f end
+    def end(self):
+        self.done = True
+        self.stage = 0
+        self.residence = 1
+        pass
+
+    #f run
+    def run(self, signals, window=64):
+        """
+        Apply an array of samples of the trigger signal, returning
+        (indices, values) arrays of the samples that stored data in the
+        trace FIFO and the data stored; the result matches calls of
+        'step' for each sample
+
+        The samples are processed in windows (from 'window' samples,
+        doubling while the stage does not change) so that the cost is
+        proportional to the number of stage transitions plus the number
+        of samples divided by the numpy vector speed; if the action for
+        one match result of a stage is idle, the samples with that result
+        are skipped over
+        """
+        signals = np.asarray(signals, dtype=np.uint32).reshape(-1)
+        n = len(signals)
+        matches = {}
+        indices = []
+        values = []
+        i = 0
+        size = window
+        while (i < n) and not self.done:
+            stage = self.stage
+            if stage not in matches:
+                matches[stage] = self.stages[stage].matches(signals).astype(np.intp)
+                pass
+            end = min(n, i + size)
+            m = matches[stage][i:end]
+            w = end - i
+            rows = [self.table[stage*2], self.table[stage*2+1]]
+            idle = [(row[1] == 0) and (row[2] == 0) for row in rows]
+            if idle[0] and idle[1]:
+                self.time += n - i
+                break
+            if idle[0] or idle[1]:
+                skip = 0 if idle[0] else 1
+                j = np.flatnonzero(m != skip)
+                if len(j) == 0:
+                    self.time += w
+                    i = end
+                    size *= 2
+                    continue
+                i += int(j[0])
+                self.time += int(j[0])
+                v = self.apply_match(1 - skip, int(signals[i]))
+                if v is not None:
+                    indices.append(np.array([i], dtype=np.intp))
+                    values.append(np.array([v], dtype=np.uint32))
+                    pass
+                i += 1
+                size = window
+                continue
+            kind = np.array([rows[0][2], rows[1][2]])[m]
+            store = np.array([rows[0][1], rows[1][1]])[m]
+            counter = rows[0][4]
+
+            # Residence before each sample
+            reside = (kind == 3)
+            reset = (kind == 1)
+            cum = np.cumsum(reside) - reside
+            last_reset = np.full(w, -1)
+            last_reset[1:] = np.maximum.accumulate(np.where(reset, np.arange(w), -1))[:-1]
+            residence = np.where(last_reset >= 0,
+                                 1 + cum - cum[np.maximum(last_reset, 0)],
+                                 self.residence + cum) & 0xffff
+
+            # First sample that leaves the stage (or ends)
+            event = (kind == 2) | (kind == 4)
+            if counter == 0:
+                event |= reside
+                pass
+            else:
+                event |= reside & (residence == counter)
+                pass
+            events = np.flatnonzero(event)
+            last = events[0] if len(events) > 0 else w
+            stored = np.flatnonzero(store[:last+1] != 0) if last < w else np.flatnonzero(store != 0)
+            if len(stored) > 0:
+                s = stored + i
+                types = store[stored]
+                v = signals[s].astype(np.uint32)
+                t = ((s + (self.time - i)) & 0xffffff).astype(np.uint32)
+                v = np.where(types == 2, (v & np.uint32(0xff000000)) | t, v)
+                v = np.where(types == 3, (v & np.uint32(0xffff0000)) | residence[stored].astype(np.uint32), v)
+                if not self.circular:
+                    space = self.fifo_size - self.num_stored
+                    if len(s) > space:
+                        # The store that overflows the FIFO ends the sequencer
+                        indices.append(s[:space])
+                        values.append(v[:space])
+                        self.num_stored += space
+                        self.time += int(s[space]) - i + 1
+                        self.end()
+                        break
+                    pass
+                indices.append(s)
+                values.append(v.astype(np.uint32))
+                self.num_stored += len(s)
+                pass
+            if last < w:
+                self.time += last + 1
+                if kind[last] == 4:
+                    self.end()
+                    break
+                self.residence = 1
+                self.stage = rows[m[last]][3]
+                i += last + 1
+                size = window
+                continue
+            self.time += w
+            if np.any(reset):
+                k = int(np.flatnonzero(reset)[-1])
+                self.residence = int(1 + np.sum(reside[k:])) & 0xffff
+                pass
+            else:
+                self.residence = int(self.residence + np.sum(reside)) & 0xffff
+                pass
+            i = end
+            size *= 2
+            pass
+        if len(indices) == 0:
+            return (np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.uint32))
+        return (np.concatenate(indices), np.concatenate(values))
+    pass
@@ -4,7 +4,8 @@
 """
 
 #a Imports
-from .analyzer import t_atr_address_op, t_atr_alu_op
+import numpy as np
+from .analyzer import t_atr_address_op, t_atr_alu_op, t_atr_fifo_encoding
 
 #a Trace configuration classes
 #c TraceCfgValue
@@ -18,6 +19,40 @@ class TraceCfgValue:
     def reg_values(self):
         value = self.shift + (self.mask_size<<8) + (int(self.max_min)<<16)
         return (self.base, value)
+
+    #f value
+    def value(self, data):
+        """
+        Map an array of 32-bit data to trace values as analyzer_trace_data_value_bound does
+        """
+        d = np.asarray(data, dtype=np.int64) & 0xffffffff
+        d = d - (self.base & 0xffffff)
+        is_neg = d < 0
+        shf = (d & 0xffffffff) >> self.shift
+        mask = 0xffffffff >> self.mask_size
+        result = shf & mask
+        if self.max_min:
+            result = np.where((shf & ~mask) != 0, mask, result)
+            result = np.where(is_neg, 0, result)
+            pass
+        return result.astype(np.uint32)
+
+    #f value_range
+    def value_range(self, value):
+        """
+        Map an array of trace values to the (low, high) inclusive range
+        of data that produces them; with masking but not max_min this is
+        the lowest such range, as higher data values alias
+        """
+        v = np.asarray(value, dtype=np.int64) & (0xffffffff >> self.mask_size)
+        base = self.base & 0xffffff
+        low = base + (v << self.shift)
+        high = base + ((v+1) << self.shift) - 1
+        if self.max_min:
+            low = np.where(v == 0, 0, low)
+            high = np.where(v == (0xffffffff >> self.mask_size), 0xffffffff, high)
+            pass
+        return (np.minimum(low, 0xffffffff), np.minimum(high, 0xffffffff))
     pass
 
 #c TraceCfgOffset
@@ -32,15 +67,85 @@ class TraceCfgOffset:
     def reg_values(self):
         value = self.shift + (int(self.use_data_1)<<8) + (int(self.no_bkts)<<9)
         return (self.base, value)
+
+    #f offset
+    def offset(self, data):
+        """
+        Map trigger data to SRAM offsets as analyzer_trace_data_offset_bound does
+
+        data may be an (N,4) array of analyzer data (in which case data_0
+        or data_1 is used as configured) or an N array of the selected data
+        """
+        d = np.asarray(data, dtype=np.int64)
+        if d.ndim == 2:
+            d = d[:,int(self.use_data_1)]
+            pass
+        d = (d & 0xffffffff) - (self.base & 0xffffff)
+        is_neg = d < 0
+        d = d & 0xffffffff
+        if self.shift < 20:
+            d = d >> self.shift
+            pass
+        if self.no_bkts:
+            result = d & 0x7ff
+            pass
+        else:
+            result = np.select([d >= 0xaa00, d >= 0x2a00, d >= 0xa00, d >= 0x200],
+                               [0x7ff,
+                                0x600 | ((d - 0x2a00) >> 6),
+                                0x400 | ((d - 0xa00) >> 4),
+                                0x200 | ((d - 0x200) >> 2)],
+                               d)
+            pass
+        return np.where(is_neg, 0, result).astype(np.uint16)
+
+    #f offset_range
+    def offset_range(self, offset):
+        """
+        Map an array of SRAM offsets (buckets) to the (low, high)
+        inclusive range of data that produces them; with no_bkts this
+        is the lowest such range, as higher data values alias
+        """
+        i = np.asarray(offset, dtype=np.int64) & 0x7ff
+        if self.no_bkts:
+            low = i
+            high = i
+            pass
+        else:
+            tier = i >> 9
+            tier_shift = np.array([0, 2, 4, 6])[tier]
+            low = np.array([0, 0x200, 0xa00, 0x2a00])[tier] + ((i & 0x1ff) << tier_shift)
+            high = low + (1 << tier_shift) - 1
+            pass
+        shift = self.shift
+        if shift >= 20: shift = 0
+        base = self.base & 0xffffff
+        low = base + (low << shift)
+        high = base + ((high+1) << shift) - 1
+        low = np.where(i == 0, 0, low)
+        if not self.no_bkts:
+            high = np.where(i == 0x7ff, 0xffffffff, high)
+            pass
+        return (np.minimum(low, 0xffffffff), np.minimum(high, 0xffffffff))
     pass
 
 #c TraceCfgFifo
 class TraceCfgFifo:
+    """
+    FIFO configuration; with run-length encoding (t_atr_fifo_encoding.rle)
+    each FIFO entry is a 32-bit word of (count, value) where the value is
+    data_width (8 or 16) bits
+
+    With time-delta encoding (t_atr_fifo_encoding.time_delta) each push
+    records trace data 0 as a time and the bottom 16 bits of trace data 1,
+    as 32-bit (delta, data) entries decoded by time_delta_decode
+    """
     data_width = 32
     journal = False
     fifo_per_ram = True
     ram_of_fifo = 0
     enable_push = False
+    encoding = t_atr_fifo_encoding.none
     def __init__(self):
         pass
 
@@ -50,11 +155,24 @@ class TraceCfgFifo:
         value += int(self.fifo_per_ram)<<3
         value += self.ram_of_fifo<<4
         value += int(self.enable_push)<<5
+        value += int(self.encoding)<<6
         return value
     pass
 
 #c TraceCfg
 class TraceCfg:
+    """
+    Trace configuration
+
+    In ping-pong mode histogram trace ops update only the 'ping_pong_half'
+    half (1024 words) of each SRAM, with offsets above 1023 using the
+    last word of the half; the other half can be read and cleared while
+    the histogram is live, and the halves are then swapped
+    """
+    enable = True
+    ping_pong = False
+    ping_pong_half = 0
+    ping_pong_size = 1024
     def __init__(self):
         self.offset = TraceCfgOffset()
         self.values = (TraceCfgValue(), TraceCfgValue())
@@ -62,11 +180,39 @@ class TraceCfg:
         self.fifos[0].enable_push = True
         self.fifos[1].enable_push = True
         pass
-    
+
     #f apb_writes_control
-    def apb_writes_control(self, map, enable:False):
-        # write enable
-        pass
+    def apb_writes_control(self, map, enable=None):
+        """
+        Writes of the trace base register (enable and ping-pong control)
+        """
+        if enable is not None: self.enable = enable
+        value = int(self.enable) + (int(self.ping_pong) << 1) + (self.ping_pong_half << 2)
+        return [(map.trace_cfg, value)]
+
+    #f apb_writes_swap
+    def apb_writes_swap(self, map):
+        """
+        Swap the ping-pong halves, returning the writes to do so
+        """
+        self.ping_pong_half = 1 - self.ping_pong_half
+        return self.apb_writes_control(map)
+
+    #f ping_pong_table
+    def ping_pong_table(self, half=None):
+        """
+        Return the (address, size) of a half of the SRAMs - by default
+        the one not being updated, which can be read and cleared
+        """
+        if half is None: half = 1 - self.ping_pong_half
+        return (half * self.ping_pong_size, self.ping_pong_size)
+
+    #f ping_pong_offset
+    def ping_pong_offset(self, data):
+        """
+        Map trigger data to the word of a ping-pong half as the hardware does
+        """
+        return np.minimum(self.offset.offset(data), self.ping_pong_size-1)
 
     #f apb_writes
     def apb_writes(self, map):
@@ -156,6 +302,16 @@ class AtrAccessOp:
         if width!=32: read_enable = 1
         return cls(address_or_op=t_atr_address_op.push, data=data, alu_op=alu_op, write_enable=1, read_enable=read_enable)
 
+    #f classmethod push_time_delta
+    @classmethod
+    def push_time_delta(cls, time, data):
+        """
+        A push to a time-delta encoded FIFO, which carries the data in the word address
+        """
+        op = cls(address_or_op=t_atr_address_op.push, data=time, alu_op=t_atr_alu_op.write32, write_enable=1, read_enable=0)
+        op.address = data & 0xffff
+        return op
+
     #f classmethod pop
     @classmethod
     def pop(cls, id=1):
@@ -167,5 +323,21 @@ class AtrAccessOp:
         read_enable = 0
         if id != 0: read_enable = 1
         return cls(id, address_or_op=address, alu_op=t_atr_alu_op.clear, write_enable=1, read_enable=read_enable)
+
+    #f classmethod read_range
+    @classmethod
+    def read_range(cls, address, n, id=1):
+        """
+        The accesses performed by n reads of read_inc starting at address
+        """
+        return [cls.read(address+i, id=id) for i in range(n)]
+
+    #f classmethod read_clear_range
+    @classmethod
+    def read_clear_range(cls, address, n, id=1):
+        """
+        The accesses performed by n reads of read_clear_inc starting at address
+        """
+        return [cls.clear(address+i, id=id) for i in range(n)]
     pass
 
@@ -5,6 +5,7 @@ Classes that contain analyzer trigger configuration and operation
 
 #a Imports
 from enum import Enum
+import numpy as np
 from cdl.utils.csr   import Csr, CsrField, CsrFieldZero, Map, MapCsr
 
 #a Enum classes
@@ -89,8 +90,19 @@ class SimpleByteMatch:
     def reset(self):
         self.one_must_be_nonzero = self.value & ~self.mask
         self.must_match_value = self.value & self.mask
-        self.last_matched = False
+        self.last_matched = 0
+        self.shift = (self.byte_sel & 3) * 8
+        # match_table[byte] is 1 if the byte matches
+        self.match_table = bytes(int(self.byte_matches(bd)) for bd in range(256))
+        # cond_table[last_matched*2 + matched] is the condition result
+        self.cond_table = tuple(self.cond_sel.result(bool(i&1), bool(i&2)) for i in range(4))
         pass
+    def byte_matches(self, bd):
+        if self.one_must_be_nonzero != 0:
+            if (bd & self.one_must_be_nonzero) == 0:
+                return False
+            pass
+        return (bd & self.mask) == self.must_match_value
     def reg_value(self):
         data = int(self.ignore_valid)
         data += self.byte_sel<<8
@@ -103,18 +115,8 @@ class SimpleByteMatch:
         if self.byte_sel >= 4: d = md1
         if not self.ignore_valid and not d[1]:
             return False
-        bd = (md0[0] >> ((self.byte_sel & 3) * 8)) & 0xff
-        mismatch = False
-        if self.one_must_be_nonzero != 0:
-            if (bd & self.one_must_be_nonzero) == 0:
-                mismatch = True
-                pass
-            pass
-        if bd & self.mask != self.must_match_value:
-            mismatch = True
-            pass
-        matched = not mismatch
-        result = self.cond_sel.result(matched, self.last_matched)
+        matched = self.match_table[(md0[0] >> self.shift) & 0xff]
+        result = self.cond_table[(self.last_matched<<1) | matched]
         self.last_matched = matched
         return result
     pass
@@ -221,34 +223,196 @@ class TriggerSimple:
         writes.append( (map.trace_op,  tops ) )
         return writes
 
+    #f compile
+    def compile(self):
+        """
+        Freeze the configuration into a TriggerSimplePlan
+
+        This resets the byte matchers (building their tables); it must
+        be invoked again if the configuration is changed.
+        """
+        byte_matches = []
+        for i in range(4):
+            bm = self.byte_match[i]
+            bm.reset()
+            valid_src = 0
+            if not bm.ignore_valid:
+                valid_src = 1
+                if bm.byte_sel >= 4: valid_src = 2
+                pass
+            byte_matches.append((i, valid_src, bm.shift, bm.match_table, bm.cond_table))
+            pass
+        op_valid = []
+        record = []
+        for matched in range(16):
+            actions = self.actions[self.action_sets[matched]]
+            op_valid.append(int(actions.capture_data[0]) + (int(actions.capture_data[1])<<1))
+            record.append(int(actions.record_invalidate) + (int(actions.record_data)<<1) + (int(actions.record_time)<<2))
+            pass
+        return TriggerSimplePlan(data_src = (self.data_src[0].value, self.data_src[1].value),
+                                 match_data_src = (self.match_data_src[0].value, self.match_data_src[1].value),
+                                 byte_matches = tuple(byte_matches),
+                                 op_valid = tuple(op_valid),
+                                 record = tuple(record),
+                                 trace_ops = (self.trace_ops[0].value, self.trace_ops[1].value),
+                                 )
+
     #f reset
     def reset(self):
         self.time = 0
         self.recorded_data = 0
         self.recorded_time = 0
-        for d in self.byte_match:
-            d.reset()
-            pass
+        self.plan = self.compile()
+        self.last_matched = [0,0,0,0]
         pass
+
+    #f match_data
+    def match_data(self, kind, d, is_valid):
+        """
+        Get the (data, valid) for a match data source given its MatchDataSrc value
+        """
+        if kind == 4: return (d, is_valid)
+        if kind == 3: return (self.recorded_data ^ d, is_valid)
+        if kind == 2: return (self.recorded_data, True)
+        if kind == 1: return (self.time - self.recorded_time, True)
+        return (self.time, True)
+
     #f apply
-    def apply(self, data, is_valid:True):
-        td0 = self.data_src[0].select_data(data)
-        td1 = self.data_src[1].select_data(data)
-        md0 = self.match_data_src[0].select(self, td0, is_valid)
-        md1 = self.match_data_src[1].select(self, td1, is_valid)
+    def apply(self, data, is_valid:True, time=None):
+        if time is not None:
+            self.time = time
+            pass
+        plan = self.plan
+        (md0, md0_valid) = self.match_data(plan.match_data_src[0], data[plan.data_src[0]], is_valid)
+        (md1, md1_valid) = self.match_data(plan.match_data_src[1], data[plan.data_src[1]], is_valid)
+        last_matched = self.last_matched
         matched = 0
-        for i in range(4):
-            if self.byte_match[i].do_match(md0, md1):
-                matched += (1<<i)
+        for (i, valid_src, shift, match_table, cond_table) in plan.byte_matches:
+            if valid_src == 1 and not md0_valid: continue
+            if valid_src == 2 and not md1_valid: continue
+            m = match_table[(md0 >> shift) & 0xff]
+            if cond_table[(last_matched[i]<<1) | m]:
+                matched |= (1<<i)
                 pass
+            last_matched[i] = m
             pass
-        action_set = self.action_sets[matched]
-        actions = self.actions[action_set]
-        op_valid = 0
-        if actions.capture_data[0]: op_valid += 1
-        if actions.capture_data[1]: op_valid += 2
+        record = plan.record[matched]
+        if record != 0:
+            if record & 1: self.recorded_data = 0
+            if record & 2: self.recorded_data = md0 & 0xffffffff
+            if record & 4: self.recorded_time = self.time
+            pass
+        op_valid = plan.op_valid[matched]
         if op_valid != 0:
-            return (op_valid, self.trace_ops[0].value, self.trace_ops[1].value, data[0], data[1], 0, 0)
+            return (op_valid, plan.trace_ops[0], plan.trace_ops[1], data[0], data[1], 0, 0)
         return None
+
+    #f apply_array
+    def apply_array(self, data, valid, time=None):
+        """
+        Apply the trigger to a whole capture - an (N,4) array of data,
+        an N array of valid, and an optional N array of time (else the
+        trigger time is used throughout)
+
+        Returns (op_valid, data_0, data_1) arrays; a sample generates a
+        trace op if op_valid is nonzero, and the result matches N calls
+        of 'apply'.
+
+        This is vectorized unless a match data source depends on
+        recorded data or time that a reachable action set can record,
+        in which case it falls back to a sequential scan.
+        """
+        plan = self.plan
+        data = np.asarray(data, dtype=np.uint32).reshape(-1,4)
+        valid = np.asarray(valid, dtype=bool).reshape(-1)
+        n = len(data)
+        if time is None:
+            time = np.full(n, self.time, dtype=np.uint32)
+            pass
+        else:
+            time = np.asarray(time, dtype=np.uint32).reshape(-1)
+            pass
+        if n == 0:
+            return (np.zeros(0, dtype=np.uint8), data[:,0], data[:,1])
+
+        # Sequential scan if recorded state feeds back into the match
+        records = 0
+        for r in plan.record: records |= r
+        kinds = set(plan.match_data_src)
+        if ((records & 3) and (kinds & {2,3})) or ((records & 4) and (1 in kinds)):
+            op_valid = np.zeros(n, dtype=np.uint8)
+            for (i, (d, v, t)) in enumerate(zip(data.tolist(), valid.tolist(), time.tolist())):
+                op = self.apply(d, v, t)
+                if op is not None:
+                    op_valid[i] = op[0]
+                    pass
+                pass
+            return (op_valid, data[:,0], data[:,1])
+
+        md = []
+        for i in range(2):
+            d = data[:,plan.data_src[i]]
+            kind = plan.match_data_src[i]
+            if kind == 4:   md.append((d, valid))
+            elif kind == 3: md.append((d ^ np.uint32(self.recorded_data), valid))
+            elif kind == 2: md.append((np.full(n, self.recorded_data, dtype=np.uint32), None))
+            elif kind == 1: md.append((time - np.uint32(self.recorded_time & 0xffffffff), None))
+            else:           md.append((time, None))
+            pass
+        ((md0, md0_valid), (md1, md1_valid)) = md
+
+        matched = np.zeros(n, dtype=np.uint8)
+        for (i, valid_src, shift, match_table, cond_table) in plan.byte_matches:
+            m = np.frombuffer(match_table, dtype=np.uint8)[(md0 >> np.uint32(shift)) & np.uint32(0xff)]
+            eligible = [None, md0_valid, md1_valid][valid_src]
+            if eligible is None:
+                indices = np.arange(n)
+                pass
+            else:
+                indices = np.flatnonzero(eligible)
+                pass
+            if len(indices) == 0: continue
+            m = m[indices]
+            last = np.empty_like(m)
+            last[0] = self.last_matched[i]
+            last[1:] = m[:-1]
+            result = np.array(cond_table, dtype=bool)[(last<<1) | m]
+            matched[indices[result]] |= (1<<i)
+            self.last_matched[i] = int(m[-1])
+            pass
+
+        record = np.array(plan.record, dtype=np.uint8)[matched]
+        recorded = np.flatnonzero(record & 3)
+        if len(recorded) > 0:
+            self.recorded_data = 0
+            if record[recorded[-1]] & 2:
+                self.recorded_data = int(md0[recorded[-1]])
+                pass
+            pass
+        recorded = np.flatnonzero(record & 4)
+        if len(recorded) > 0:
+            self.recorded_time = int(time[recorded[-1]])
+            pass
+        self.time = int(time[-1])
+        op_valid = np.array(plan.op_valid, dtype=np.uint8)[matched]
+        return (op_valid, data[:,0], data[:,1])
     pass
 
+#c TriggerSimplePlan
+class TriggerSimplePlan:
+    """
+    A compiled TriggerSimple configuration, with the enums reduced to
+    their values and the action sets to op_valid and record (bit 0
+    invalidate, bit 1 data, bit 2 time) tables indexed by the byte
+    matches
+    """
+    __slots__ = ("data_src", "match_data_src", "byte_matches", "op_valid", "record", "trace_ops")
+    def __init__(self, data_src, match_data_src, byte_matches, op_valid, record, trace_ops):
+        self.data_src = data_src
+        self.match_data_src = match_data_src
+        self.byte_matches = byte_matches
+        self.op_valid = op_valid
+        self.record = record
+        self.trace_ops = trace_ops
+        pass
+    pass
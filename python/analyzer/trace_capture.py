@@ -0,0 +1,240 @@
+#a Documentation
+"""
+Columnar container of captured analyzer data and trace ops
+
+A TraceCapture holds one numpy array per field of t_analyzer_data4 and
+t_analyzer_trace_op4, plus a 64-bit time, all of the same length:
+
+  valid, data_0..3, op_valid, op_0..3, time
+
+Captures can be saved to, and loaded from, a simple binary file:
+
+  magic (8 bytes) 'ATCFTRC1'
+  header length (4 bytes little-endian)
+  JSON header - length and, for each column, name, width, dtype and file offset
+  column blocks, each aligned to 64 bytes
+
+Loading a file memory-maps the columns, so a capture of any size can be
+sliced and filtered without reading it into Python objects; a capture
+can also be created directly in a file, and filled a chunk at a time.
+"""
+
+#a Imports
+import json
+import numpy as np
+from .analyzer import t_analyzer_data4, t_analyzer_trace_op4
+
+#a Column descriptions
+magic = b"ATCFTRC1"
+alignment = 64
+
+#f column_dtype
+def column_dtype(width):
+    """
+    Smallest unsigned numpy dtype holding a field of 'width' bits
+    """
+    for (w, dtype) in [(8, np.uint8), (16, np.uint16), (32, np.uint32)]:
+        if width <= w: return np.dtype(dtype)
+        pass
+    return np.dtype(np.uint64)
+
+columns = [(name, width) for (name, width) in t_analyzer_data4.items()]
+columns += [(name, width) for (name, width) in t_analyzer_trace_op4.items()]
+columns += [("time", 64)]
+
+#a TraceCapture
+#c TraceCapture
+class TraceCapture:
+    """
+    Columnar capture of analyzer data, trace ops and time
+    """
+    columns = columns
+    #f __init__
+    def __init__(self, n=0, **kwargs):
+        """
+        Create a capture of n samples, with all columns zero except those
+        given as keyword arguments (array-likes of length n)
+        """
+        self.data = {}
+        for (name, width) in self.columns:
+            if name in kwargs:
+                self.data[name] = np.asarray(kwargs.pop(name), dtype=column_dtype(width))
+                pass
+            else:
+                self.data[name] = np.zeros(n, dtype=column_dtype(width))
+                pass
+            if len(self.data[name]) != n:
+                raise Exception(f"Column {name} has length {len(self.data[name])} not {n}")
+            pass
+        if len(kwargs) > 0:
+            raise Exception(f"Unknown trace capture columns {list(kwargs.keys())}")
+        pass
+
+    #f from_data4
+    @classmethod
+    def from_data4(cls, data, valid=None, time=None):
+        """
+        Create a capture from an (N,4) array (or list) of analyzer data,
+        with optional valid and time
+        """
+        data = np.asarray(data, dtype=np.uint32).reshape(-1,4)
+        n = len(data)
+        if valid is None: valid = np.ones(n, dtype=np.uint8)
+        kwargs = {"valid":valid}
+        if time is not None: kwargs["time"] = time
+        return cls(n, data_0=data[:,0], data_1=data[:,1], data_2=data[:,2], data_3=data[:,3], **kwargs)
+
+    #f from_trace_ops
+    @classmethod
+    def from_trace_ops(cls, trace_ops, time=None):
+        """
+        Create a capture from a list of (op_valid, op_0, op_1, data_0,
+        data_1, data_2, data_3) tuples, as generated by the trigger model
+        and read from tb_analyzer
+        """
+        ops = np.array(trace_ops, dtype=np.uint32).reshape(-1,7)
+        n = len(ops)
+        kwargs = {}
+        if time is not None: kwargs["time"] = time
+        return cls(n, valid=np.ones(n, dtype=np.uint8),
+                   op_valid=ops[:,0], op_0=ops[:,1], op_1=ops[:,2],
+                   data_0=ops[:,3], data_1=ops[:,4], data_2=ops[:,5], data_3=ops[:,6],
+                   **kwargs)
+
+    #f __len__
+    def __len__(self):
+        return len(self.data["valid"])
+
+    #f __getattr__
+    def __getattr__(self, name):
+        data = self.__dict__.get("data")
+        if (data is not None) and (name in data): return data[name]
+        raise AttributeError(name)
+
+    #f __getitem__
+    def __getitem__(self, index):
+        """
+        Select samples by slice (giving views), or by index array or
+        boolean mask (giving copies)
+        """
+        capture = self.__class__.__new__(self.__class__)
+        capture.data = {name:column[index] for (name, column) in self.data.items()}
+        return capture
+
+    #f data4
+    def data4(self):
+        """
+        Return the analyzer data as an (N,4) uint32 array
+        """
+        return np.stack([self.data_0, self.data_1, self.data_2, self.data_3], axis=1)
+
+    #f trace_ops
+    def trace_ops(self):
+        """
+        Return the samples with op_valid set as a list of (op_valid, op_0,
+        op_1, data_0, data_1, data_2, data_3) tuples
+        """
+        c = self[self.op_valid != 0]
+        return list(zip(*[c.data[name].tolist() for name in ("op_valid", "op_0", "op_1", "data_0", "data_1", "data_2", "data_3")]))
+
+    #f concatenate
+    @classmethod
+    def concatenate(cls, captures):
+        captures = list(captures)
+        n = sum([len(c) for c in captures])
+        return cls(n, **{name:np.concatenate([c.data[name] for c in captures]) for (name, _) in cls.columns})
+
+    #f encode_header
+    @classmethod
+    def encode_header(cls, n):
+        """
+        Build the file header for a capture of n samples, returning the
+        header, the bytes to start the file with, and the file size
+        """
+        data_start = 0
+        while True:
+            header = {"version":1, "length":n, "columns":[]}
+            offset = data_start
+            for (name, width) in cls.columns:
+                dtype = column_dtype(width)
+                header["columns"].append({"name":name, "width":width, "dtype":dtype.str, "offset":offset})
+                offset += (n * dtype.itemsize + alignment - 1) & ~(alignment - 1)
+                pass
+            header_bytes = json.dumps(header).encode()
+            prefix = magic + len(header_bytes).to_bytes(4, "little") + header_bytes
+            if len(prefix) <= data_start: break
+            data_start = (len(prefix) + alignment - 1) & ~(alignment - 1)
+            pass
+        return (header, prefix, offset)
+
+    #f read_header
+    @staticmethod
+    def read_header(path):
+        with open(path, "rb") as f:
+            if f.read(len(magic)) != magic:
+                raise Exception(f"File {path} is not a trace capture")
+            header_length = int.from_bytes(f.read(4), "little")
+            return json.loads(f.read(header_length))
+        pass
+
+    #f create
+    @classmethod
+    def create(cls, path, n):
+        """
+        Create a capture of n samples directly in a file, memory-mapped
+        for writing; call flush() when it has been filled
+        """
+        (header, prefix, size) = cls.encode_header(n)
+        with open(path, "wb") as f:
+            f.write(prefix)
+            f.truncate(size)
+            pass
+        return cls.load(path, mode="r+")
+
+    #f load
+    @classmethod
+    def load(cls, path, mode="r"):
+        """
+        Load a capture from a file, memory-mapping the columns (read-only
+        unless mode is "r+")
+        """
+        header = cls.read_header(path)
+        n = header["length"]
+        capture = cls.__new__(cls)
+        capture.data = {}
+        for column in header["columns"]:
+            dtype = np.dtype(column["dtype"])
+            if n == 0:
+                capture.data[column["name"]] = np.zeros(0, dtype=dtype)
+                continue
+            capture.data[column["name"]] = np.memmap(path, dtype=dtype, mode=mode, offset=column["offset"], shape=(n,))
+            pass
+        return capture
+
+    #f save
+    def save(self, path):
+        """
+        Save the capture to a file
+        """
+        n = len(self)
+        (header, prefix, size) = self.encode_header(n)
+        with open(path, "wb") as f:
+            f.write(prefix)
+            for column in header["columns"]:
+                f.seek(column["offset"])
+                f.write(np.ascontiguousarray(self.data[column["name"]], dtype=np.dtype(column["dtype"])).tobytes())
+                pass
+            f.truncate(size)
+            pass
+        pass
+
+    #f flush
+    def flush(self):
+        """
+        Flush a memory-mapped capture to its file
+        """
+        for column in self.data.values():
+            if isinstance(column, np.memmap): column.flush()
+            pass
+        pass
+    pass
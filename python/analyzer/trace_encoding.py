@@ -0,0 +1,116 @@
+#a Documentation
+"""
+Decoding of encoded trace FIFO entries
+
+With run-length encoding (t_atr_fifo_encoding.rle) each FIFO entry is a
+32-bit word holding a value and the number of consecutive pushes of
+that value: for 8-bit data the value is the bottom 8 bits and the count
+the top 24 bits, and for 16-bit data each is 16 bits. A run that
+reaches the maximum count is continued in the next entry.
+
+With time-delta encoding (t_atr_fifo_encoding.time_delta) each FIFO
+entry is a 32-bit word of {delta, data}, each 16 bits, where the delta
+is the time since the previous push. A delta of 0xffff or more is
+recorded as an escape entry {0xffff, delta[16;16]} followed by the
+entry {delta[16;0], data}; the entry after an escape is never itself
+an escape, so in a run of entries starting with 0xffff the escapes are
+the first, third, and so on.
+"""
+
+#a Imports
+import numpy as np
+
+#a Run-length encoding
+#f rle_decode
+def rle_decode(entries, data_width=16):
+    """
+    Split an array of run-length encoded entries into (values, counts)
+    """
+    entries = np.asarray(entries, dtype=np.uint32)
+    shift = 8 if data_width == 8 else 16
+    values = entries & ((1 << shift) - 1)
+    counts = entries >> shift
+    return (values.astype(np.uint8 if data_width == 8 else np.uint16), counts)
+
+#f rle_expand
+def rle_expand(entries, data_width=16):
+    """
+    Expand an array of run-length encoded entries to the pushed values
+    """
+    (values, counts) = rle_decode(entries, data_width)
+    return np.repeat(values, counts)
+
+#f rle_encode
+def rle_encode(values, data_width=16):
+    """
+    Run-length encode an array of values as the hardware does (for a
+    FIFO that is never emptied or reset during the pushes)
+    """
+    values = np.asarray(values, dtype=np.uint32) & (0xff if data_width == 8 else 0xffff)
+    shift = 8 if data_width == 8 else 16
+    count_max = (1 << (32 - shift)) - 1
+    if len(values) == 0: return np.zeros(0, dtype=np.uint32)
+    starts = np.flatnonzero(np.concatenate(([True], values[1:] != values[:-1])))
+    lengths = np.diff(np.append(starts, len(values)))
+    full_runs = (lengths - 1) // count_max
+    run_values = np.repeat(values[starts], full_runs + 1)
+    run_counts = np.full(len(run_values), count_max, dtype=np.int64)
+    last = np.cumsum(full_runs + 1) - 1
+    run_counts[last] = lengths - full_runs * count_max
+    return ((run_counts.astype(np.uint32) << shift) | run_values).astype(np.uint32)
+
+#a Time-delta encoding
+#f time_delta_decode
+def time_delta_decode(entries, base_time=0):
+    """
+    Decode an array of time-delta encoded entries into (times, data),
+    with times as uint64 from base_time (the time of the last push
+    before the entries, which is 0 after the FIFO pointers are reset)
+
+    A final escape entry, whose data entry has not been written, is ignored
+
+    After an escape each push writes the entry of the previous push,
+    leaving its own pending, until an idle trace RAM access; a push in
+    that time with a delta of 0xffff or more has its delta recorded as
+    0xfffe, with no escape and no flag. The time decoded for such a
+    push is only a lower bound on its real time, and cannot be told
+    apart from a real delta of 0xfffe; the times of later pushes are
+    decoded correctly, as the hardware measures their deltas from the
+    recorded time.
+    """
+    entries = np.asarray(entries, dtype=np.uint32)
+    n = len(entries)
+    high = entries >> 16
+    low = entries & 0xffff
+    candidate = (high == 0xffff)
+    index = np.arange(n)
+    run_start = np.zeros(n, dtype=bool)
+    run_start[:1] = candidate[:1]
+    run_start[1:] = candidate[1:] & ~candidate[:-1]
+    run_start_index = np.maximum.accumulate(np.where(run_start, index, 0))
+    escape = candidate & (((index - run_start_index) & 1) == 0)
+    deltas = high.astype(np.uint64)
+    escaped = np.zeros(n, dtype=bool)
+    escaped[1:] = escape[:-1]
+    deltas[1:] += np.where(escaped[1:], low[:-1].astype(np.uint64) << 16, 0).astype(np.uint64)
+    entry = ~escape
+    times = np.uint64(base_time) + np.cumsum(deltas[entry], dtype=np.uint64)
+    return (times, low[entry].astype(np.uint16))
+
+#f time_delta_encode
+def time_delta_encode(times, data, base_time=0):
+    """
+    Time-delta encode arrays of times and data as the hardware does (for
+    a FIFO that is never reset during the pushes, and where each escape's
+    data entry is written before the next push with a large delta)
+    """
+    times = np.asarray(times, dtype=np.int64)
+    data = np.asarray(data, dtype=np.uint32) & 0xffff
+    deltas = np.diff(times, prepend=np.int64(base_time)) & 0xffffffff
+    large = deltas >= 0xffff
+    words_per_push = 1 + large.astype(np.int64)
+    data_index = np.cumsum(words_per_push) - 1
+    entries = np.zeros(int(np.sum(words_per_push)), dtype=np.uint32)
+    entries[data_index] = ((deltas & 0xffff) << 16) | data
+    entries[data_index[large] - 1] = 0xffff0000 | (deltas[large] >> 16)
+    return entries
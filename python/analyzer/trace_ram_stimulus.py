@@ -0,0 +1,170 @@
+#a Documentation
+"""
+Seeded random stimulus for analyzer_trace_ram_data_path
+
+The stimulus is generated in chunks, so that an arbitrarily long run
+needs only a chunk of operations (and of expected responses) at a
+time; each chunk is a list of AtrAccessOp, to be driven one per cycle,
+and can be executed by a TraceRamDataPathModel to get the responses
+the hardware should produce.
+
+The operations are an interleaved mix of pushes, pops, ALU accesses,
+reads, writes, clears, idles and (rarely) FIFO pointer resets. ALU
+accesses are mostly made to a small window of addresses, and include
+bursts that cycle over 1 to 4 addresses, so that each access to an
+address follows the previous one at a distance of 0 to 3 cycles and
+uses the corresponding forwarding path of the data path pipeline.
+"""
+
+#a Imports
+import random
+from .analyzer import t_atr_address_op, t_atr_alu_op
+from .target_analyzer_trace import AtrAccessOp
+
+#a TraceRamRandomStimulus
+#c TraceRamRandomStimulus
+class TraceRamRandomStimulus:
+    """
+    Random stimulus generator for a trace RAM data path with a given
+    FIFO configuration (as TraceRamDataPathModel, with data_width 1 for
+    8-bit, 2 for 16-bit and 0 or 3 for 32-bit data)
+
+    forward_counts[d] is the number of ALU accesses generated that are
+    to the same address as the ALU access d+1 operations before
+    """
+    alu_ops = [t_atr_alu_op(i) for i in range(t_atr_alu_op.write8, t_atr_alu_op.inc16_add16+1)]
+    push_width = {0:32, 1:8, 2:16, 3:32}
+    window_size = 16
+    #f __init__
+    def __init__(self, seed, num_ops, data_width=0, encoding=0, reset_ptrs=True):
+        self.rng = random.Random(seed)
+        self.num_ops = num_ops
+        self.data_width = data_width
+        self.encoding = encoding
+        self.reset_ptrs = reset_ptrs
+        self.num_generated = 0
+        self.time = 0
+        self.window = 0
+        self.recent = [None] * 4
+        self.forward_counts = [0] * 4
+        pass
+
+    #f random_data
+    def random_data(self):
+        rng = self.rng
+        kind = rng.randrange(8)
+        if kind == 0: return 0xffffffff
+        if kind == 1: return rng.getrandbits(4)
+        if kind < 4:  return rng.getrandbits(16)
+        return rng.getrandbits(32)
+
+    #f alu_address
+    def alu_address(self):
+        rng = self.rng
+        if rng.randrange(16) == 0:
+            self.window = rng.randrange(2048 - self.window_size)
+            pass
+        if rng.randrange(8) == 0:
+            return rng.randrange(2048)
+        return self.window + rng.randrange(self.window_size)
+
+    #f push
+    def push(self):
+        if self.encoding == 2:
+            self.time = (self.time + self.rng.choice([0, 1, 2, 5, 0xfffe, 0xffff, 0x12345])) & 0xffffffff
+            return AtrAccessOp.push_time_delta(self.time, self.rng.getrandbits(16))
+        if self.encoding == 1:
+            return AtrAccessOp.push(self.rng.getrandbits(2), width=self.push_width[self.data_width])
+        return AtrAccessOp.push(self.random_data(), width=self.push_width[self.data_width])
+
+    #f burst
+    def burst(self):
+        """
+        A burst of ALU accesses cycling over 1 to 4 addresses - all but
+        the first of each address at the distance of the number of
+        addresses less one
+        """
+        rng = self.rng
+        n = rng.randrange(1, 5)
+        addresses = rng.sample(range(self.window, self.window + self.window_size), n)
+        return [AtrAccessOp.atomic(addresses[i % n], self.random_data(), rng.choice(self.alu_ops))
+                for i in range(n * rng.randrange(2, 5))]
+
+    #f single
+    def single(self):
+        """
+        A single operation
+        """
+        rng = self.rng
+        kind = rng.randrange(32)
+        if kind < 8:
+            return self.push()
+        if kind < 14:
+            return AtrAccessOp.pop()
+        if kind < 16:
+            return AtrAccessOp()
+        if kind < 18:
+            return AtrAccessOp.read(self.alu_address())
+        if kind < 19:
+            return AtrAccessOp.clear(self.alu_address(), id=rng.randrange(2))
+        if kind < 20:
+            return AtrAccessOp.write(self.alu_address(), self.random_data())
+        if kind < 21 and self.reset_ptrs and rng.randrange(64) == 0:
+            return AtrAccessOp(address_or_op=t_atr_address_op.reset_ptrs)
+        if kind < 26:
+            d = rng.randrange(4)
+            if self.recent[d] is not None:
+                return AtrAccessOp.atomic(self.recent[d], self.random_data(), rng.choice(self.alu_ops))
+            pass
+        return AtrAccessOp.atomic(self.alu_address(), self.random_data(), rng.choice(self.alu_ops))
+
+    #f track
+    def track(self, op):
+        """
+        Record an op in the recent ALU access addresses, counting forwarding distances
+        """
+        address = None
+        if (op.address_op == t_atr_address_op.access) and (op.read_enable or op.write_enable):
+            address = op.address
+            for d in range(4):
+                if self.recent[d] == address:
+                    self.forward_counts[d] += 1
+                    break
+                pass
+            pass
+        self.recent = [address] + self.recent[:3]
+        pass
+
+    #f chunk
+    def chunk(self, size=4096):
+        """
+        Generate the next chunk of at most 'size' operations (fewer at
+        the end of the stimulus, and none after it)
+        """
+        ops = []
+        size = min(size, self.num_ops - self.num_generated)
+        while len(ops) < size:
+            if self.rng.randrange(16) == 0:
+                new_ops = self.burst()[:size - len(ops)]
+                pass
+            else:
+                new_ops = [self.single()]
+                pass
+            for op in new_ops:
+                self.track(op)
+                pass
+            ops += new_ops
+            pass
+        self.num_generated += len(ops)
+        return ops
+
+    #f chunks
+    def chunks(self, size=4096):
+        """
+        Iterate over the chunks of the stimulus
+        """
+        while self.num_generated < self.num_ops:
+            yield self.chunk(size)
+            pass
+        pass
+    pass
@@ -0,0 +1,236 @@
+#a Documentation
+"""
+Host-side bulk readout of the analyzer trace FIFOs and RAMs
+
+A TraceReader uses an AnalyzerTraceAccessAddressMap (such as
+TbApbAddressMap().analyzer_trace). It reads the fifo status to size a
+transfer, and then pops the FIFO; the pops can either be single APB
+reads, or batched into dbg master APB scripts so that the per-pop cost
+is that of the hardware rather than of the host. Trace RAM tables
+(such as histograms) can be read, and cleared, using the
+auto-incrementing read registers.
+
+For scripts the 'Script' class (regress.apb.Script or equivalent,
+providing op_set, op_write, op_read and compile_script) and an 'invoke'
+callable (taking a compiled script and returning the list of read
+data) are supplied by the caller.
+"""
+
+#a Imports
+import numpy as np
+
+#a TraceReader
+#c TraceReader
+class TraceReader:
+    """
+    Read trace data from FIFO 0 (the only FIFO with a pop register) of
+    8, 16 or 32-bit data
+    """
+    data_width = 32
+    max_burst = 256
+    #f __init__
+    def __init__(self, trace_map, data_width=None, max_burst=None):
+        self.trace_map = trace_map
+        if data_width is not None: self.data_width = data_width
+        if max_burst is not None: self.max_burst = max_burst
+        self.status_reg = trace_map.fifo_status_0
+        self.pop_reg = trace_map.pop_fifo_0
+        pass
+
+    #f decode_status
+    @staticmethod
+    def decode_status(status):
+        """
+        Decode a fifo status register value
+        """
+        return {"empty":       (status>>0) & 1,
+                "full":        (status>>1) & 1,
+                "underflowed": (status>>2) & 1,
+                "overflowed":  (status>>3) & 1,
+                "entries_full":(status>>4) & 0x3fff,
+                "spaces_available":(status>>18) & 0x3fff,
+                }
+
+    #f entries
+    def entries(self, status):
+        """
+        Number of entries in the FIFO given its status; the hardware
+        counts in bytes
+        """
+        return ((status>>4) & 0x3fff) // (self.data_width // 8)
+
+    #f unpack
+    def unpack(self, words):
+        """
+        Convert the 32-bit pop data to a numpy array of 8, 16 or 32-bit entries
+
+        A pop of 8/16-bit data returns the entry replicated (or the
+        whole word, for the first entry of a word), so the entry is the
+        bottom bits
+        """
+        words = np.asarray(words, dtype=np.uint32)
+        if self.data_width == 8: return (words & 0xff).astype(np.uint8)
+        if self.data_width == 16: return (words & 0xffff).astype(np.uint16)
+        return words
+
+    #f read_apb
+    def read_apb(self, read_reg, max_entries=None):
+        """
+        Read out the FIFO with one APB read per pop
+
+        read_reg is a callable that reads a register from the map,
+        e.g. lambda r:apb.reg(r).read()
+        """
+        n = self.entries(read_reg(self.status_reg))
+        if max_entries is not None: n = min(n, max_entries)
+        return self.unpack([read_reg(self.pop_reg) for i in range(n)])
+
+    #f script_ops
+    def script_ops(self, script, reg_ops):
+        """
+        Convert a list of ("read", reg) or ("write", reg, data) to script
+        ops, setting the address page only when it changes
+        """
+        ops = []
+        page = None
+        for reg_op in reg_ops:
+            address = reg_op[1].Address()
+            if (address >> 8) != page:
+                page = address >> 8
+                ops.append(script.op_set("addr1", page & 0xff))
+                pass
+            if reg_op[0] == "read":
+                ops.append(script.op_read(address & 0xff, 32))
+                pass
+            else:
+                ops.append(script.op_write(address & 0xff, 32, [reg_op[2]]))
+                pass
+            pass
+        return ops
+
+    #f read_scripted
+    def read_scripted(self, script, invoke, max_entries=None):
+        """
+        Read out the FIFO using one script to read the status and then
+        scripts of up to max_burst pops
+        """
+        status = invoke(script.compile_script(self.script_ops(script, [("read", self.status_reg)])))
+        n = self.entries(status[0])
+        if max_entries is not None: n = min(n, max_entries)
+        words = []
+        while len(words) < n:
+            burst = min(n - len(words), self.max_burst)
+            ops = self.script_ops(script, [("read", self.pop_reg)] * burst)
+            words += invoke(script.compile_script(ops))[:burst]
+            pass
+        return self.unpack(words)
+
+    #f access_reg_ops
+    def access_reg_ops(self, op, ram=0):
+        """
+        Register operations to perform an AtrAccessOp on a trace RAM;
+        the response data is read if the op has read_enable
+        """
+        trace_map = self.trace_map
+        alu_op = int(op.alu_op) | (op.read_enable<<4) | (op.write_enable<<5)
+        alu_op |= (int(op.address_op)<<8) | (ram<<16)
+        reg_ops = [("write", trace_map.address, (op.address<<2) | op.byte_of_sram),
+                   ("write", trace_map.data, op.data & 0xffffffff),
+                   ("write", trace_map.alu_op, alu_op),
+                   ]
+        if op.read_enable:
+            reg_ops.append(("read", trace_map.resp_data))
+            pass
+        return reg_ops
+
+    #f table_reg_ops
+    def table_reg_ops(self, address, n, clear=False, ram=0):
+        """
+        Register operations to read (and optionally clear) n words of
+        a trace RAM starting at address, using the auto-incrementing
+        read registers; an empty op selects the RAM
+        """
+        trace_map = self.trace_map
+        read_reg = trace_map.read_inc
+        if clear: read_reg = trace_map.read_clear_inc
+        reg_ops = [("write", trace_map.address, address<<2),
+                   ("write", trace_map.alu_op, ram<<16),
+                   ]
+        reg_ops += [("read", read_reg)] * n
+        return reg_ops
+
+    #f read_table_apb
+    def read_table_apb(self, read_reg, write_reg, address, n, clear=False, ram=0):
+        """
+        Read (and optionally clear) n words of a trace RAM with APB
+        accesses; write_reg is a callable taking a register and data
+        """
+        return np.array(self.do_reg_ops(read_reg, write_reg, self.table_reg_ops(address, n, clear, ram)), dtype=np.uint32)
+
+    #f read_table_scripted
+    def read_table_scripted(self, script, invoke, address, n, clear=False, ram=0):
+        """
+        Read (and optionally clear) n words of a trace RAM with scripts
+        of up to max_burst reads
+        """
+        data = []
+        while len(data) < n:
+            burst = min(n - len(data), self.max_burst)
+            reg_ops = self.table_reg_ops(address + len(data), burst, clear, ram)
+            data += invoke(script.compile_script(self.script_ops(script, reg_ops)))[:burst]
+            pass
+        return np.array(data, dtype=np.uint32)
+
+    #f do_reg_ops
+    def do_reg_ops(self, read_reg, write_reg, reg_ops):
+        """
+        Perform register operations with APB accesses, returning the read data
+        """
+        data = []
+        for reg_op in reg_ops:
+            if reg_op[0] == "read":
+                data.append(read_reg(reg_op[1]))
+                pass
+            else:
+                write_reg(reg_op[1], reg_op[2])
+                pass
+            pass
+        return data
+
+    #f execute_apb
+    def execute_apb(self, read_reg, write_reg, ops, ram=0):
+        """
+        Perform a list of AtrAccessOp on a trace RAM with APB accesses,
+        and return a numpy array of the response data for those ops
+        with read_enable
+        """
+        reg_ops = []
+        for op in ops:
+            reg_ops += self.access_reg_ops(op, ram)
+            pass
+        return np.array(self.do_reg_ops(read_reg, write_reg, reg_ops), dtype=np.uint32)
+
+    #f execute
+    def execute(self, script, invoke, ops, ram=0):
+        """
+        Perform a list of AtrAccessOp on a trace RAM with scripts, and
+        return a numpy array of the response data for those ops with
+        read_enable
+        """
+        data = []
+        reg_ops = []
+        num_reads = 0
+        for op in ops:
+            reg_ops += self.access_reg_ops(op, ram)
+            num_reads += op.read_enable
+            if (num_reads >= self.max_burst) or (len(reg_ops) >= 4*self.max_burst):
+                data += invoke(script.compile_script(self.script_ops(script, reg_ops)))[:num_reads]
+                reg_ops = []
+                num_reads = 0
+                pass
+            pass
+        if len(reg_ops) > 0:
+            data += invoke(script.compile_script(self.script_ops(script, reg_ops)))[:num_reads]
+            pass
+        return np.array(data, dtype=np.uint32)
+    pass
@@ -0,0 +1,217 @@
+#a Documentation
+"""
+Export of trace RAM contents as VCD (or FST) waveforms
+
+The trace RAM (or FIFO readout) is a sequence of 32-bit words; with a
+TraceCfgFifo data_width of 8 or 16 each word holds four or two entries,
+lowest byte first. The entries are unpacked a chunk at a time and
+split into signals by a field map of name -> (lsb, width), and the VCD
+is written incrementally, so memory use is independent of the length of
+the capture.
+
+Each entry is one time step, unless a field is named as the time field
+(for example a recorded timestamp), in which case its value (which must
+not decrease) is used as the time.
+
+FST output requires 'vcd2fst' (from GTKWave) on the path.
+"""
+
+#a Imports
+import os
+import shutil
+import subprocess
+import numpy as np
+
+#a Unpacking
+#f unpack_entries
+def unpack_entries(words, data_width=32):
+    """
+    Unpack an array of 32-bit trace RAM words into entries of data_width
+    bits (8, 16 or 32)
+    """
+    words = np.ascontiguousarray(words, dtype="<u4")
+    if data_width == 8: return words.view(np.uint8)
+    if data_width == 16: return words.view("<u2")
+    return words
+
+#f trace_entries
+def trace_entries(word_chunks, data_width=32):
+    """
+    Generate chunks of entries from an iterable of chunks of 32-bit words
+    """
+    for words in word_chunks:
+        yield unpack_entries(words, data_width)
+        pass
+    pass
+
+#f ring_entries
+def ring_entries(words, start_entry, data_width=32, chunk_size=65536):
+    """
+    Generate chunks of the entries of a circular (journal-mode) trace
+    RAM, starting with entry start_entry (such as the FIFO read pointer)
+    """
+    entries = unpack_entries(words, data_width)
+    start = start_entry % max(len(entries),1)
+    for ordered in (entries[start:], entries[:start]):
+        for i in range(0, len(ordered), chunk_size):
+            yield ordered[i:i+chunk_size]
+            pass
+        pass
+    pass
+
+#a VcdWriter
+#c VcdWriter
+class VcdWriter:
+    """
+    Incremental VCD writer of trace entries split into fields
+    """
+    timescale = "1ns"
+    scope = "trace"
+    #f __init__
+    def __init__(self, file, fields, time_field=None, timescale=None, scope=None):
+        """
+        file is a text file open for writing; fields is a dict of
+        name -> (lsb, width)
+        """
+        self.file = file
+        self.fields = [(name, lsb, width) for (name, (lsb, width)) in fields.items()]
+        self.time_field = time_field
+        if timescale is not None: self.timescale = timescale
+        if scope is not None: self.scope = scope
+        self.ids = [self.vcd_id(i) for i in range(len(self.fields))]
+        self.last_values = [None] * len(self.fields)
+        self.time = 0
+        self.header_written = False
+        pass
+
+    #f vcd_id
+    @staticmethod
+    def vcd_id(n):
+        """
+        VCD identifier code for the n'th signal
+        """
+        s = ""
+        while True:
+            s += chr(33 + (n % 94))
+            n = n // 94
+            if n == 0: break
+            pass
+        return s
+
+    #f write_header
+    def write_header(self):
+        f = self.file
+        f.write(f"$timescale {self.timescale} $end\n")
+        f.write(f"$scope module {self.scope} $end\n")
+        for ((name, lsb, width), id) in zip(self.fields, self.ids):
+            if width == 1:
+                f.write(f"$var wire 1 {id} {name} $end\n")
+                pass
+            else:
+                f.write(f"$var wire {width} {id} {name} [{width-1}:0] $end\n")
+                pass
+            pass
+        f.write("$upscope $end\n$enddefinitions $end\n")
+        self.header_written = True
+        pass
+
+    #f field_strings
+    @staticmethod
+    def field_strings(values, width, id):
+        """
+        Format an array of field values as VCD value changes
+        """
+        if width == 1:
+            return [f"{v}{id}\n" for v in values.tolist()]
+        bits = (values[:,None] >> np.arange(width-1, -1, -1, dtype=np.uint64)) & 1
+        bits = (bits.astype(np.uint8) + ord("0")).view(f"S{width}").reshape(-1)
+        return [f"b{b.decode()} {id}\n" for b in bits]
+
+    #f write_entries
+    def write_entries(self, entries):
+        """
+        Write a chunk of entries (an array of unsigned integers)
+        """
+        if not self.header_written: self.write_header()
+        entries = np.asarray(entries).astype(np.uint64)
+        n = len(entries)
+        if n == 0: return
+        values = {}
+        changes = np.zeros(n, dtype=bool)
+        field_changes = []
+        for (i, (name, lsb, width)) in enumerate(self.fields):
+            v = (entries >> np.uint64(lsb)) & np.uint64((1<<width)-1)
+            values[name] = v
+            prev = np.empty(n, dtype=np.uint64)
+            prev[1:] = v[:-1]
+            changed = np.ones(n, dtype=bool)
+            if self.last_values[i] is not None:
+                prev[0] = self.last_values[i]
+                changed = v != prev
+                pass
+            else:
+                changed[1:] = v[1:] != prev[1:]
+                pass
+            self.last_values[i] = int(v[-1])
+            rows = np.flatnonzero(changed)
+            field_changes.append((rows, self.field_strings(v[rows], width, self.ids[i])))
+            changes |= changed
+            pass
+        if self.time_field is not None:
+            times = values[self.time_field]
+            pass
+        else:
+            times = np.arange(self.time, self.time+n, dtype=np.uint64)
+            pass
+        self.time = int(times[-1]) + 1
+        rows = np.flatnonzero(changes)
+        lines = {int(r):[f"#{int(times[r])}\n"] for r in rows}
+        for (field_rows, strings) in field_changes:
+            for (r, s) in zip(field_rows.tolist(), strings):
+                lines[r].append(s)
+                pass
+            pass
+        self.file.write("".join(["".join(lines[r]) for r in sorted(lines.keys())]))
+        pass
+
+    #f finish
+    def finish(self):
+        if not self.header_written: self.write_header()
+        self.file.write(f"#{self.time}\n")
+        pass
+    pass
+
+#a Export
+#f export_trace_vcd
+def export_trace_vcd(path, entry_chunks, fields=None, time_field=None, fst=False):
+    """
+    Export an iterable of chunks of trace entries (from trace_entries or
+    ring_entries) to a VCD file; if fst is True the VCD is converted to
+    an FST file at path with vcd2fst
+
+    fields defaults to a single 'data' field of the width of the entries
+    """
+    vcd_path = path
+    if fst:
+        vcd2fst = shutil.which("vcd2fst")
+        if vcd2fst is None:
+            raise Exception("FST export requires vcd2fst on the path")
+        vcd_path = path + ".vcd"
+        pass
+    with open(vcd_path, "w") as f:
+        writer = None
+        for entries in entry_chunks:
+            if writer is None:
+                if fields is None: fields = {"data":(0, entries.dtype.itemsize*8)}
+                writer = VcdWriter(f, fields, time_field=time_field)
+                pass
+            writer.write_entries(entries)
+            pass
+        if writer is None: writer = VcdWriter(f, fields or {"data":(0,32)}, time_field=time_field)
+        writer.finish()
+        pass
+    if fst:
+        subprocess.run([vcd2fst, vcd_path, path], check=True, stdout=subprocess.DEVNULL)
+        os.remove(vcd_path)
+        pass
+    pass
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+#a Documentation
+"""
+Throughput benchmarks of the Python models
+
+Runs fixed, seeded workloads through the filter, trigger, source and
+trace RAM models, and through the apb_writes configuration builders,
+reporting samples per second and the peak memory (traced Python and
+numpy allocations) of each; scalar (per-sample) and batch (numpy)
+variants are run where both exist. Workload generation is not timed.
+
+The results are appended to a JSON history file (bench_history.json
+by default) with the commit, host and library versions, and compared
+with the most recent earlier run on the same host; a benchmark that is
+slower than that by more than the tolerance is reported as a
+regression (and with --fail-on-regression the script fails).
+
+The analyzer package and cdl.utils must be importable, as for
+cdl_regress; the analyzer package is imported from ../python unless
+--package-dir is given.
+
+  bench_models.py --sizes 100000 1000000 10000000
+"""
+
+#a Imports
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+#a Workloads
+#f filter_data
+def filter_data(n, seed):
+    """
+    Analyzer data for filters - few distinct values, so that must-match
+    and must-change bits both accept and reject samples
+    """
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 4, size=(n,4), dtype=np.uint32)
+
+#f trigger_data
+def trigger_data(n, seed):
+    rng = np.random.default_rng(seed)
+    data = rng.integers(0, 1<<32, size=(n,4), dtype=np.uint32)
+    data[:,0] = np.where(rng.random(n) < 0.05, 0xff, data[:,0])
+    valid = rng.random(n) < 0.9
+    return (data, valid)
+
+#f trace_ram_ops
+def trace_ram_ops(n, seed):
+    return [op for ops in analyzer.TraceRamRandomStimulus(seed, n).chunks() for op in ops]
+
+#a Benchmarks
+# Each benchmark is (name, variant, workload function, run function);
+# the workload function of (n, seed) returns the arguments of the run
+# function, which processes n samples
+#f new_filter
+def new_filter():
+    return analyzer.Filter((1,0,0,0), (1,0,0,0), (0,3,0,0), None)
+
+#f new_trigger
+def new_trigger():
+    """
+    Trigger that traces d0 and d1 when byte 0 of d0 is 0xff
+    """
+    from analyzer.target_analyzer_trigger import SimpleByteMatch
+    trigger = analyzer.TriggerSimple(data_srcs=("d0", "d1"), trace_data_srcs=["d0", "d1"], trace_ops=["push", "write"])
+    trigger.byte_match = tuple(SimpleByteMatch() for i in range(4))
+    trigger.byte_match[0].mask = 0xff
+    trigger.byte_match[0].value = 0xff
+    trigger.action_sets = [0] * 15 + [1]
+    trigger.reset()
+    return trigger
+
+#f bench_filter
+def bench_filter():
+    def scalar(data):
+        apply = new_filter().apply
+        for d in data.tolist():
+            apply(d)
+            pass
+        pass
+    def batch(data):
+        new_filter().apply_batch(data)
+        pass
+    return [("Filter.apply", "scalar", lambda n, seed:(filter_data(n, seed),), scalar),
+            ("Filter.apply_batch", "batch", lambda n, seed:(filter_data(n, seed),), batch),
+    ]
+
+#f bench_trigger
+def bench_trigger():
+    def scalar(data, valid):
+        apply = new_trigger().apply
+        for (d, v) in zip(data.tolist(), valid.tolist()):
+            apply(d, v)
+            pass
+        pass
+    def batch(data, valid):
+        new_trigger().apply_array(data, valid)
+        pass
+    return [("TriggerSimple.apply", "scalar", trigger_data, scalar),
+            ("TriggerSimple.apply_array", "batch", trigger_data, batch),
+    ]
+
+#f bench_pipeline
+def bench_pipeline():
+    def batch(data):
+        pipeline = analyzer.AnalyzerPipeline(new_filter(), new_trigger())
+        for ops in pipeline.trace_op_chunks(np.array_split(data, max(1, len(data)//65536))):
+            pass
+        pass
+    return [("AnalyzerPipeline", "batch", lambda n, seed:(filter_data(n, seed),), batch),
+    ]
+
+#f bench_src
+def bench_src():
+    def scalar(n):
+        next_valid = analyzer.AnalyzerSrc([1,2,3,4]).next_valid
+        for i in range(n):
+            next_valid()
+            pass
+        pass
+    return [("AnalyzerSrc.next_valid", "scalar", lambda n, seed:(n,), scalar),
+    ]
+
+#f bench_sequencer
+def bench_sequencer():
+    def data(n, seed):
+        rng = np.random.default_rng(seed)
+        signals = rng.integers(0, 1<<16, size=n, dtype=np.uint32)
+        return (signals, analyzer.TriggerSequencer.capture_after(0xffff, 0x1234, 2000))
+    def scalar(signals, sequencer):
+        sequencer.reset()
+        step = sequencer.step
+        for s in signals.tolist():
+            step(s)
+            pass
+        pass
+    def batch(signals, sequencer):
+        sequencer.reset()
+        sequencer.run(signals)
+        pass
+    return [("TriggerSequencer.step", "scalar", data, scalar),
+            ("TriggerSequencer.run", "batch", data, batch),
+    ]
+
+#f bench_trace_ram
+def bench_trace_ram():
+    def scalar(ops):
+        analyzer.TraceRamDataPathModel().execute(ops)
+        pass
+    return [("TraceRamDataPathModel.execute", "scalar", lambda n, seed:(trace_ram_ops(n, seed),), scalar),
+    ]
+
+#f bench_apb_writes
+def bench_apb_writes():
+    """
+    Configuration builders; a sample is one build of all the writes to
+    configure a filter, trigger, trace, source and sequencer
+    """
+    def data(n, seed):
+        return (n,
+                analyzer.TbApbAddressMap(),
+                analyzer.AnalyzerSequencerAddressMap(),
+                analyzer.Filter((1,0,0,0), (1,0,0,0), None, (12,0,0,0)),
+                new_trigger(),
+                analyzer.TraceCfg(),
+                analyzer.AnalyzerSrc([1,2,3,4]),
+                analyzer.TriggerSequencer.capture_after(0xff, 0x12, 10),
+                )
+    def scalar(n, map, sequencer_map, filter, trigger, trace, src, sequencer):
+        for i in range(n):
+            writes = filter.apb_writes(map.analyzer_cfg)
+            writes += trigger.apb_writes(map.analyzer_cfg)
+            writes += trace.apb_writes(map.analyzer_cfg)
+            writes += src.apb_writes(map.analyzer_src)
+            writes += sequencer.apb_writes(sequencer_map)
+            pass
+        pass
+    return [("apb_writes", "scalar", data, scalar),
+    ]
+
+#v benchmarks
+benchmarks = [bench_filter, bench_trigger, bench_pipeline, bench_src, bench_sequencer, bench_trace_ram, bench_apb_writes]
+
+#a Running
+#f run_benchmark
+def run_benchmark(workload, run, n, seed, repeat, memory):
+    """
+    Run a benchmark, returning (best seconds, peak memory bytes or None)
+    """
+    args = workload(n, seed)
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run(*args)
+        elapsed = time.perf_counter() - start
+        if (best is None) or (elapsed < best): best = elapsed
+        pass
+    peak = None
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        run(*args)
+        (_, peak) = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        pass
+    return (best, peak)
+
+#f git_commit
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+    pass
+
+#f previous_results
+def previous_results(history, host):
+    """
+    Results of the most recent run in the history on the host, keyed by (name, samples)
+    """
+    for run in reversed(history):
+        if run.get("host") != host: continue
+        return {(r["name"], r["samples"]):r for r in run["results"]}
+    return {}
+
+#a Main
+#f main
+def main(argv=None):
+    global analyzer
+    parser = argparse.ArgumentParser(description="Benchmark the throughput of the Python models")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100*1000, 1000*1000, 10*1000*1000], help="Workload sizes in samples")
+    parser.add_argument("--scalar-limit", type=int, default=1000*1000, help="Largest workload for the scalar variants")
+    parser.add_argument("--only", action="append", default=None, help="Run only benchmarks whose name contains this (may be repeated)")
+    parser.add_argument("--seed", type=int, default=1, help="Workload seed")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of each benchmark (the best is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="Do not measure peak memory (which needs an extra run)")
+    parser.add_argument("--history", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_history.json"), help="JSON history file")
+    parser.add_argument("--no-history", action="store_true", help="Do not add the results to the history file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Fractional slowdown from the previous run reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Fail if any benchmark has regressed")
+    parser.add_argument("--package-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python"), help="Directory containing the analyzer package")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.abspath(args.package_dir))
+    import analyzer
+
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            history = json.load(f)
+            pass
+        pass
+    host = platform.node()
+    previous = previous_results(history, host)
+
+    results = []
+    regressions = []
+    for bench in benchmarks:
+        for (name, variant, workload, run) in bench():
+            if (args.only is not None) and not any(o in name for o in args.only): continue
+            for n in args.sizes:
+                if (variant == "scalar") and (n > args.scalar_limit): continue
+                (seconds, peak) = run_benchmark(workload, run, n, args.seed, args.repeat, not args.no_memory)
+                rate = n / seconds
+                result = {"name":name, "variant":variant, "samples":n, "seconds":round(seconds, 6),
+                          "samples_per_second":round(rate), "peak_memory_bytes":peak}
+                results.append(result)
+                change = ""
+                if (name, n) in previous:
+                    ratio = rate / previous[(name, n)]["samples_per_second"]
+                    change = f"{ratio:6.2f}x"
+                    if ratio < 1 - args.tolerance:
+                        change += " REGRESSION"
+                        regressions.append(result)
+                        pass
+                    pass
+                memory = f"{peak/1e6:10.1f}MB" if peak is not None else ""
+                print(f"{name:32s} {variant:6s} {n:10d} {rate/1e6:10.3f}M/s {memory} {change}")
+                sys.stdout.flush()
+                pass
+            pass
+        pass
+
+    if not args.no_history:
+        history.append({"date":datetime.datetime.now().isoformat(timespec="seconds"),
+                        "commit":git_commit(),
+                        "host":host,
+                        "python":platform.python_version(),
+                        "numpy":np.__version__,
+                        "seed":args.seed,
+                        "results":results,
+                        })
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=1)
+            f.write("\n")
+            pass
+        pass
+    if len(regressions) > 0:
+        print(f"{len(regressions)} benchmarks regressed by more than {args.tolerance*100:.0f}%")
+        if args.fail_on_regression: return 1
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
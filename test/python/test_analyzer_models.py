@@ -0,0 +1,887 @@
+#a Documentation
+"""
+Tests of the Python models that do not need a simulation
+
+* Filter batch application (apply_batch) of chunks of data matches apply for random match, must-change and must-be-nonzero filters
+
+* Script compilation (ScriptCompiler) of write groups to a fake Script sets addr1 only when the page changes, keeps ordered groups (including reads and repeated writes) in order, reduces unordered groups to their final writes sorted from the current page, merges consecutive writes only when given a stride, and splits scripts at max_words
+
+* Trace offset bucketing (TraceCfgOffset.offset) of vectors at the bucket tier boundaries, with a base, with data negative after the base, with shifts of 20 or more (which do not shift), and with no buckets (no_bkts) gives the expected offsets
+
+* Trace offset ranges (TraceCfgOffset.offset_range) of every bucket map back to the bucket at both ends, and to the neighbouring buckets just outside them, for several bases and shifts, with and without buckets
+
+* Trace values (TraceCfgValue.value) of vectors with a base, masking, and max_min saturation give the expected values, and the ranges (value_range) of every value map back to the value at both ends
+
+* Trace capture save and load of a random capture round-trips every column, with 64-byte aligned columns in the file
+
+* Trace capture created in a file and filled a chunk at a time through slices, then flushed, loads with the data written
+
+* Trace captures of zero length can be created, saved and loaded
+
+* Trace capture slices are views, masks are copies, and concatenating the slices of a loaded capture gives the original
+
+* VCD export of 16-bit trace entries split into a 1-bit and a 3-bit field, in two chunks, matches a golden VCD with one time step per entry
+
+* VCD export of a circular trace of 8-bit entries, from its start entry, with a time field, matches a golden VCD
+
+* VCD export of no entries gives just the header of a 32-bit data signal
+
+* Histogram decoding (decode_histogram) of inc and sum, min_max and inc, and inc_add tables built by trace RAM models from random events gives the counts, sums, means, minima and maxima of the events, with NaN for empty buckets
+
+* Histogram decoding flags saturated counts and sums of inc, sum and inc_add tables (increments wrap to zero, and are not flagged after wrapping)
+
+* Histogram percentiles interpolate within the occupied buckets, with the 0th percentile the low end of the first occupied bucket, and are NaN for an empty table
+
+* Histogram sampling of a table at a non-zero address, from trace RAM models, labels the buckets of each sample and of the accumulated histogram with the ranges of the buckets read
+
+* Run-length encoding (rle_encode) of random runs of 8- and 16-bit values matches the FIFO of a run-length encoded trace RAM model, and decoding (rle_decode, rle_expand) returns the runs and values
+
+* Run-length decoding of runs that reach the maximum count, for 8- and 16-bit data, continues them in the next entry
+
+* Time-delta encoding (time_delta_encode) of random pushes, with deltas needing escapes, matches the FIFO of a trace RAM model with an idle access after each escape, and decoding (time_delta_decode) returns the times and data
+
+* Time-delta decoding of a trace RAM model FIFO with large deltas while an entry is pending gives lower bounds for their times (the deltas are recorded as 0xfffe) and exact times after the next idle access, and ignores a final escape whose data entry is pending
+
+* Trigger array application (apply_array) of chunks of data matches apply for random triggers, including those whose actions record data or time that feeds back into the match, with and without per-sample time
+
+* Trigger sequencer compiled simulation (run) matches step for random stages, windows and FIFO sizes, circular or not
+
+* Trigger sequencer capture_after stores the matching signal and the n following signals, and then ends
+
+"""
+
+#a Imports
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from regress.analyzer import Filter
+from regress.analyzer import t_atr_alu_op
+from regress.analyzer import AtrAccessOp, TraceCfg, TraceRamDataPathModel
+from regress.analyzer.target_analyzer_trace import TraceCfgValue, TraceCfgOffset
+from regress.analyzer import ScriptCompiler, WriteGroup
+from regress.analyzer import TraceCapture
+from regress.analyzer import export_trace_vcd, trace_entries, ring_entries
+from regress.analyzer import HistogramSampler, decode_histogram
+from regress.analyzer import rle_decode, rle_expand, rle_encode
+from regress.analyzer import time_delta_decode, time_delta_encode
+from regress.analyzer import TriggerSimple
+from regress.analyzer import TriggerSequencer, SequencerStage, SequencerAction
+from regress.analyzer.target_analyzer_trigger import DataSrc, MatchDataSrc, SimpleByteMatch, SimpleByteMatchCond, Actions
+
+#a Filter tests
+#c TestFilter
+class TestFilter(unittest.TestCase):
+    #f random_filter
+    @staticmethod
+    def random_filter(rng):
+        """
+        Random filter on the bottom 4 bits of each data word - must
+        change, or must match and (perhaps) be nonzero
+        """
+        mm = tuple(rng.choice([0, 0, 1, 3, 8]) for i in range(4))
+        mv = tuple(rng.randrange(16) for i in range(4))
+        if rng.randrange(2) == 0:
+            mc = tuple(rng.choice([0, 2, 4, 6]) & ~mm[i] for i in range(4))
+            if mc == (0, 0, 0, 0): mc = (0, 4 & ~mm[1], 0, 0)
+            return Filter(mm, mv, mc, None)
+        nz = None
+        if rng.randrange(2) == 0:
+            nz = tuple(rng.choice([0, 2, 4]) & ~mm[i] for i in range(4))
+            pass
+        return Filter(mm, mv, None, nz)
+
+    #f test_apply_batch_matches_apply
+    def test_apply_batch_matches_apply(self):
+        rng = random.Random(1)
+        for trial in range(300):
+            data = [tuple(rng.choice([0, 1, 2, 4, 6, 8, 9, 15]) for j in range(4))
+                    for i in range(rng.randrange(1, 400))]
+            scalar = self.random_filter(rng)
+            batch = Filter(scalar.match_mask, scalar.match_value, scalar.must_change, scalar.must_be_nonzero)
+            expected = [scalar.apply(d) for d in data]
+            accept = []
+            start = 0
+            while start < len(data):
+                end = start + rng.choice([1, 7, 64, 400])
+                (chunk_accept, last) = batch.apply_batch(np.array(data[start:end], dtype=np.uint32))
+                accept += chunk_accept.tolist()
+                start = end
+                pass
+            reason = f"trial {trial} filter {scalar.match_mask} {scalar.match_value} {scalar.must_change} {scalar.must_be_nonzero}"
+            self.assertEqual(accept, expected, reason)
+            self.assertEqual(tuple(batch.data), tuple(scalar.data), reason)
+            self.assertEqual(last, batch.data, reason)
+            pass
+        pass
+    pass
+
+#a Script compiler tests
+#c FakeReg
+class FakeReg:
+    """
+    Register with an APB address, as a csr map register
+    """
+    def __init__(self, address):
+        self.address = address
+        pass
+    def Address(self):
+        return self.address
+    pass
+
+#c FakeScript
+class FakeScript:
+    """
+    Script class whose ops are tuples, and whose compiled scripts are lists of ops
+    """
+    @staticmethod
+    def op_set(name, value): return ("set", name, value)
+    @staticmethod
+    def op_write(address, width, data): return ("write", address, width, list(data))
+    @staticmethod
+    def op_read(address, width): return ("read", address, width)
+    @staticmethod
+    def compile_script(ops): return list(ops)
+    pass
+
+#c TestScriptCompiler
+class TestScriptCompiler(unittest.TestCase):
+    #f groups
+    @staticmethod
+    def groups():
+        """
+        An ordered group on page 0x12 with a read and a repeated write,
+        then an unordered group with writes to pages 0x10 and 0x12
+        (0x1203 twice) and two runs of consecutive addresses, then an
+        ordered group on page 0x10
+        """
+        r = FakeReg
+        return [WriteGroup([(r(0x1201), 1), (r(0x1200), None), (r(0x1201), 2)], ordered=True),
+                WriteGroup([(r(0x1004), 3), (r(0x1203), 4), (r(0x1002), 5), (r(0x1003), 6),
+                            (r(0x1203), 7), (r(0x1204), 8), (r(0x1006), 9)]),
+                WriteGroup([(r(0x1001), 10)], ordered=True)]
+
+    #f test_single_word
+    def test_single_word(self):
+        (script,) = ScriptCompiler(FakeScript).compile(self.groups())
+        self.assertEqual(script, [("set", "addr1", 0x12),
+                                  ("write", 0x01, 32, [1]), ("read", 0x00, 32), ("write", 0x01, 32, [2]),
+                                  ("write", 0x03, 32, [7]), ("write", 0x04, 32, [8]),
+                                  ("set", "addr1", 0x10),
+                                  ("write", 0x02, 32, [5]), ("write", 0x03, 32, [6]),
+                                  ("write", 0x04, 32, [3]), ("write", 0x06, 32, [9]),
+                                  ("write", 0x01, 32, [10])])
+        pass
+
+    #f test_merge
+    def test_merge(self):
+        (script,) = ScriptCompiler(FakeScript, stride=1).compile(self.groups())
+        self.assertEqual(script, [("set", "addr1", 0x12),
+                                  ("write", 0x01, 32, [1]), ("read", 0x00, 32), ("write", 0x01, 32, [2]),
+                                  ("write", 0x03, 32, [7, 8]),
+                                  ("set", "addr1", 0x10),
+                                  ("write", 0x02, 32, [5, 6, 3]), ("write", 0x06, 32, [9]),
+                                  ("write", 0x01, 32, [10])])
+        (script,) = ScriptCompiler(FakeScript, stride=2).compile([WriteGroup([(FakeReg(a), a) for a in (0x10fe, 0x1100, 0x1102, 0x1103)])])
+        self.assertEqual(script, [("set", "addr1", 0x10), ("write", 0xfe, 32, [0x10fe]),
+                                  ("set", "addr1", 0x11), ("write", 0x00, 32, [0x1100, 0x1102]), ("write", 0x03, 32, [0x1103])])
+        pass
+
+    #f test_max_words
+    def test_max_words(self):
+        scripts = ScriptCompiler(FakeScript, stride=1, max_words=4).compile(self.groups())
+        self.assertEqual(scripts, [[("set", "addr1", 0x12),
+                                    ("write", 0x01, 32, [1]), ("read", 0x00, 32), ("write", 0x01, 32, [2]),
+                                    ("write", 0x03, 32, [7])],
+                                   [("set", "addr1", 0x12),
+                                    ("write", 0x04, 32, [8]),
+                                    ("set", "addr1", 0x10),
+                                    ("write", 0x02, 32, [5, 6, 3])],
+                                   [("set", "addr1", 0x10),
+                                    ("write", 0x06, 32, [9]), ("write", 0x01, 32, [10])]])
+        self.assertEqual(ScriptCompiler(FakeScript).compile([]), [])
+        pass
+    pass
+
+#a Trace configuration tests
+#c TestTraceCfg
+class TestTraceCfg(unittest.TestCase):
+    #f trace_cfg_offset
+    @staticmethod
+    def trace_cfg_offset(base=0, shift=0, no_bkts=False, use_data_1=False):
+        offset = TraceCfgOffset()
+        (offset.base, offset.shift, offset.no_bkts, offset.use_data_1) = (base, shift, no_bkts, use_data_1)
+        return offset
+
+    #f trace_cfg_value
+    @staticmethod
+    def trace_cfg_value(base=0, shift=0, mask_size=0, max_min=False):
+        value = TraceCfgValue()
+        (value.base, value.shift, value.mask_size, value.max_min) = (base, shift, mask_size, max_min)
+        return value
+
+    #f test_offset
+    def test_offset(self):
+        offset = self.trace_cfg_offset()
+        data =     [0, 0x1ff, 0x200, 0x203, 0x204, 0x9ff, 0xa00, 0xa0f, 0xa10, 0x29ff, 0x2a00, 0x2a3f, 0x2a40, 0xa9ff, 0xaa00, 0xffffffff]
+        expected = [0, 0x1ff, 0x200, 0x200, 0x201, 0x3ff, 0x400, 0x400, 0x401, 0x5ff,  0x600,  0x600,  0x601,  0x7ff,  0x7ff,  0x7ff]
+        self.assertEqual(offset.offset(data).tolist(), expected)
+        offset = self.trace_cfg_offset(base=0x1000, shift=2)
+        self.assertEqual(offset.offset([0, 0xfff, 0x1000, 0x1003, 0x1004, 0x1800, 0xffffffff]).tolist(),
+                         [0, 0, 0, 0, 1, 0x200, 0x7ff])
+        for shift in (20, 21, 31):
+            offset = self.trace_cfg_offset(base=0x100, shift=shift)
+            self.assertEqual(offset.offset([0xff, 0x100, 0x101, 0x300]).tolist(), [0, 0, 1, 0x200], f"shift {shift}")
+            pass
+        offset = self.trace_cfg_offset(base=0x100, shift=19)
+        self.assertEqual(offset.offset([0x300, 0x80100]).tolist(), [0, 1])
+        offset = self.trace_cfg_offset(base=0x10, shift=2, no_bkts=True)
+        self.assertEqual(offset.offset([0xf, 0x10, 0x14, 0x200c, 0x2010, 0x2014]).tolist(), [0, 0, 1, 0x7ff, 0, 1])
+        offset = self.trace_cfg_offset(use_data_1=True)
+        self.assertEqual(offset.offset([[0x1ff, 0x200, 0, 0], [0, 0xa00, 0, 0]]).tolist(), [0x200, 0x400])
+        pass
+
+    #f test_offset_range
+    def test_offset_range(self):
+        buckets = np.arange(0x800)
+        for (base, shift, no_bkts) in [(0, 0, False), (0x123, 3, False), (0xffffff, 8, False),
+                                       (0x1000, 20, False), (0x1000, 31, False),
+                                       (0, 0, True), (0x55, 4, True), (0x800, 20, True)]:
+            reason = f"base {base:x} shift {shift} no_bkts {no_bkts}"
+            offset = self.trace_cfg_offset(base=base, shift=shift, no_bkts=no_bkts)
+            (low, high) = offset.offset_range(buckets)
+            self.assertEqual(offset.offset(low).tolist(), buckets.tolist(), reason)
+            self.assertEqual(offset.offset(high).tolist(), buckets.tolist(), reason)
+            self.assertEqual(offset.offset(low[1:] - 1).tolist(), buckets[:-1].tolist(), reason)
+            self.assertEqual(offset.offset(high[:-1] + 1).tolist(), buckets[1:].tolist(), reason)
+            self.assertEqual(int(low[0]), 0, reason)
+            if not no_bkts:
+                self.assertEqual(int(high[-1]), 0xffffffff, reason)
+                pass
+            pass
+        (low, high) = self.trace_cfg_offset().offset_range([0x1ff, 0x200, 0x3ff, 0x400, 0x5ff, 0x600, 0x7fe])
+        self.assertEqual(low.tolist(), [0x1ff, 0x200, 0x9fc, 0xa00, 0x29f0, 0x2a00, 0xa980])
+        self.assertEqual(high.tolist(), [0x1ff, 0x203, 0x9ff, 0xa0f, 0x29ff, 0x2a3f, 0xa9bf])
+        pass
+
+    #f test_value
+    def test_value(self):
+        """
+        Values of 4 bits of data from a base of 0x10, shifted by 4;
+        without max_min data above the range aliases, and data below
+        the base wraps
+        """
+        data = [0, 0xf, 0x10, 0x1f, 0x20, 0x10f, 0x110, 0x120, 0xffffffff]
+        value = self.trace_cfg_value(base=0x10, shift=4, mask_size=28)
+        self.assertEqual(value.value(data).tolist(), [0xf, 0xf, 0, 0, 1, 0xf, 0, 1, 0xe])
+        value = self.trace_cfg_value(base=0x10, shift=4, mask_size=28, max_min=True)
+        self.assertEqual(value.value(data).tolist(), [0, 0, 0, 0, 1, 0xf, 0xf, 0xf, 0xf])
+        value = self.trace_cfg_value(base=0x1000000 | 0x10)
+        self.assertEqual(value.value([0x10, 0x11]).tolist(), [0, 1])
+        for max_min in (False, True):
+            for (base, shift, mask_size) in [(0, 0, 24), (0x10, 4, 28), (0xfff, 2, 22), (0xffffff, 0, 20)]:
+                reason = f"base {base:x} shift {shift} mask_size {mask_size} max_min {max_min}"
+                value = self.trace_cfg_value(base=base, shift=shift, mask_size=mask_size, max_min=max_min)
+                values = np.arange(0x100000000 >> mask_size)
+                (low, high) = value.value_range(values)
+                self.assertEqual(value.value(low).tolist(), values.tolist(), reason)
+                self.assertEqual(value.value(high).tolist(), values.tolist(), reason)
+                self.assertEqual(value.value(low[1:] - 1).tolist(), values[:-1].tolist(), reason)
+                if max_min:
+                    self.assertEqual((int(low[0]), int(high[-1])), (0, 0xffffffff), reason)
+                    pass
+                pass
+            pass
+        pass
+    pass
+
+#c TestTraceCapture
+class TestTraceCapture(unittest.TestCase):
+    #f setUp
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "capture.trc")
+        pass
+
+    #f tearDown
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        pass
+
+    #f random_capture
+    @staticmethod
+    def random_capture(n, seed):
+        """
+        Capture of n samples with every column filled with random values
+        of its width
+        """
+        rng = np.random.default_rng(seed)
+        return TraceCapture(n, **{name:rng.integers(0, 1<<width, size=n, dtype=np.uint64)
+                                  for (name, width) in TraceCapture.columns})
+
+    #f assertCapturesEqual
+    def assertCapturesEqual(self, capture, expected):
+        self.assertEqual(len(capture), len(expected))
+        for (name, width) in TraceCapture.columns:
+            self.assertEqual(getattr(capture, name).dtype, getattr(expected, name).dtype, name)
+            self.assertEqual(getattr(capture, name).tolist(), getattr(expected, name).tolist(), name)
+            pass
+        pass
+
+    #f test_save_load
+    def test_save_load(self):
+        capture = self.random_capture(1000, 12)
+        capture.save(self.path)
+        header = TraceCapture.read_header(self.path)
+        self.assertEqual(header["length"], 1000)
+        self.assertEqual([c["name"] for c in header["columns"]], [name for (name, width) in TraceCapture.columns])
+        for column in header["columns"]:
+            self.assertEqual(column["offset"] % 64, 0)
+            pass
+        self.assertCapturesEqual(TraceCapture.load(self.path), capture)
+        pass
+
+    #f test_create_flush
+    def test_create_flush(self):
+        expected = self.random_capture(1000, 13)
+        capture = TraceCapture.create(self.path, 1000)
+        for start in range(0, 1000, 300):
+            chunk = capture[start:start+300]
+            for (name, width) in TraceCapture.columns:
+                getattr(chunk, name)[:] = getattr(expected, name)[start:start+300]
+                pass
+            pass
+        capture.flush()
+        del capture
+        del chunk
+        self.assertCapturesEqual(TraceCapture.load(self.path), expected)
+        pass
+
+    #f test_zero_length
+    def test_zero_length(self):
+        TraceCapture(0).save(self.path)
+        self.assertCapturesEqual(TraceCapture.load(self.path), TraceCapture(0))
+        capture = TraceCapture.create(self.path, 0)
+        capture.flush()
+        self.assertCapturesEqual(TraceCapture.load(self.path), TraceCapture(0))
+        self.assertEqual(TraceCapture.concatenate([TraceCapture(0), TraceCapture(0)]).trace_ops(), [])
+        pass
+
+    #f test_slice_concatenate
+    def test_slice_concatenate(self):
+        self.random_capture(1000, 14).save(self.path)
+        capture = TraceCapture.load(self.path)
+        self.assertTrue(np.shares_memory(capture[100:200].data_0, capture.data_0))
+        self.assertFalse(np.shares_memory(capture[capture.valid != 0].data_0, capture.data_0))
+        self.assertEqual(len(capture[990:2000]), 10)
+        self.assertEqual(capture[10:20].data4().tolist(), capture.data4()[10:20].tolist())
+        self.assertEqual(capture[capture.op_valid != 0].trace_ops(), capture.trace_ops())
+        parts = [capture[0:0], capture[0:333], capture[333:334], capture[334:1000]]
+        self.assertCapturesEqual(TraceCapture.concatenate(parts), capture)
+        pass
+    pass
+
+#a VCD export tests
+#c TestTraceVcd
+class TestTraceVcd(unittest.TestCase):
+    #f setUp
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "trace.vcd")
+        pass
+
+    #f tearDown
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+        pass
+
+    #f export
+    def export(self, entry_chunks, fields=None, time_field=None):
+        """
+        Export the chunks of entries and return the VCD
+        """
+        export_trace_vcd(self.path, entry_chunks, fields=fields, time_field=time_field)
+        with open(self.path) as f:
+            return f.read()
+        pass
+
+    #f test_fields
+    def test_fields(self):
+        """
+        The entries are 1, 2, 3 and 2 - the low half of each word first
+        """
+        words = np.array([0x00020001, 0x00020003], dtype=np.uint32)
+        vcd = self.export(trace_entries([words[:1], words[1:]], data_width=16), fields={"bit0":(0, 1), "val":(1, 3)})
+        self.assertEqual(vcd, ("$timescale 1ns $end\n"
+                               "$scope module trace $end\n"
+                               "$var wire 1 ! bit0 $end\n"
+                               "$var wire 3 \" val [2:0] $end\n"
+                               "$upscope $end\n"
+                               "$enddefinitions $end\n"
+                               "#0\n1!\nb000 \"\n"
+                               "#1\n0!\nb001 \"\n"
+                               "#2\n1!\n"
+                               "#3\n0!\n"
+                               "#4\n"))
+        pass
+
+    #f test_ring_time_field
+    def test_ring_time_field(self):
+        """
+        The ring starts at entry 5, and each entry is {time, data} of 4
+        bits each, with times 1 to 8 from the start
+        """
+        words = np.array([0x7d6c5c4c, 0x3b2a1a8a], dtype=np.uint32)
+        chunks = list(ring_entries(words, 5, data_width=8, chunk_size=2))
+        self.assertEqual([c.tolist() for c in chunks], [[0x1a, 0x2a], [0x3b], [0x4c, 0x5c], [0x6c, 0x7d], [0x8a]])
+        vcd = self.export(chunks, fields={"data":(0, 4), "time":(4, 4)}, time_field="time")
+        self.assertEqual(vcd, ("$timescale 1ns $end\n"
+                               "$scope module trace $end\n"
+                               "$var wire 4 ! data [3:0] $end\n"
+                               "$var wire 4 \" time [3:0] $end\n"
+                               "$upscope $end\n"
+                               "$enddefinitions $end\n"
+                               "#1\nb1010 !\nb0001 \"\n"
+                               "#2\nb0010 \"\n"
+                               "#3\nb1011 !\nb0011 \"\n"
+                               "#4\nb1100 !\nb0100 \"\n"
+                               "#5\nb0101 \"\n"
+                               "#6\nb0110 \"\n"
+                               "#7\nb1101 !\nb0111 \"\n"
+                               "#8\nb1010 !\nb1000 \"\n"
+                               "#9\n"))
+        pass
+
+    #f test_empty
+    def test_empty(self):
+        vcd = self.export(trace_entries([], data_width=8))
+        self.assertEqual(vcd, ("$timescale 1ns $end\n"
+                               "$scope module trace $end\n"
+                               "$var wire 32 ! data [31:0] $end\n"
+                               "$upscope $end\n"
+                               "$enddefinitions $end\n"
+                               "#0\n"))
+        pass
+    pass
+
+#a Histogram tests
+#c TestHistogramTable
+class TestHistogramTable(unittest.TestCase):
+    #f tables
+    @staticmethod
+    def tables(events, alu_ops, presets=(0, 0), address=0, n=16):
+        """
+        Apply (bucket, value) events with the ALU ops of the two trace
+        RAMs (None for a RAM that is not used) to trace RAM models whose
+        words are first set to the presets, and return the n words of
+        each from address
+        """
+        rams = []
+        for (alu_op, preset) in zip(alu_ops, presets):
+            if alu_op is None:
+                rams.append(None)
+                continue
+            model = TraceRamDataPathModel()
+            model.execute([AtrAccessOp.write(address+i, preset) for i in range(n)])
+            model.execute([AtrAccessOp.atomic(address+b, v, alu_op) for (b, v) in events])
+            rams.append(model.mem[address:address+n].copy())
+            pass
+        return rams
+
+    #f random_events
+    @staticmethod
+    def random_events(rng, n=16):
+        """
+        Random (bucket, value) events, leaving some buckets empty, with
+        the count, sum, min and max (None if empty) of each bucket
+        """
+        buckets = [b for b in range(n) if rng.randrange(3) != 0]
+        events = [(rng.choice(buckets), rng.randrange(1000)) for i in range(200)]
+        values = [[v for (b, v) in events if b == i] for i in range(n)]
+        return (events,
+                [len(v) for v in values],
+                [sum(v) for v in values],
+                [min(v) if v else None for v in values],
+                [max(v) if v else None for v in values])
+
+    #f assertNanList
+    def assertNanList(self, array, expected):
+        self.assertEqual([None if np.isnan(x) else x for x in array.tolist()], expected)
+        pass
+
+    #f test_decode_inc_sum
+    def test_decode_inc_sum(self):
+        (events, counts, sums, mins, maxs) = self.random_events(random.Random(14))
+        trace_cfg = TraceCfg()
+        (ram_0, ram_1) = self.tables(events, (t_atr_alu_op.inc32, t_atr_alu_op.sum32), address=0x200)
+        h = decode_histogram(ram_0, ram_1, trace_cfg, ("inc", "sum"), address=0x200)
+        (low, high) = trace_cfg.offset.offset_range(np.arange(0x200, 0x210))
+        self.assertEqual(h.low.tolist(), low.tolist())
+        self.assertEqual(h.high.tolist(), high.tolist())
+        self.assertEqual(h.count.tolist(), counts)
+        self.assertEqual(h.sum.tolist(), sums)
+        self.assertNanList(h.mean, [s / c if c else None for (s, c) in zip(sums, counts)])
+        self.assertIsNone(h.min)
+        self.assertIsNone(h.max)
+        self.assertFalse(h.count_saturated.any())
+        self.assertFalse(h.sum_saturated.any())
+        self.assertEqual(int(h.total()), 200)
+        pass
+
+    #f test_decode_min_max
+    def test_decode_min_max(self):
+        (events, counts, sums, mins, maxs) = self.random_events(random.Random(15))
+        (ram_0, ram_1) = self.tables(events, (t_atr_alu_op.min_max16, t_atr_alu_op.inc32), presets=(0xffff, 0))
+        h = decode_histogram(ram_0, ram_1, TraceCfg(), ("min_max", "inc"))
+        self.assertEqual(h.count.tolist(), counts)
+        self.assertNanList(h.min, mins)
+        self.assertNanList(h.max, maxs)
+        self.assertIsNone(h.sum)
+        self.assertIsNone(h.mean)
+        h = decode_histogram(ram_0, None, TraceCfg(), ("min_max", None))
+        self.assertIsNone(h.count)
+        self.assertNanList(h.min, mins)
+        self.assertNanList(h.max, maxs)
+        pass
+
+    #f test_decode_inc_add
+    def test_decode_inc_add(self):
+        (events, counts, sums, mins, maxs) = self.random_events(random.Random(16))
+        (ram_0, ram_1) = self.tables(events, (t_atr_alu_op.inc16_add16, None))
+        h = decode_histogram(ram_0, ram_1, TraceCfg(), ("inc_add", "push"))
+        self.assertEqual(h.count.tolist(), counts)
+        self.assertEqual(h.sum.tolist(), [min(s, 0xffff) for s in sums])
+        self.assertEqual(h.sum_saturated.tolist(), [s >= 0xffff for s in sums])
+        self.assertFalse(h.count_saturated.any())
+        pass
+
+    #f test_saturation
+    def test_saturation(self):
+        """
+        Each bucket is preset near saturation, and bucket 1 has one event
+        and bucket 2 two; increments wrap to zero, so only bucket 1 has
+        a saturated count
+        """
+        events = [(1, 0x10), (2, 0x10), (2, 0x10)]
+        (ram_0, ram_1) = self.tables(events, (t_atr_alu_op.inc32, t_atr_alu_op.sum32), presets=(0xfffffffe, 0xfffffff0), n=3)
+        h = decode_histogram(ram_0, ram_1, TraceCfg(), ("inc", "sum"))
+        self.assertEqual(h.count.tolist(), [0xfffffffe, 0xffffffff, 0])
+        self.assertEqual(h.sum.tolist(), [0xfffffff0, 0xffffffff, 0xffffffff])
+        self.assertEqual(h.count_saturated.tolist(), [False, True, False])
+        self.assertEqual(h.sum_saturated.tolist(), [False, True, True])
+        self.assertTrue(h.saturated())
+        (ram_0, ram_1) = self.tables(events, (t_atr_alu_op.inc16_add16, None), presets=(0xfffefff0, 0), n=3)
+        h = decode_histogram(ram_0, ram_1, TraceCfg(), ("inc_add", None))
+        self.assertEqual(h.count.tolist(), [0xfffe, 0xffff, 0])
+        self.assertEqual(h.sum.tolist(), [0xfff0, 0xffff, 0xffff])
+        self.assertEqual(h.count_saturated.tolist(), [False, True, False])
+        self.assertEqual(h.sum_saturated.tolist(), [False, True, True])
+        h = decode_histogram(np.zeros(3, dtype=np.uint32), None, TraceCfg(), ("inc", None))
+        self.assertFalse(h.saturated())
+        pass
+
+    #f test_percentile
+    def test_percentile(self):
+        """
+        Two events in each of buckets 0x203 and 0x207 (data 0x20c to
+        0x20f and 0x21c to 0x21f)
+        """
+        events = [(3, 0), (3, 0), (7, 0), (7, 0)]
+        (ram_0, _) = self.tables(events, (t_atr_alu_op.inc32, None), address=0x200)
+        h = decode_histogram(ram_0, None, TraceCfg(), ("inc", None), address=0x200)
+        self.assertEqual(h.percentile(0), 0x20c)
+        self.assertEqual(h.percentile(25), 0x20e)
+        self.assertEqual(h.percentile(50), 0x20f)
+        self.assertEqual(h.percentile(75), 0x21e)
+        self.assertEqual(h.percentile(100), 0x21f)
+        stacked = decode_histogram(np.stack([ram_0, np.zeros(16, dtype=np.uint32)]), None, TraceCfg(), ("inc", None), address=0x200)
+        self.assertNanList(stacked.percentile(0), [0x20c, None])
+        pass
+    pass
+
+#c TestHistogramSampler
+class TestHistogramSampler(unittest.TestCase):
+    #f test_sample_address
+    def test_sample_address(self):
+        """
+        Sample 16 buckets of an inc table from 0x600, twice, from trace
+        RAM models in which bucket 0x600+i has been incremented i times
+        before each sample
+        """
+        (address, n) = (0x600, 16)
+        trace_cfg = TraceCfg()
+        models = (TraceRamDataPathModel(), TraceRamDataPathModel())
+        incs = [AtrAccessOp.atomic(address+i, 0, t_atr_alu_op.inc32) for i in range(n) for j in range(i)]
+        sampler = HistogramSampler(HistogramSampler.read_clear_model(models), trace_cfg, ("inc", None),
+                                   address=address, n=n, clock=lambda:0.0)
+        (low, high) = trace_cfg.offset.offset_range(np.arange(address, address+n))
+        for s in range(2):
+            models[0].execute(incs)
+            h = sampler.sample()
+            self.assertEqual(h.low.tolist(), low.tolist())
+            self.assertEqual(h.high.tolist(), high.tolist())
+            self.assertEqual(h.count.tolist(), list(range(n)))
+            pass
+        h = sampler.histogram()
+        self.assertEqual(h.low.tolist(), low.tolist())
+        self.assertEqual(h.high.tolist(), high.tolist())
+        self.assertEqual(h.count.tolist(), [2*i for i in range(n)])
+        self.assertEqual(int(low[0]), 0x2a00)
+        pass
+    pass
+
+#a Trace encoding tests
+#c TestRunLength
+class TestRunLength(unittest.TestCase):
+    #f push_model
+    @staticmethod
+    def push_model(values, data_width):
+        """
+        Push values into a run-length encoded trace RAM model of the
+        data width, and return the model
+        """
+        model = TraceRamDataPathModel(data_width={8:1, 16:2}[data_width], encoding=1)
+        model.execute([AtrAccessOp.push(v, width=data_width) for v in values])
+        return model
+
+    #f test_encode_matches_model
+    def test_encode_matches_model(self):
+        rng = random.Random(17)
+        for trial in range(100):
+            data_width = rng.choice([8, 16])
+            values = []
+            for run in range(rng.randrange(0, 50)):
+                values += [rng.choice([0, 1, 0xff, 0x1234, 0xffff])] * rng.choice([1, 1, 2, 5, 30])
+                pass
+            model = self.push_model(values, data_width)
+            entries = rle_encode(values, data_width)
+            expanded = [v & ((1 << data_width) - 1) for v in values]
+            reason = f"trial {trial} data_width {data_width}"
+            self.assertEqual(model.num_entries, 4 * len(entries), reason)
+            self.assertEqual(model.mem[:len(entries)].tolist(), entries.tolist(), reason)
+            self.assertEqual(rle_expand(model.mem[:len(entries)], data_width).tolist(), expanded, reason)
+            (run_values, counts) = rle_decode(entries, data_width)
+            self.assertEqual(np.repeat(run_values, counts).tolist(), expanded, reason)
+            self.assertEqual(run_values.dtype, np.uint8 if data_width == 8 else np.uint16, reason)
+            pass
+        pass
+
+    #f test_count_saturation
+    def test_count_saturation(self):
+        """
+        A run of 0x10002 16-bit values fills one entry (count 0xffff) and
+        continues in the next; an 8-bit run is continued after a count
+        of 0xffffff
+        """
+        values = [7] + [0x1234] * 0x10002 + [7]
+        model = self.push_model(values, 16)
+        entries = model.mem[:model.num_entries // 4]
+        self.assertEqual(entries.tolist(), [0x00010007, 0xffff1234, 0x00031234, 0x00010007])
+        self.assertEqual(rle_encode(values, 16).tolist(), entries.tolist())
+        self.assertEqual(rle_expand(entries, 16).tolist(), values)
+        (run_values, counts) = rle_decode([0xffffff12, 0x00000212, 0x00000134], 8)
+        self.assertEqual(run_values.tolist(), [0x12, 0x12, 0x34])
+        self.assertEqual(counts.tolist(), [0xffffff, 2, 1])
+        self.assertEqual(len(rle_expand([0xffffff12, 0x00000212, 0x00000134], 8)), 0x1000002)
+        pass
+    pass
+
+#c TestTimeDelta
+class TestTimeDelta(unittest.TestCase):
+    #f push_model
+    @staticmethod
+    def push_model(times, data, idle_after_escape=True):
+        """
+        Push times and data into a time-delta encoded trace RAM model,
+        with an idle access after each push that needs an escape if
+        required, and return the model
+        """
+        model = TraceRamDataPathModel(encoding=2)
+        last_time = 0
+        for (t, d) in zip(times, data):
+            ops = [AtrAccessOp.push_time_delta(t, d)]
+            if idle_after_escape and ((t - last_time) & 0xffffffff) >= 0xffff:
+                ops.append(AtrAccessOp(address_or_op=0))
+                pass
+            model.execute(ops)
+            last_time = t
+            pass
+        return model
+
+    #f test_encode_matches_model
+    def test_encode_matches_model(self):
+        rng = random.Random(18)
+        for trial in range(100):
+            n = rng.randrange(0, 200)
+            deltas = [rng.choice([0, 1, 2, 0xfffe, 0xffff, 0x10000, 0x1ffff, 0x12345, 0xffff0000]) for i in range(n)]
+            times = (np.cumsum(deltas, dtype=np.int64) & 0xffffffff).tolist()
+            data = [rng.choice([0, 0xffff, rng.randrange(0x10000)]) for i in range(n)]
+            model = self.push_model(times, data)
+            entries = time_delta_encode(times, data)
+            reason = f"trial {trial}"
+            self.assertEqual(model.num_entries, 4 * len(entries), reason)
+            self.assertEqual(model.mem[:len(entries)].tolist(), entries.tolist(), reason)
+            (decoded_times, decoded_data) = time_delta_decode(model.mem[:len(entries)])
+            self.assertEqual(decoded_data.tolist(), data, reason)
+            self.assertEqual((decoded_times & 0xffffffff).tolist(), times, reason)
+            pass
+        pass
+
+    #f test_clamped_delta
+    def test_clamped_delta(self):
+        """
+        After the escape of the second push each push writes the entry of
+        the previous one until the idle access, and the large deltas of
+        the third and fourth pushes are recorded as 0xfffe; the final
+        push has a large delta, so only its escape is written
+        """
+        push = AtrAccessOp.push_time_delta
+        idle = AtrAccessOp(address_or_op=0)
+        model = TraceRamDataPathModel(encoding=2)
+        model.execute([push(0x10, 1), push(0x20010, 2), push(0x50010, 3), push(0x50013, 4), idle,
+                       push(0x60013, 5), idle, push(0x60014, 6), push(0x80000, 7)])
+        entries = model.mem[:model.num_entries // 4]
+        self.assertEqual(entries.tolist(), [0x00100001, 0xffff0002, 0x00000002, 0xfffe0003, 0xfffe0004,
+                                            0xffff0002, 0x00070005, 0x00010006, 0xffff0001])
+        (decoded_times, decoded_data) = time_delta_decode(entries)
+        self.assertEqual(decoded_data.tolist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(decoded_times.tolist(), [0x10, 0x20010, 0x3000e, 0x4000c, 0x60013, 0x60014])
+        pass
+    pass
+
+#a Trigger tests
+#c TestTriggerSimple
+class TestTriggerSimple(unittest.TestCase):
+    #f random_trigger
+    @staticmethod
+    def random_trigger(rng):
+        """
+        Random trigger on the bottom 3 bits of the bytes of the match
+        data, with actions that capture, record data or time, and
+        invalidate the recorded data
+        """
+        trigger = TriggerSimple()
+        trigger.data_src = tuple(DataSrc(rng.randrange(4)) for i in range(2))
+        trigger.match_data_src = tuple(MatchDataSrc(rng.randrange(5)) for i in range(2))
+        trigger.byte_match = tuple(SimpleByteMatch() for i in range(4))
+        for bm in trigger.byte_match:
+            bm.ignore_valid = rng.randrange(2) == 0
+            bm.byte_sel = rng.randrange(8)
+            bm.mask = rng.choice([0, 1, 3, 7])
+            bm.value = rng.randrange(8)
+            bm.cond_sel = SimpleByteMatchCond(rng.randrange(4))
+            pass
+        trigger.actions = [Actions() for i in range(8)]
+        records = rng.randrange(8)
+        for a in trigger.actions:
+            a.record_data = (records & 1) != 0 and rng.randrange(3) == 0
+            a.record_time = (records & 2) != 0 and rng.randrange(3) == 0
+            a.record_invalidate = (records & 4) != 0 and rng.randrange(3) == 0
+            a.capture_data = (rng.randrange(2) == 0, rng.randrange(2) == 0)
+            pass
+        trigger.action_sets = [rng.randrange(8) for i in range(16)]
+        trigger.reset()
+        return trigger
+
+    #f test_apply_array_matches_apply
+    def test_apply_array_matches_apply(self):
+        rng = random.Random(5)
+        for trial in range(300):
+            seed = rng.randrange(1<<30)
+            n = rng.randrange(1, 300)
+            data = [[rng.randrange(8) * 0x1010101 ^ rng.choice([0, 0x102, 0x30400]) for j in range(4)] for i in range(n)]
+            valid = [rng.randrange(4) != 0 for i in range(n)]
+            time = None
+            if rng.randrange(2) == 0:
+                time = [t * 3 + rng.randrange(3) for t in range(n)]
+                pass
+            scalar = self.random_trigger(random.Random(seed))
+            array = self.random_trigger(random.Random(seed))
+            expected = []
+            for i in range(n):
+                op = scalar.apply(data[i], valid[i], None if time is None else time[i])
+                expected.append(0 if op is None else op[0])
+                pass
+            op_valid = []
+            start = 0
+            while start < n:
+                end = start + rng.choice([1, 7, 64, 300])
+                chunk_time = None if time is None else time[start:end]
+                (chunk_op_valid, data_0, data_1) = array.apply_array(data[start:end], valid[start:end], chunk_time)
+                self.assertEqual(data_0.tolist(), [d[0] for d in data[start:end]])
+                self.assertEqual(data_1.tolist(), [d[1] for d in data[start:end]])
+                op_valid += chunk_op_valid.tolist()
+                start = end
+                pass
+            reason = f"trial {trial} seed {seed} match_data_src {scalar.match_data_src} time {time is not None}"
+            self.assertEqual(op_valid, expected, reason)
+            for state in ("time", "recorded_data", "recorded_time", "last_matched"):
+                self.assertEqual(getattr(array, state), getattr(scalar, state), f"{reason} {state}")
+                pass
+            pass
+        pass
+    pass
+
+#a Trigger sequencer tests
+#c TestTriggerSequencer
+class TestTriggerSequencer(unittest.TestCase):
+    #f random_stages
+    @staticmethod
+    def random_stages(rng):
+        """
+        Random stages on the bottom 3 bits of the signal, so that stages
+        both match and fail to match
+        """
+        return [SequencerStage(mask=rng.choice([0, 1, 3, 7]), compare=rng.choice([0, 1, 2, 3, 4, 5]),
+                               counter=rng.choice([0, 1, 2, 3, 5, 0xffff]),
+                               if_true=rng.randrange(4), if_false=rng.randrange(4),
+                               action_if_true=SequencerAction(rng.randrange(8)),
+                               action_if_false=SequencerAction(rng.choice([0, 0, 0, 1, 2, 3, 4, 5, 6, 7])))
+                for i in range(4)]
+
+    #f test_run_matches_step
+    def test_run_matches_step(self):
+        rng = random.Random(19)
+        for trial in range(500):
+            stages = self.random_stages(rng)
+            circular = rng.randrange(2) == 0
+            fifo_size = rng.choice([5, 50, 2047])
+            window = rng.choice([1, 4, 64])
+            signals = np.array([rng.randrange(8) for i in range(rng.randrange(1, 2000))], dtype=np.uint32)
+            reason = f"trial {trial} circular {circular} fifo_size {fifo_size} window {window}"
+            stepped = TriggerSequencer(stages, circular=circular)
+            stepped.fifo_size = fifo_size
+            expected = [(i, v) for (i, v) in enumerate([stepped.step(int(s)) for s in signals]) if v is not None]
+            compiled = TriggerSequencer(stages, circular=circular)
+            compiled.fifo_size = fifo_size
+            (indices, values) = compiled.run(signals, window=window)
+            self.assertEqual(list(zip(indices.tolist(), values.tolist())), expected, reason)
+            for state in ("stage", "residence", "time", "done", "num_stored"):
+                self.assertEqual(getattr(compiled, state), getattr(stepped, state), f"{reason} {state}")
+                pass
+            pass
+        pass
+
+    #f test_capture_after
+    def test_capture_after(self):
+        """
+        The sequencer stores the first signal matching in the bottom
+        byte and the 5 after it, and ends at the next
+        """
+        signals = [1, 2, 3, 0x112, 0x12, 7, 8, 9, 10, 11, 0x12, 13]
+        sequencer = TriggerSequencer.capture_after(0xff, 0x12, 5)
+        stored = []
+        for s in signals:
+            stored.append(sequencer.step(s))
+            self.assertEqual(sequencer.done, len(stored) > 9)
+            pass
+        self.assertEqual(stored, [None] * 3 + [0x112, 0x12, 7, 8, 9, 10] + [None] * 3)
+        self.assertEqual(sequencer.num_stored, 6)
+        sequencer.reset()
+        (indices, values) = sequencer.run(np.array(signals, dtype=np.uint32))
+        self.assertEqual(indices.tolist(), [3, 4, 5, 6, 7, 8])
+        self.assertEqual(values.tolist(), [0x112, 0x12, 7, 8, 9, 10])
+        self.assertTrue(sequencer.done)
+        pass
+    pass
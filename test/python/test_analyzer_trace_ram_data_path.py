@@ -28,15 +28,28 @@ Tests for 'analyzer_trace_ram_data_path'
 
 * Atomic data forwarding - paths with delay 0, 1, 2, 3
 
+* Random mix of accesses, pushes and pops checked against the software model
+
+* Run-length encoded 8-bit and 16-bit pushes, with pops during runs, checked against the software model
+
+* Time-delta encoded pushes with small and large deltas, back-to-back and with idle cycles and pops, checked against the software model
+
+* Not fifo_per_ram, pop(empty), push(full), pop(full): pop, push * 4200, reads, pop*2, push*5, reads, pops checked against the software model
+
+* Seeded random stimulus, generated and checked against the software model as the test runs, for each FIFO configuration; ALU access bursts cover the forwarding paths at distances 0 to 3 (test_analyzer_trace_ram_data_path_long runs the same for millions of operations)
+
 """
 
 #a Imports
 from queue import Queue
+from collections import deque
 from regress.utils import t_fifo_status
 from regress.analyzer import t_analyzer_data4, t_analyzer_filter_cfg
 from regress.analyzer import t_analyzer_trace_cfg_fifo
 from regress.analyzer import t_analyzer_trace_access_req, t_analyzer_trace_access_resp, t_atr_address_op, t_atr_alu_op
-from regress.analyzer import AtrAccessOp
+from regress.analyzer import AtrAccessOp, TraceRamDataPathModel, TraceRamRandomStimulus
+from regress.analyzer import HarnessStats
+import random
 
 from cdl.sim     import ThExecFile, LogEventParser
 from cdl.sim     import HardwareThDut
@@ -45,7 +58,7 @@ from typing import Optional
 
 #a AnalyzerTraceRamDataPathTests
 #c AnalyzerTraceRamDataPathTest_Base
-class AnalyzerTraceRamDataPathTest_Base(ThExecFile):
+class AnalyzerTraceRamDataPathTest_Base(HarnessStats, ThExecFile):
     th_name = "Analyzer trace data ram path test"
     access_ops = [AtrAccessOp.clear(i) for i in range(1)]
     expected_data = []
@@ -55,6 +68,7 @@ class AnalyzerTraceRamDataPathTest_Base(ThExecFile):
     fifo_per_ram = 1
     ram_of_fifo = 0
     enable_push = 1
+    encoding = 0
     # This can be set at initialization time to reduce the number of explicit test cases
     def __init__(self, **kwargs) -> None:
         super().__init__(**kwargs)
@@ -67,7 +81,7 @@ class AnalyzerTraceRamDataPathTest_Base(ThExecFile):
     #f run__init
     def run__init(self) -> None:
         self.data_count = 0
-        self.expected_data = self.expected_data[:]
+        self.expected_data = deque(self.expected_data)
         self.bfm_wait(10)
         pass
     #f tick
@@ -78,7 +92,7 @@ class AnalyzerTraceRamDataPathTest_Base(ThExecFile):
             if len(self.expected_data) == 0:
                 self.failtest(f"access_resp had {self.data_count} valid data out {d} but did not expect that")
                 return
-            e = self.expected_data.pop(0)
+            e = self.expected_data.popleft()
             self.compare_expected(f"access_resp {self.data_count} data out", d, e)
             pass                
         self.bfm_wait(1)
@@ -88,19 +102,26 @@ class AnalyzerTraceRamDataPathTest_Base(ThExecFile):
         self.verbose.message(f"Test {self.__class__.__name__}")
         self.verbose.set_level(self.verbose.level_info)
 
+        self.stats_phase("configuration")
         self.trace_cfg_fifo__data_width.drive(self.data_width)
         self.trace_cfg_fifo__journal.drive(self.journal)
         self.trace_cfg_fifo__ram_of_fifo.drive(self.ram_of_fifo)
         self.trace_cfg_fifo__fifo_per_ram.drive(self.fifo_per_ram)
         self.trace_cfg_fifo__enable_push.drive(self.enable_push)
+        self.trace_cfg_fifo__encoding.drive(self.encoding)
         idle = AtrAccessOp()
         idle.drive_access_req(self, "access_req")
         self.tick()
 
-        for a in self.access_ops:
+        # Each access is counted as a transaction
+        self.stats_phase("accesses")
+        for a in self.access_op_iter():
             a.drive_access_req(self, "access_req")
             self.tick()
+            self.stats_transaction(1)
             pass
+
+        self.stats_phase("drain")
         
         idle.drive_access_req(self, "access_req")
         for i in range(10):
@@ -111,8 +132,13 @@ class AnalyzerTraceRamDataPathTest_Base(ThExecFile):
         self.die_event.fire()
         self.bfm_wait(10)
         pass
+    #f access_op_iter
+    def access_op_iter(self):
+        return iter(self.access_ops)
+
     #f run__finalize
     def run__finalize(self) -> None:
+        self.stats_report()
         self.passtest("Test completed")
         pass
     pass
@@ -370,6 +396,185 @@ class AnalyzerTraceRamDataPathTest_12(AnalyzerTraceRamDataPathTest_Base):
     access_ops += [AtrAccessOp.read(i) for i in range(10)]
     pass
 
+#c AnalyzerTraceRamDataPathTest_13
+class AnalyzerTraceRamDataPathTest_13(AnalyzerTraceRamDataPathTest_Base):
+    """
+    Random mix of ALU accesses, pushes and pops, with expected data from the model
+    """
+    rng = random.Random(13)
+    access_ops = []
+    for i in range(1000):
+        address = 1024 + rng.randrange(16)
+        data = rng.choice([rng.randrange(1<<32), rng.randrange(1<<16), 0xffffffff])
+        op = rng.randrange(6)
+        if op == 0:
+            access_ops.append(AtrAccessOp.atomic(address, data, t_atr_alu_op(rng.randrange(1,10))))
+            pass
+        elif op == 1:
+            access_ops.append(AtrAccessOp.read(address))
+            pass
+        elif op == 2:
+            access_ops.append(AtrAccessOp.clear(address, id=rng.randrange(2)))
+            pass
+        elif op == 3:
+            access_ops.append(AtrAccessOp.pop())
+            pass
+        else:
+            access_ops.append(AtrAccessOp.push(data))
+            pass
+        pass
+    model = TraceRamDataPathModel()
+    expected_data = [d for (id, d) in model.execute(access_ops) if id == 1]
+    pass
+
+#c AnalyzerTraceRamDataPathTest_14
+class AnalyzerTraceRamDataPathTest_14(AnalyzerTraceRamDataPathTest_Base):
+    """
+    Run-length encoded 16-bit pushes with occasional pops, with expected data from the model
+    """
+    data_width = 2
+    encoding = 1
+    rng = random.Random(14)
+    access_ops = []
+    for i in range(200):
+        access_ops += [AtrAccessOp.push(rng.randrange(4), width=16)] * rng.choice([1, 1, 2, 7])
+        if rng.randrange(8) == 0:
+            access_ops.append(AtrAccessOp.pop())
+            pass
+        pass
+    access_ops += [AtrAccessOp.pop() for i in range(200)]
+    model = TraceRamDataPathModel(data_width=data_width, encoding=encoding)
+    expected_data = [d for (id, d) in model.execute(access_ops) if id == 1]
+    pass
+
+#c AnalyzerTraceRamDataPathTest_15
+class AnalyzerTraceRamDataPathTest_15(AnalyzerTraceRamDataPathTest_14):
+    """
+    Run-length encoded 8-bit pushes in a journal, with expected data from the model
+    """
+    data_width = 1
+    journal = 1
+    rng = random.Random(15)
+    access_ops = []
+    for i in range(2500):
+        access_ops += [AtrAccessOp.push(rng.randrange(256), width=8)] * rng.choice([1, 3])
+        pass
+    access_ops += [AtrAccessOp.pop() for i in range(100)]
+    model = TraceRamDataPathModel(data_width=data_width, journal=journal, encoding=1)
+    expected_data = [d for (id, d) in model.execute(access_ops) if id == 1]
+    pass
+
+#c AnalyzerTraceRamDataPathTest_16
+class AnalyzerTraceRamDataPathTest_16(AnalyzerTraceRamDataPathTest_Base):
+    """
+    Time-delta encoded pushes, with escapes followed by idle cycles,
+    further pushes and pops, with expected data from the model
+    """
+    encoding = 2
+    rng = random.Random(16)
+    access_ops = []
+    time = 0
+    for i in range(600):
+        time = (time + rng.choice([0, 1, 3, 0xfffe, 0xffff, 0x10000, 0x123456])) & 0xffffffff
+        access_ops.append(AtrAccessOp.push_time_delta(time, rng.randrange(1<<16)))
+        op = rng.randrange(4)
+        if op == 0:
+            access_ops.append(AtrAccessOp())
+            pass
+        elif op == 1:
+            access_ops.append(AtrAccessOp.pop())
+            pass
+        pass
+    access_ops += [AtrAccessOp()]
+    access_ops += [AtrAccessOp.pop() for i in range(400)]
+    model = TraceRamDataPathModel(encoding=encoding)
+    expected_data = [d for (id, d) in model.execute(access_ops) if id == 1]
+    pass
+
+#c AnalyzerTraceRamDataPathRandom_Base
+class AnalyzerTraceRamDataPathRandom_Base(AnalyzerTraceRamDataPathTest_Base):
+    """
+    Seeded random stimulus, generated a chunk at a time with the
+    expected data for each chunk from the model
+    """
+    seed = 17
+    num_ops = 20000
+    reset_ptrs = True
+    #f access_op_iter
+    def access_op_iter(self):
+        self.verbose.info(f"Random stimulus seed {self.seed} for {self.num_ops} operations")
+        stimulus = TraceRamRandomStimulus(self.seed, self.num_ops, data_width=self.data_width, encoding=self.encoding,
+                                          reset_ptrs=self.reset_ptrs)
+        model = TraceRamDataPathModel(data_width=self.data_width, journal=self.journal, fifo_per_ram=self.fifo_per_ram,
+                                      enable_push=self.enable_push, encoding=self.encoding)
+        for ops in stimulus.chunks():
+            self.expected_data.extend([d for (id, d) in model.execute(ops) if id == 1])
+            for op in ops:
+                yield op
+                pass
+            self.verbose.info(f"Random stimulus {stimulus.num_generated} operations, {self.data_count} responses checked")
+            pass
+        self.verbose.info(f"Forwarding distances 0 to 3: {stimulus.forward_counts}")
+        pass
+    pass
+
+#c AnalyzerTraceRamDataPathRandom_17
+class AnalyzerTraceRamDataPathRandom_17(AnalyzerTraceRamDataPathRandom_Base):
+    seed = 17
+    pass
+
+#c AnalyzerTraceRamDataPathRandom_18
+class AnalyzerTraceRamDataPathRandom_18(AnalyzerTraceRamDataPathRandom_Base):
+    seed = 18
+    data_width = 2
+    journal = 1
+    pass
+
+#c AnalyzerTraceRamDataPathRandom_19
+class AnalyzerTraceRamDataPathRandom_19(AnalyzerTraceRamDataPathRandom_Base):
+    seed = 19
+    data_width = 1
+    encoding = 1
+    pass
+
+#c AnalyzerTraceRamDataPathRandom_20
+class AnalyzerTraceRamDataPathRandom_20(AnalyzerTraceRamDataPathRandom_Base):
+    seed = 20
+    encoding = 2
+    pass
+
+#c AnalyzerTraceRamDataPathTest_21
+class AnalyzerTraceRamDataPathTest_21(AnalyzerTraceRamDataPathTest_Base):
+    """
+    Check pop at empty, push at full, pop when full, etc for a FIFO
+    spread over both SRAMs (not fifo_per_ram), which is full at 4095
+    entries, with expected data from the model
+    """
+    fifo_per_ram = 0
+    access_ops = []
+    access_ops += [AtrAccessOp.pop(id=0) for i in range(10)]
+    access_ops += [AtrAccessOp.push(i) for i in range(4200)]
+    access_ops += [AtrAccessOp.read(i) for i in range(10)]
+    access_ops += [AtrAccessOp.read(2040+i) for i in range(8)]
+    access_ops += [AtrAccessOp.pop() for i in range(2)]
+    access_ops += [AtrAccessOp.push(i+5000) for i in range(5)]
+    access_ops += [AtrAccessOp.read(2040+i) for i in range(8)]
+    access_ops += [AtrAccessOp.pop() for i in range(10)]
+    model = TraceRamDataPathModel(fifo_per_ram=fifo_per_ram)
+    expected_data = [d for (id, d) in model.execute(access_ops) if id == 1]
+    pass
+
+#c AnalyzerTraceRamDataPathRandom_22
+class AnalyzerTraceRamDataPathRandom_22(AnalyzerTraceRamDataPathRandom_Base):
+    """
+    FIFO spread over both SRAMs, without pointer resets so that it fills
+    """
+    seed = 22
+    num_ops = 120000
+    fifo_per_ram = 0
+    reset_ptrs = False
+    pass
+
 #a Hardware and test instantiation
 #c AnalyzerTraceRamDataPathHardware
 class AnalyzerTraceRamDataPathHardware(HardwareThDut):
@@ -402,6 +607,16 @@ class TestAnalyzerTraceRamDataPath(TestCase):
               "10": (AnalyzerTraceRamDataPathTest_10, 10*1000, {}),              
               "11": (AnalyzerTraceRamDataPathTest_11, 10*1000, {}),              
               "12": (AnalyzerTraceRamDataPathTest_12, 2*1000, {}),              
+              "13": (AnalyzerTraceRamDataPathTest_13, 4*1000, {}),
+              "14": (AnalyzerTraceRamDataPathTest_14, 4*1000, {}),
+              "15": (AnalyzerTraceRamDataPathTest_15, 20*1000, {}),
+              "16": (AnalyzerTraceRamDataPathTest_16, 8*1000, {}),
+              "17": (AnalyzerTraceRamDataPathRandom_17, 120*1000, {}),
+              "18": (AnalyzerTraceRamDataPathRandom_18, 120*1000, {}),
+              "19": (AnalyzerTraceRamDataPathRandom_19, 120*1000, {}),
+              "20": (AnalyzerTraceRamDataPathRandom_20, 120*1000, {}),
+              "21": (AnalyzerTraceRamDataPathTest_21, 12*1000, {}),
+              "22": (AnalyzerTraceRamDataPathRandom_22, 720*1000, {}),
               "smoke": (AnalyzerTraceRamDataPathTest_0, 2*1000, {}),              
     }
 
@@ -0,0 +1,44 @@
+#a Documentation
+"""
+Long random tests for 'analyzer_trace_ram_data_path', for overnight runs
+
+* Seeded random stimulus of millions of operations, generated and checked against the software model as the test runs, for 32-bit and 16-bit journal FIFOs, and for a 32-bit FIFO spread over both SRAMs
+
+The stimulus and checking are those of the random tests in
+test_analyzer_trace_ram_data_path; the seed of each test is fixed so
+that a failure can be rerun.
+"""
+
+#a Imports
+from test_analyzer_trace_ram_data_path import AnalyzerTraceRamDataPathRandom_17, AnalyzerTraceRamDataPathRandom_18, AnalyzerTraceRamDataPathRandom_22
+from test_analyzer_trace_ram_data_path import AnalyzerTraceRamDataPathHardware
+
+from cdl.sim     import TestCase
+
+#a AnalyzerTraceRamDataPathRandomLong tests
+#c AnalyzerTraceRamDataPathRandomLong_0
+class AnalyzerTraceRamDataPathRandomLong_0(AnalyzerTraceRamDataPathRandom_17):
+    seed = 1000
+    num_ops = 4*1000*1000
+    pass
+
+#c AnalyzerTraceRamDataPathRandomLong_1
+class AnalyzerTraceRamDataPathRandomLong_1(AnalyzerTraceRamDataPathRandom_18):
+    seed = 1001
+    num_ops = 4*1000*1000
+    pass
+
+#c AnalyzerTraceRamDataPathRandomLong_2
+class AnalyzerTraceRamDataPathRandomLong_2(AnalyzerTraceRamDataPathRandom_22):
+    seed = 1002
+    num_ops = 4*1000*1000
+    pass
+
+#a Hardware and test instantiation
+#c TestAnalyzerTraceRamDataPathLong
+class TestAnalyzerTraceRamDataPathLong(TestCase):
+    hw = AnalyzerTraceRamDataPathHardware
+    _tests = {"0": (AnalyzerTraceRamDataPathRandomLong_0, 24*1000*1000, {}),
+              "1": (AnalyzerTraceRamDataPathRandomLong_1, 24*1000*1000, {}),
+              "2": (AnalyzerTraceRamDataPathRandomLong_2, 24*1000*1000, {}),
+    }
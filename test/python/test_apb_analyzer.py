@@ -22,6 +22,7 @@ from regress.utils import t_dprintf_req_4, t_dprintf_byte, Dprintf, t_dbg_master
 from regress.analyzer import t_analyzer_data4, t_analyzer_trace_op4
 from regress.analyzer import TbApbAddressMap, Filter, FilterAcceptAll, FilterChanging, TraceCfg
 from regress.analyzer import AnalyzerSrc, TriggerSimple
+from regress.analyzer import HarnessStats
 
 from cdl.utils   import csr
 from cdl.sim     import ThExecFile, LogEventParser
@@ -30,7 +31,7 @@ from cdl.sim     import TestCase
 from typing import Optional
 
 #c ApbAnalyzerTest_Base
-class ApbAnalyzerTest_Base(ThExecFile):
+class ApbAnalyzerTest_Base(HarnessStats, ThExecFile):
     th_name = "Simple Analyzer Test Harness"
 
     th_name = "Dbg script analyzer trigger test harness"
@@ -64,7 +65,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         self.verbose.message(f"Test {self.__class__.__name__}")
         self.verbose.set_level(self.verbose.level_info)
 
-        self.apb = ApbMaster(self, "apb_request",  "apb_response")
+        self.apb = self.stats_wrap(ApbMaster(self, "apb_request",  "apb_response"))
         self.apb_map = TbApbAddressMap()
         self.bfm_wait(10)
         pass
@@ -72,6 +73,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
     def run(self) -> None:
 
         self.verbose.info("Setting up test")
+        self.stats_phase("configuration")
 
         self.apb.reg(self.apb_map.analyzer_ctl.select).write(1<<31)
         self.bfm_wait(10)
@@ -99,8 +101,10 @@ class ApbAnalyzerTest_Base(ThExecFile):
             self.apb.reg(r).write(wd)
             pass
 
+        self.stats_phase("trigger wait")
         self.bfm_wait(200)
 
+        self.stats_phase("readout")
         fs0 = self.apb.reg(self.apb_map.analyzer_trace.fifo_status_0).read()
         self.verbose.info(f"Read fifo status 0 {fs0} (using as FIFO so not empty)")
         fs1 = self.apb.reg(self.apb_map.analyzer_trace.fifo_status_1).read()
@@ -128,6 +132,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         pass
     #f run__finalize
     def run__finalize(self) -> None:
+        self.stats_report()
         self.passtest("Test completed")
         pass
     pass
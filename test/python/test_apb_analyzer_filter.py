@@ -21,6 +21,7 @@ from regress.apb.bfm     import ApbMaster
 from queue import Queue
 from regress.utils import t_dprintf_req_4, t_dprintf_byte, Dprintf, t_dbg_master_request, t_dbg_master_response, DprintfBus, SramAccessBus, SramAccessRead, SramAccessWrite, DbgMaster, DbgMasterMuxScript, DbgMasterSramScript, DbgMasterFifoScript, FifoStatus, t_sram_access_req, t_sram_access_resp
 from regress.analyzer import TbApbAddressMap, Filter, t_analyzer_data4, FilterAcceptAll, FilterChanging
+from regress.analyzer import HarnessStats
 
 from cdl.utils   import csr
 from cdl.sim     import ThExecFile, LogEventParser
@@ -29,7 +30,7 @@ from cdl.sim     import TestCase
 from typing import Optional
 
 #c ApbAnalyzerTest_Base
-class ApbAnalyzerTest_Base(ThExecFile):
+class ApbAnalyzerTest_Base(HarnessStats, ThExecFile):
     th_name = "Utils dprintf test harness"
     sram_inter_delay = 0
     # This can be set at initialization time to reduce the number of explicit test cases
@@ -43,7 +44,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         pass
     #f run__init
     def run__init(self) -> None:
-        self.apb = ApbMaster(self, "apb_request",  "apb_response")
+        self.apb = self.stats_wrap(ApbMaster(self, "apb_request",  "apb_response"))
         self.apb_map = TbApbAddressMap()
         self.bfm_wait(10)
         pass
@@ -52,6 +53,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         self.verbose.message(f"Test {self.__class__.__name__}")
         self.verbose.set_level(self.verbose.level_info)
 
+        self.stats_phase("configuration")
         self.apb.reg(self.apb_map.analyzer_src.cfg).write(0x11110001)
 
         self.apb.reg(self.apb_map.analyzer_ctl.select).write(1<<31)
@@ -102,6 +104,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         pass
     #f run__finalize
     def run__finalize(self) -> None:
+        self.stats_report()
         self.passtest("Test completed")
         pass
     pass
@@ -118,6 +121,7 @@ class ApbAnalyzerHardware(HardwareThDut):
     reset_desc = {"name":"reset_n", "init_value":0, "wait":5}
     module_name = "tb_analyzer"
     dut_inputs  = {"apb_request":t_apb_request,
+                   "trace_op_capture_index":6,
     }
     dut_outputs = {"apb_response":t_apb_response,
                    "analyzer_data4":t_analyzer_data4,
@@ -22,6 +22,7 @@ from queue import Queue
 from regress.utils import t_dprintf_req_4, t_dprintf_byte, Dprintf, t_dbg_master_request, t_dbg_master_response, DprintfBus, SramAccessBus, SramAccessRead, SramAccessWrite, DbgMaster, DbgMasterMuxScript, DbgMasterSramScript, DbgMasterFifoScript, FifoStatus, t_sram_access_req, t_sram_access_resp
 from regress.analyzer import TbApbAddressMap, Filter, t_analyzer_data4, FilterAcceptAll, FilterChanging
 from regress.analyzer import AnalyzerSrc
+from regress.analyzer import HarnessStats
 
 from cdl.utils   import csr
 from cdl.sim     import ThExecFile, LogEventParser
@@ -30,7 +31,7 @@ from cdl.sim     import TestCase
 from typing import Optional
 
 #c ApbAnalyzerTest_Base
-class ApbAnalyzerTest_Base(ThExecFile):
+class ApbAnalyzerTest_Base(HarnessStats, ThExecFile):
     
     th_name = "Apb target analyzer source test harness"
     tgt_mux_sel = 0
@@ -53,7 +54,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         self.verbose.set_level(self.verbose.level_info)
         self.verbose.message(f"Test {self.__class__.__name__}")
 
-        self.apb = ApbMaster(self, "apb_request",  "apb_response")
+        self.apb = self.stats_wrap(ApbMaster(self, "apb_request",  "apb_response"))
         self.apb_map = TbApbAddressMap()
         self.bfm_wait(10)
 
@@ -79,6 +80,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
     #f run
     def run(self) -> None:
 
+        self.stats_phase("configuration")
         self.verbose.info("Setting filter cfg")
         for (r,wd) in self.test_filter.apb_writes(self.apb_map.analyzer_cfg):
             self.apb.reg(r).write(wd)
@@ -97,6 +99,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
                 pass
             pass
 
+        self.stats_phase("trigger wait")
         filtered_data = []
         time = 0
         while len(filtered_data) < self.num_data:
@@ -115,6 +118,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
                 pass
             pass
 
+        self.stats_phase("readout")
         for i in range(len(filtered_data)):
             e = expected_data[i]
             f = filtered_data[i]
@@ -130,6 +134,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         pass
     #f run__finalize
     def run__finalize(self) -> None:
+        self.stats_report()
         self.passtest("Test completed")
         pass
     pass
@@ -203,6 +208,7 @@ class ApbAnalyzerHardware(HardwareThDut):
     reset_desc = {"name":"reset_n", "init_value":0, "wait":5}
     module_name = "tb_analyzer"
     dut_inputs  = {"apb_request":t_apb_request,
+                   "trace_op_capture_index":6,
     }
     dut_outputs = {"apb_response":t_apb_response,
                    "analyzer_data4":t_analyzer_data4,
@@ -16,13 +16,15 @@
 #
 
 #a Imports
+import numpy as np
 from regress.apb.structs import t_apb_request, t_apb_response
 from regress.apb.bfm     import ApbMaster
 from queue import Queue
 from regress.utils import t_dprintf_req_4, t_dprintf_byte, Dprintf, t_dbg_master_request, t_dbg_master_response, DprintfBus, SramAccessBus, SramAccessRead, SramAccessWrite, DbgMaster, DbgMasterMuxScript, DbgMasterSramScript, DbgMasterFifoScript, FifoStatus, t_sram_access_req, t_sram_access_resp
 from regress.analyzer import t_analyzer_data4, t_analyzer_trace_op4
 from regress.analyzer import TbApbAddressMap, Filter, FilterAcceptAll, FilterChanging, TraceCfg
-from regress.analyzer import AnalyzerSrc, TriggerSimple
+from regress.analyzer import AnalyzerSrc, TriggerSimple, TraceReader, AtrAccessOp
+from regress.analyzer import HarnessStats, TraceOpWait
 
 from cdl.utils   import csr
 from cdl.sim     import ThExecFile, LogEventParser
@@ -31,7 +33,7 @@ from cdl.sim     import TestCase
 from typing import Optional
 
 #c ApbAnalyzerTest_Base
-class ApbAnalyzerTest_Base(ThExecFile):
+class ApbAnalyzerTest_Base(HarnessStats, TraceOpWait, ThExecFile):
     
     th_name = "Apb target analyzer trigger test harness"
     tgt_mux_sel = 0
@@ -67,7 +69,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         self.verbose.set_level(self.verbose.level_info)
         self.verbose.message(f"Test {self.__class__.__name__}")
 
-        self.apb = ApbMaster(self, "apb_request",  "apb_response")
+        self.apb = self.stats_wrap(ApbMaster(self, "apb_request",  "apb_response"))
         self.apb_map = TbApbAddressMap()
         self.bfm_wait(10)
 
@@ -90,11 +92,8 @@ class ApbAnalyzerTest_Base(ThExecFile):
         self.apb.reg(self.apb_map.analyzer_ctl.wrd).write(self.tgt_mux_sel)
         
         pass
-    #f run
-    def run(self) -> None:
-
-        self.verbose.info("Setting up test")
-
+    #f setup_writes
+    def setup_writes(self):
         writes = []
         writes += self.trigger.apb_writes(self.apb_map.analyzer_cfg)
         writes += self.trigger.apb_writes_control(self.apb_map.analyzer_cfg, enable=0, clear=1, start=0, stop=0, timer_divide=0)
@@ -104,26 +103,29 @@ class ApbAnalyzerTest_Base(ThExecFile):
         writes += self.test_filter.apb_writes(self.apb_map.analyzer_cfg)
         writes += self.test_trace.apb_writes(self.apb_map.analyzer_cfg)
         writes += self.src.apb_writes(self.apb_map.analyzer_src)
+        return writes
+
+    #f run
+    def run(self) -> None:
+
+        self.verbose.info("Setting up test")
+        self.stats_phase("configuration")
+
+        writes = self.setup_writes()
         
         for (r,wd) in writes:
             self.apb.reg(r).write(wd)
             pass
 
-        triggered_count = 0
-        time = 0
-        while triggered_count < self.num_triggers:
-            self.bfm_wait(1)
-            time += 1
-            if time > self.timeout:
-                self.failtest(f"Timeout waiting for trigger data {triggered_count}")
-                break
-            if self.analyzer_trace_op__op_valid.value() != 0:
-                triggered_count += 1
-                pass
+        self.stats_phase("trigger wait")
+        triggered_count = self.wait_for_trace_ops(self.num_triggers, self.timeout)
+        if triggered_count < self.num_triggers:
+            self.failtest(f"Timeout waiting for trigger data {triggered_count}")
             pass
 
         self.bfm_wait(10)
         
+        self.stats_phase("readout")
         self.verbose.info("Check data out")
         fs0 = self.apb.reg(self.apb_map.analyzer_trace.fifo_status_0).read()
         self.verbose.info(f"Read fifo status 0 {fs0} (using as FIFO so not empty)")
@@ -143,6 +145,11 @@ class ApbAnalyzerTest_Base(ThExecFile):
         d0 = self.apb.reg(self.apb_map.analyzer_trace.pop0).read()
         self.compare_expected("Data captured",d0,9)
 
+        reader = TraceReader(self.apb_map.analyzer_trace)
+        data = reader.read_apb(lambda r:self.apb.reg(r).read(), max_entries=8)
+        self.compare_expected("Number of trace entries read",len(data),8)
+        self.compare_expected_list("Data captured by trace reader", [11+2*i for i in range(len(data))], data.tolist())
+
         self.verbose.info("Data compared")
         self.bfm_wait_until_test_done(100)
         self.die_event.fire()
@@ -150,6 +157,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         pass
     #f run__finalize
     def run__finalize(self) -> None:
+        self.stats_report()
         self.passtest("Test completed")
         pass
     pass
@@ -158,6 +166,109 @@ class ApbAnalyzerTest_Base(ThExecFile):
 class ApbAnalyzerTest_0(ApbAnalyzerTest_Base):
     pass
 
+#c ApbAnalyzerTest_1
+class ApbAnalyzerTest_1(ApbAnalyzerTest_Base):
+    """
+    Test the auto-incrementing read and read-clear registers
+    """
+    base = 1024
+    #f run
+    def run(self) -> None:
+        reader = TraceReader(self.apb_map.analyzer_trace)
+        read_reg = lambda r:self.apb.reg(r).read()
+        write_reg = lambda r,d:self.apb.reg(r).write(d)
+
+        self.verbose.info("Write table in RAM 1")
+        ops = [AtrAccessOp.write(self.base+i, 0x1000+i) for i in range(16)]
+        reader.execute_apb(read_reg, write_reg, ops, ram=1)
+
+        self.verbose.info("Read and clear table in two halves")
+        data = reader.read_table_apb(read_reg, write_reg, self.base, 8, clear=True, ram=1).tolist()
+        data += [read_reg(self.apb_map.analyzer_trace.read_clear_inc) for i in range(8)]
+        self.compare_expected_list("Table data", [0x1000+i for i in range(16)], data)
+
+        self.verbose.info("Read table again")
+        data = reader.read_table_apb(read_reg, write_reg, self.base, 16, ram=1).tolist()
+        self.compare_expected_list("Cleared table data", [0]*16, data)
+
+        self.verbose.info("Read table with individual accesses")
+        ops = [AtrAccessOp.write(self.base+i, 0x2000+i) for i in range(4)]
+        ops += AtrAccessOp.read_range(self.base, 4)
+        data = reader.execute_apb(read_reg, write_reg, ops, ram=1).tolist()
+        self.compare_expected_list("Table data", [0x2000+i for i in range(4)], data)
+
+        self.bfm_wait_until_test_done(100)
+        self.die_event.fire()
+        self.bfm_wait(10)
+        pass
+    pass
+
+#c ApbAnalyzerTest_2
+class ApbAnalyzerTest_2(ApbAnalyzerTest_Base):
+    """
+    Test ping-pong histograms: RAM 0 pushes the data of every trace op to
+    its FIFO, while RAM 1 counts the trace ops in one half and then (after
+    a swap) the other half; the two halves together must match the FIFO
+    """
+    test_trace = TraceCfg()
+    test_trace.ping_pong = True
+    trigger = TriggerSimple(
+        data_srcs = ("d0", "d1"),
+        trace_data_srcs=["d0", "d1"],
+        trace_ops=["push", "inc"],
+    )
+    trigger.byte_match[0].value = 0xff
+    trigger.action_sets[15] = 1
+    trigger.actions[1].capture_data = (True, True)
+    run_time = 200
+    #f run
+    def run(self) -> None:
+        reader = TraceReader(self.apb_map.analyzer_trace)
+        read_reg = lambda r:self.apb.reg(r).read()
+        write_reg = lambda r,d:self.apb.reg(r).write(d)
+        cfg = self.apb_map.analyzer_cfg
+
+        self.verbose.info("Clear histogram RAM")
+        reader.read_table_apb(read_reg, write_reg, 0, 2048, clear=True, ram=1)
+
+        self.verbose.info("Start capture into half 0")
+        self.test_trace.ping_pong_half = 0
+        writes = self.setup_writes()
+        writes += self.test_trace.apb_writes_control(cfg, enable=True)
+        for (r,wd) in writes:
+            write_reg(r, wd)
+            pass
+        self.bfm_wait(self.run_time)
+
+        self.verbose.info("Swap to half 1 while capturing")
+        for (r,wd) in self.test_trace.apb_writes_swap(cfg):
+            write_reg(r, wd)
+            pass
+        self.bfm_wait(self.run_time)
+
+        self.verbose.info("Stop the trigger (so the FIFO cannot fill) and read both halves")
+        for (r,wd) in self.trigger.apb_writes_control(cfg, enable=0, clear=0, start=0, stop=0, timer_divide=0):
+            write_reg(r, wd)
+            pass
+        self.bfm_wait(20)
+        (address, n) = self.test_trace.ping_pong_table()
+        half_0 = reader.read_table_apb(read_reg, write_reg, address, n, clear=True, ram=1)
+        (address, n) = self.test_trace.ping_pong_table(half=1)
+        half_1 = reader.read_table_apb(read_reg, write_reg, address, n, clear=True, ram=1)
+
+        data = reader.read_apb(read_reg)
+        self.verbose.info(f"Captured {len(data)} trace ops, {half_0.sum()} in half 0 and {half_1.sum()} in half 1")
+        expected = np.bincount(self.test_trace.ping_pong_offset(data), minlength=n)
+        self.compare_expected("Trace ops counted in half 0", half_0.sum() > 0, True)
+        self.compare_expected("Trace ops counted in half 1", half_1.sum() > 0, True)
+        self.compare_expected_list("Histogram of both halves", expected.tolist(), (half_0 + half_1).tolist())
+
+        self.bfm_wait_until_test_done(100)
+        self.die_event.fire()
+        self.bfm_wait(10)
+        pass
+    pass
+
 #a Hardware and test instantiation
 #c ApbAnalyzerHardware
 class ApbAnalyzerHardware(HardwareThDut):
@@ -166,12 +277,14 @@ class ApbAnalyzerHardware(HardwareThDut):
     reset_desc = {"name":"reset_n", "init_value":0, "wait":5}
     module_name = "tb_analyzer"
     dut_inputs  = {"apb_request":t_apb_request,
+                   "trace_op_capture_index":6,
     }
     dut_outputs = {"apb_response":t_apb_response,
                    "analyzer_data4":t_analyzer_data4,
                    "analyzer_data_filtered":t_analyzer_data4,
                    "analyzer_trace_op":t_analyzer_trace_op4,
                    "analyzer_data_triggered":t_analyzer_data4,
+                   "trace_op_count":32,
     }
     loggers = { # "dprintf": {"modules":"dut.dut", "verbose":1}
                 }
@@ -181,6 +294,8 @@ class ApbAnalyzerHardware(HardwareThDut):
 class TestApbAnalyzer(TestCase):
     hw = ApbAnalyzerHardware
     _tests = {"0": (ApbAnalyzerTest_0, 2*1000, {}),
+              "1": (ApbAnalyzerTest_1, 2*1000, {}),
+              "2": (ApbAnalyzerTest_2, 60*1000, {}),
               "smoke": (ApbAnalyzerTest_0, 80*1000, {}),
     }
 
@@ -23,6 +23,9 @@ from regress.utils import t_dprintf_req_4, t_dprintf_byte, Dprintf, t_dbg_master
 from regress.analyzer import t_analyzer_data4, t_analyzer_trace_op4
 from regress.analyzer import TbApbAddressMap, Filter, FilterAcceptAll, FilterChanging, TraceCfg
 from regress.analyzer import AnalyzerSrc, TriggerSimple
+from regress.analyzer import AnalyzerPipeline, source_samples, RegisterShadow
+from regress.analyzer import HarnessStats, TraceOpWait
+import itertools
 
 from cdl.utils   import csr
 from cdl.sim     import ThExecFile, LogEventParser
@@ -31,7 +34,7 @@ from cdl.sim     import TestCase
 from typing import Optional
 
 #c ApbAnalyzerTest_Base
-class ApbAnalyzerTest_Base(ThExecFile):
+class ApbAnalyzerTest_Base(HarnessStats, TraceOpWait, ThExecFile):
     
     th_name = "Apb target analyzer trigger test harness"
     tgt_mux_sel = 0
@@ -65,7 +68,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         self.verbose.set_level(self.verbose.level_info)
         self.verbose.message(f"Test {self.__class__.__name__}")
 
-        self.apb = ApbMaster(self, "apb_request",  "apb_response")
+        self.apb = self.stats_wrap(ApbMaster(self, "apb_request",  "apb_response"))
         self.apb_map = TbApbAddressMap()
         self.bfm_wait(10)
 
@@ -92,6 +95,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
     def run(self) -> None:
 
         self.verbose.info("Setting up test")
+        self.stats_phase("configuration")
 
         writes = []
         writes += self.trigger.apb_writes(self.apb_map.analyzer_cfg)
@@ -102,43 +106,25 @@ class ApbAnalyzerTest_Base(ThExecFile):
         writes += self.test_filter.apb_writes(self.apb_map.analyzer_cfg)
         writes += self.test_trace.apb_writes(self.apb_map.analyzer_cfg)
         writes += self.src.apb_writes(self.apb_map.analyzer_src)
-        
+        writes = RegisterShadow.for_cfg_map(self.apb_map.analyzer_cfg).writes(writes)
+
         for (r,wd) in writes:
             self.apb.reg(r).write(wd)
             pass
 
         self.trigger.reset()
-        expected_data = []
-        while len(expected_data) < self.num_data:
-            d = self.src.next_valid()
-            valid = self.test_filter.apply(d)
-            trace = self.trigger.apply(d, valid)
-            if trace is not None:
-                expected_data.append(trace)
-                pass
-            pass
-
-        trace_data = []
-        time = 0
-        while len(trace_data) < self.num_data:
-            self.bfm_wait(1)
-            time += 1
-            if time > self.timeout:
-                self.failtest(f"Timeout waiting for trace data {len(trace_data)}")
-                break
-            if self.analyzer_trace_op__op_valid.value() != 0:
-                dout = (self.analyzer_trace_op__op_valid.value(),
-                        self.analyzer_trace_op__op_0.value(),
-                        self.analyzer_trace_op__op_1.value(),
-                        self.analyzer_data_triggered__data_0.value(),
-                        self.analyzer_data_triggered__data_1.value(),
-                        self.analyzer_data_triggered__data_2.value(),
-                        self.analyzer_data_triggered__data_3.value(),
-                        )
-                trace_data.append(dout)
-                pass
+        pipeline = AnalyzerPipeline(self.test_filter, self.trigger, chunk_size=64)
+        trace_ops = pipeline.trace_ops(source_samples(self.src))
+        expected_data = list(itertools.islice(trace_ops, self.num_data))
+
+        self.stats_phase("trigger wait")
+        trace_count = self.wait_for_trace_ops(self.num_data, self.timeout)
+        if trace_count < self.num_data:
+            self.failtest(f"Timeout waiting for trace data {trace_count}")
             pass
 
+        self.stats_phase("readout")
+        trace_data = self.read_trace_ops(min(trace_count, self.num_data))
         self.verbose.info(f"Check {len(trace_data)} data values")
         for i in range(len(trace_data)):
             e = expected_data[i]
@@ -159,6 +145,7 @@ class ApbAnalyzerTest_Base(ThExecFile):
         pass
     #f run__finalize
     def run__finalize(self) -> None:
+        self.stats_report()
         self.passtest("Test completed")
         pass
     pass
@@ -175,12 +162,16 @@ class ApbAnalyzerHardware(HardwareThDut):
     reset_desc = {"name":"reset_n", "init_value":0, "wait":5}
     module_name = "tb_analyzer"
     dut_inputs  = {"apb_request":t_apb_request,
+                   "trace_op_capture_index":6,
     }
     dut_outputs = {"apb_response":t_apb_response,
                    "analyzer_data4":t_analyzer_data4,
                    "analyzer_data_filtered":t_analyzer_data4,
                    "analyzer_trace_op":t_analyzer_trace_op4,
                    "analyzer_data_triggered":t_analyzer_data4,
+                   "trace_op_count":32,
+                   "trace_op_capture_op":t_analyzer_trace_op4,
+                   "trace_op_capture_data":t_analyzer_data4,
     }
     loggers = { # "dprintf": {"modules":"dut.dut", "verbose":1}
                 }
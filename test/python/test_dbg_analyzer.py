@@ -6,6 +6,8 @@ from regress.utils import t_dprintf_req_4, t_dprintf_byte, Dprintf, t_dbg_master
 from regress.analyzer import t_analyzer_data4, t_analyzer_trace_op4
 from regress.analyzer import TbApbAddressMap, Filter, FilterAcceptAll, FilterChanging, TraceCfg
 from regress.analyzer import AnalyzerSrc, TriggerSimple
+from regress.analyzer import ScriptCompiler, WriteGroup
+from regress.analyzer import HarnessStats
 
 from cdl.utils   import csr
 from cdl.sim     import ThExecFile, LogEventParser
@@ -31,7 +33,7 @@ class ApbScript(DbgMasterMuxScript):
     pass
 
 #c DbgAnalyzerTest_Base
-class DbgAnalyzerTest_Base(ThExecFile):
+class DbgAnalyzerTest_Base(HarnessStats, ThExecFile):
     
     th_name = "Dbg script analyzer trigger test harness"
     tgt_mux_sel = 0
@@ -67,7 +69,9 @@ class DbgAnalyzerTest_Base(ThExecFile):
         self.verbose.set_level(self.verbose.level_info)
         self.verbose.message(f"Test {self.__class__.__name__}")
 
-        self.dbg_master = DbgMaster(self, "dbg_master_req", "dbg_master_resp")
+        # Each script invocation is counted as a transaction
+        self.dbg_master = self.stats_wrap(DbgMaster(self, "dbg_master_req", "dbg_master_resp"),
+                                          methods=("invoke_script_bytes",), factories=())
         self.apb_map = TbApbAddressMap()
 
         self.bfm_wait(10)
@@ -77,39 +81,29 @@ class DbgAnalyzerTest_Base(ThExecFile):
     def run(self) -> None:
 
         self.verbose.info("Setting up test")
-
-        writes = []
-        writes += self.trigger.apb_writes(self.apb_map.analyzer_cfg)
-        writes += self.trigger.apb_writes_control(self.apb_map.analyzer_cfg, enable=0, clear=1, start=0, stop=0, timer_divide=0)
-        writes += self.trigger.apb_writes_control(self.apb_map.analyzer_cfg, enable=1, clear=1, start=0, stop=0, timer_divide=0)
-        writes += self.trigger.apb_writes_control(self.apb_map.analyzer_cfg, enable=1, clear=0, start=0, stop=0, timer_divide=0)
-        writes += self.trigger.apb_writes_control(self.apb_map.analyzer_cfg, enable=1, clear=0, start=1, stop=0, timer_divide=0)
-        writes += self.test_filter.apb_writes(self.apb_map.analyzer_cfg)
-        writes += self.test_trace.apb_writes(self.apb_map.analyzer_cfg)
-        writes += self.src.apb_writes(self.apb_map.analyzer_src)
+        self.stats_phase("configuration")
+
+        ctl = self.apb_map.analyzer_ctl
+        cfg = self.apb_map.analyzer_cfg
+        groups = []
+        groups.append(WriteGroup([(ctl.select, 1<<31),
+                                  (ctl.select_at, 0),
+                                  (ctl.status, None),
+                                  (ctl.wrd, self.tgt_mux_sel)], ordered=True))
+        groups.append(WriteGroup(self.trigger.apb_writes(cfg)))
+        control_writes = []
+        control_writes += self.trigger.apb_writes_control(cfg, enable=0, clear=1, start=0, stop=0, timer_divide=0)
+        control_writes += self.trigger.apb_writes_control(cfg, enable=1, clear=1, start=0, stop=0, timer_divide=0)
+        control_writes += self.trigger.apb_writes_control(cfg, enable=1, clear=0, start=0, stop=0, timer_divide=0)
+        control_writes += self.trigger.apb_writes_control(cfg, enable=1, clear=0, start=1, stop=0, timer_divide=0)
+        groups.append(WriteGroup(control_writes, ordered=True))
+        groups.append(WriteGroup(self.test_filter.apb_writes(cfg) + self.test_trace.apb_writes(cfg)))
+        groups.append(WriteGroup(self.src.apb_writes(self.apb_map.analyzer_src), ordered=True))
 
         self.verbose.message(f"Clear control")
         self.verbose.message(f"Enable src as analyzer tgt")
         self.verbose.message(f"Set mux to drive id")
-        script = [
-            Script.op_set("addr1",(self.apb_map.analyzer_ctl.select.Address()>>8)&0xff),
-            Script.op_write(self.apb_map.analyzer_ctl.select.Address() & 0xff, 32, [1<<31]),
-            Script.op_write(self.apb_map.analyzer_ctl.select_at.Address() & 0xff, 32, [0]),
-            Script.op_read(self.apb_map.analyzer_ctl.status.Address() & 0xff, 32),
-            Script.op_write(self.apb_map.analyzer_ctl.wrd.Address() & 0xff, 32, [self.tgt_mux_sel]),
-            ]
-
-        addr = -1
-        for (r,wd) in writes:
-            if r.Address() & 0xff00 != addr & 0xff00:
-                addr = r.Address()
-                script.append(Script.op_set("addr1",(addr>>8)&0xff))
-                pass
-            addr = r.Address()
-            script.append(Script.op_write(addr & 0xff,32,[wd]))
-            pass
-
-        script = Script.compile_script(script)
+        (script,) = ScriptCompiler(Script).compile(groups)
         script = ApbScript(script)
         (completion, res_data) = self.dbg_master.invoke_script_bytes(
             script.as_bytes(),
@@ -117,7 +111,9 @@ class DbgAnalyzerTest_Base(ThExecFile):
             lambda :0,
             1000)
 
+        self.stats_phase("trigger wait")
         self.bfm_wait(40)
+        self.stats_phase("readout")
         script_num = 1
         for (script) in [
                 FifoScript(["status"]
@@ -153,6 +149,7 @@ class DbgAnalyzerTest_Base(ThExecFile):
         pass
     #f run__finalize
     def run__finalize(self) -> None:
+        self.stats_report()
         self.passtest("Test completed")
         pass
     pass
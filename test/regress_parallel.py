@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+#a Documentation
+"""
+Parallel regression runner
+
+Runs the entries of the TestCase '_tests' dictionaries of the given
+test modules as separate invocations of cdl_regress (one per entry,
+with --only-tests), across a pool of workers. Each invocation is a
+separate process, with its own simulation engine, and runs in its own
+directory (output-dir/<module>/<test>) which holds its log and any
+waves.
+
+The entries are found by parsing the test modules (they are not
+imported), and are started longest first using the entry's simulation
+time as the estimate of its run time. The results are merged into a
+single JUnit-style XML report.
+
+A module with no '_tests' entries (such as one of plain unittest
+tests) is run whole, as a single entry named 'all'.
+
+Arguments after '--' (such as --pyengine-dir, --package-dir and
+--waves) are passed on to cdl_regress.
+
+  regress_parallel.py --cdl-regress ${CDL_REGRESS} --suite-dir=python -j 64 test_apb_analyzer ... -- --pyengine-dir=...
+"""
+
+#a Imports
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+#a Test discovery
+#f find_tests
+def find_tests(path):
+    """
+    Find the '_tests' entries of the TestCase classes in a test module,
+    returning a list of (name, estimated cost)
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+        pass
+    tests = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.ClassDef): continue
+        for statement in node.body:
+            if not isinstance(statement, ast.Assign): continue
+            if not any(isinstance(t, ast.Name) and t.id == "_tests" for t in statement.targets): continue
+            if not isinstance(statement.value, ast.Dict): continue
+            for (key, value) in zip(statement.value.keys, statement.value.values):
+                if not isinstance(key, ast.Constant): continue
+                cost = 0
+                if isinstance(value, ast.Tuple) and len(value.elts) > 1:
+                    try:
+                        cost = eval(compile(ast.Expression(value.elts[1]), path, "eval"), {"__builtins__":{}})
+                        pass
+                    except Exception:
+                        pass
+                    pass
+                tests.append((str(key.value), cost))
+                pass
+            pass
+        pass
+    return tests
+
+#a Running
+#c Shard
+class Shard:
+    """
+    One test entry of one test module (or the whole module, if not
+    only_test), and its result
+    """
+    def __init__(self, module, test, cost, only_test=True):
+        self.module = module
+        self.test = test
+        self.cost = cost
+        self.only_test = only_test
+        self.status = "not run"
+        self.returncode = None
+        self.duration = 0.0
+        self.log_path = None
+        pass
+
+    #f run
+    def run(self, args, cdl_regress_args):
+        directory = os.path.join(args.output_dir, self.module, self.test)
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, "log.txt")
+        command = [sys.executable, args.cdl_regress]
+        command += cdl_regress_args
+        command += ["--suite-dir", os.path.abspath(args.suite_dir)]
+        if self.only_test: command += ["--only-tests", self.test]
+        command += [self.module]
+        start = time.time()
+        with open(self.log_path, "w") as log:
+            log.write(" ".join(command) + "\n")
+            log.flush()
+            try:
+                self.returncode = subprocess.run(command, cwd=directory, stdout=log, stderr=subprocess.STDOUT,
+                                                 timeout=args.timeout).returncode
+                self.status = "passed" if self.returncode == 0 else "failed"
+                pass
+            except subprocess.TimeoutExpired:
+                self.status = "timeout"
+                pass
+            pass
+        self.duration = time.time() - start
+        return self
+
+    #f log_tail
+    def log_tail(self, lines=50):
+        try:
+            with open(self.log_path) as f:
+                return "".join(f.readlines()[-lines:])
+            pass
+        except OSError:
+            return ""
+        pass
+    pass
+
+#a JUnit report
+#f junit_report
+def junit_report(shards):
+    """
+    Build a JUnit-style XML report of the shards, with one testsuite per module
+    """
+    modules = {}
+    for shard in shards:
+        modules.setdefault(shard.module, []).append(shard)
+        pass
+    total_failures = sum([s.status == "failed" for s in shards])
+    total_errors = sum([s.status not in ("passed", "failed") for s in shards])
+    total_time = sum([s.duration for s in shards])
+    xml = ['<?xml version="1.0" encoding="UTF-8"?>\n']
+    xml.append(f'<testsuites tests="{len(shards)}" failures="{total_failures}" errors="{total_errors}" time="{total_time:.3f}">\n')
+    for (module, module_shards) in modules.items():
+        failures = sum([s.status == "failed" for s in module_shards])
+        errors = sum([s.status not in ("passed", "failed") for s in module_shards])
+        duration = sum([s.duration for s in module_shards])
+        xml.append(f'  <testsuite name={quoteattr(module)} tests="{len(module_shards)}" failures="{failures}" errors="{errors}" time="{duration:.3f}">\n')
+        for s in module_shards:
+            xml.append(f'    <testcase classname={quoteattr(module)} name={quoteattr(s.test)} time="{s.duration:.3f}">\n')
+            if s.status == "failed":
+                xml.append(f'      <failure message={quoteattr(f"exit code {s.returncode}")}>{escape(s.log_tail())}</failure>\n')
+                pass
+            elif s.status != "passed":
+                xml.append(f'      <error message={quoteattr(s.status)}>{escape(s.log_tail())}</error>\n')
+                pass
+            xml.append(f'      <system-out>{escape(s.log_path or "")}</system-out>\n')
+            xml.append('    </testcase>\n')
+            pass
+        xml.append('  </testsuite>\n')
+        pass
+    xml.append('</testsuites>\n')
+    return "".join(xml)
+
+#a Main
+#f main
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run regression tests in parallel, one process per test entry")
+    parser.add_argument("modules", nargs="+", help="Test modules (in the suite directory)")
+    parser.add_argument("--cdl-regress", required=True, help="Path to cdl_regress.py")
+    parser.add_argument("--suite-dir", default="python", help="Directory containing the test modules")
+    parser.add_argument("--only-tests", action="append", default=None, help="Run only test entries with this name (may be repeated)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="Number of tests to run at once")
+    parser.add_argument("--output-dir", default="regress_output", help="Directory for the per-test logs and waves")
+    parser.add_argument("--junit", default=None, help="JUnit XML report file (default output-dir/junit.xml)")
+    parser.add_argument("--timeout", type=float, default=None, help="Timeout in seconds for each test")
+    if argv is None: argv = sys.argv[1:]
+    cdl_regress_args = []
+    if "--" in argv:
+        cdl_regress_args = argv[argv.index("--")+1:]
+        argv = argv[:argv.index("--")]
+        pass
+    args = parser.parse_args(argv)
+    args.output_dir = os.path.abspath(args.output_dir)
+    if args.junit is None: args.junit = os.path.join(args.output_dir, "junit.xml")
+
+    shards = []
+    for module in args.modules:
+        module = module.removesuffix(".py")
+        tests = find_tests(os.path.join(args.suite_dir, module + ".py"))
+        if (len(tests) == 0) and (args.only_tests is None):
+            shards.append(Shard(module, "all", 0, only_test=False))
+            pass
+        for (test, cost) in tests:
+            if (args.only_tests is not None) and (test not in args.only_tests): continue
+            shards.append(Shard(module, test, cost))
+            pass
+        pass
+    if len(shards) == 0:
+        print("No tests found")
+        return 1
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        ordered = sorted(shards, key=lambda s:-s.cost)
+        for shard in pool.map(lambda s:s.run(args, cdl_regress_args), ordered):
+            print(f"{shard.status:8s} {shard.duration:8.1f}s {shard.module} {shard.test}")
+            sys.stdout.flush()
+            pass
+        pass
+
+    os.makedirs(os.path.dirname(args.junit), exist_ok=True)
+    with open(args.junit, "w") as f:
+        f.write(junit_report(shards))
+        pass
+    passed = sum([s.status == "passed" for s in shards])
+    print(f"{passed}/{len(shards)} tests passed in {time.time()-start:.1f}s; report in {args.junit}")
+    return 0 if passed == len(shards) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())